@@ -447,7 +447,13 @@ class cslightcrv(ctools.cscript):
         tmin = self._tbins.tstart(0)
         tmax = self._tbins.tstop(self._tbins.size()-1)
 
-        # Select events
+        # Adjust model parameters dependent on user parameters. This needs
+        # to be done before the event selection since ctselect attaches the
+        # models to the observations of all time bins
+        self._adjust_model_pars()
+
+        # Select events and distribute them in a single pass into the time
+        # bins
         select = ctools.ctselect(self._obs)
         select['emin'] = self['emin'].real()
         select['emax'] = self['emax'].real()
@@ -456,6 +462,7 @@ class cslightcrv(ctools.cscript):
         select['rad']  = 'UNDEFINED'
         select['ra']   = 'UNDEFINED'
         select['dec']  = 'UNDEFINED'
+        select.time_bins(self._tbins)
         select.run()
 
         # Extract observations
@@ -468,9 +475,6 @@ class cslightcrv(ctools.cscript):
             self._log(str(self._obs))
             self._log('\n')
 
-        # Adjust model parameters dependent on user parameters
-        self._adjust_model_pars()
-
         # Write header
         if self._logTerse():
             self._log('\n')
@@ -507,23 +511,8 @@ class cslightcrv(ctools.cscript):
                       'pars': pars,
                       'values': {}}
 
-            # Log information
-            if self._logExplicit():
-                self._log.header3('Selecting events')
-
-            # Select events
-            select = ctools.ctselect(self._obs)
-            select['emin'] = self['emin'].real()
-            select['emax'] = self['emax'].real()
-            select['tmin'] = tmin.convert(self._time_reference())
-            select['tmax'] = tmax.convert(self._time_reference())
-            select['rad']  = 'UNDEFINED'
-            select['ra']   = 'UNDEFINED'
-            select['dec']  = 'UNDEFINED'
-            select.run()
-
-            # Retrieve observation
-            obs = select.obs()
+            # Retrieve observation with the events of the time bin
+            obs = select.bin_obs(i)
 
             # If a stacked analysis is requested then bin the events
             # and compute the stacked response functions and setup
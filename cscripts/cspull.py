@@ -24,6 +24,7 @@ import gammalib
 import ctools
 from cscripts import obsutils
 from cscripts import ioutils
+from cscripts import mputils
 
 
 # ============ #
@@ -53,6 +54,8 @@ class cspull(ctools.cscript):
         self._enumbins    = 0
         self._seed        = 1
         self._chatter     = 2
+        self._nthreads    = 1
+        self._trial_threads = 0
 
         # Initialise observation container from constructor arguments
         self._obs, argv = self._set_input_obs(argv)
@@ -98,6 +101,9 @@ class cspull(ctools.cscript):
         self._seed    = self['seed'].integer()
         self._chatter = self['chatter'].integer()
 
+        # Get number of processes
+        self._nthreads = mputils.nprocs(self['nthreads'].integer())
+
         # Query some parameters
         self['outfile'].filename()
         self['profile'].boolean()
@@ -182,7 +188,8 @@ class cspull(ctools.cscript):
                            edisp=self._edisp,
                            log=self._log_clients,
                            debug=self._logDebug(),
-                           chatter=self._chatter)
+                           chatter=self._chatter,
+                           nthreads=self._trial_threads)
 
         # Determine number of events in simulation
         nevents = 0.0
@@ -204,10 +211,11 @@ class cspull(ctools.cscript):
             models = self._obs.models()
             for model in models:
                 like = ctools.cterror(obs)
-                like['srcname'] = model.name()
-                like['edisp']   = self._edisp
-                like['debug']   = self._logDebug()
-                like['chatter'] = self._chatter
+                like['srcname']  = model.name()
+                like['edisp']    = self._edisp
+                like['nthreads'] = self._trial_threads
+                like['debug']    = self._logDebug()
+                like['chatter']  = self._chatter
                 like.run()
         else:
             like = ctools.ctlike(obs)
@@ -279,6 +287,67 @@ class cspull(ctools.cscript):
         # Return
         return result
 
+    def _mp_trial(self, seed):
+        """
+        Compute the pull for a single trial within a worker process
+
+        The worker process is forked from the script, hence the observation
+        container with the loaded instrument response functions is reused
+        without reading it again.
+
+        Parameters
+        ----------
+        seed : int
+            Random number generator seed
+
+        Returns
+        -------
+        result : dict
+            Dictionary of results
+        """
+        # Suppress logging since the log file is shared with the parent
+        # process
+        self['chatter'] = 0
+        self._chatter   = 0
+
+        # Use a single thread in the tools since the trials are already
+        # distributed over all worker processes
+        self._trial_threads = 1
+
+        # Return trial result
+        return self._trial(seed)
+
+    def _log_trial(self, seed, result):
+        """
+        Log the result of a trial that was computed in a worker process
+
+        Parameters
+        ----------
+        seed : int
+            Random number generator seed
+        result : dict
+            Dictionary of results
+        """
+        # Write header
+        self._log_header2(gammalib.NORMAL, 'Trial '+str(seed-self._seed+1))
+
+        # Write simulation results
+        self._log_header3(gammalib.NORMAL, 'Simulation')
+        self._log_value(gammalib.NORMAL, 'Number of simulated events',
+                        result['values']['Sim_Events'])
+
+        # Write pulls
+        self._log_header3(gammalib.NORMAL, 'Pulls')
+        for name in result['colnames']:
+            if 'Pull_'+name in result['values']:
+                value = '%.4f (%e +/- %e)' % (result['values']['Pull_'+name],
+                                              result['values'][name],
+                                              result['values']['e_'+name])
+                self._log_value(gammalib.NORMAL, name, value)
+
+        # Return
+        return
+
 
     # Public methods
     def run(self):
@@ -298,15 +367,37 @@ class cspull(ctools.cscript):
         # Write header
         self._log_header1(gammalib.TERSE, 'Generate pull distribution')
 
-        # Loop over trials
-        for seed in range(self._ntrials):
+        # Set random number generator seeds of trials
+        seeds = [seed + self._seed for seed in range(self._ntrials)]
+
+        # Make trials, either in a pool of worker processes or serially. The
+        # trial results are returned in the order of the seeds, hence the
+        # output file is identical to the one of a serial run.
+        parallel = self._nthreads > 1 and self._ntrials > 1
+        if parallel:
+            self._log_value(gammalib.TERSE, 'Number of processes',
+                            self._nthreads)
+            self._log.flush(True)
+            results = mputils.process(self._nthreads, self._mp_trial, seeds)
+        else:
+            results = (self._trial(seed) for seed in seeds)
+
+        # Open results sink
+        sink = ioutils.results_sink(self['outfile'].filename().url())
+
+        # Loop over trial results and make sure that the results sink is
+        # closed in any case
+        try:
+            for i, result in enumerate(results):
 
-            # Make a trial and add initial seed
-            result = self._trial(seed + self._seed)
+                # Log trial result if trial was computed in a worker process
+                if parallel:
+                    self._log_trial(seeds[i], result)
 
-            # Write out trial result
-            ioutils.write_csv_row(self['outfile'].filename().url(), seed,
-                                  result['colnames'], result['values'])
+                # Write out trial result
+                sink.write(result['colnames'], result['values'])
+        finally:
+            sink.close()
 
         # Return
         return
@@ -104,6 +104,8 @@ class cssens(ctools.cscript):
         self['outfile'].filename()
         self['edisp'].boolean()
         self['debug'].boolean()
+        bkgcache = self['bkgcache'].boolean()
+        self['method'].string()
 
         # Derive some parameters
         self._ebounds = gammalib.GEbounds(bins,
@@ -113,6 +115,13 @@ class cssens(ctools.cscript):
         #  Write input parameters into logger
         self._log_parameters(gammalib.TERSE)
 
+        # Signal that the background cache is not used for binned analysis
+        # since binned simulations are directly drawn from the predicted
+        # counts cube
+        if bkgcache and enumbins != 0:
+            self._log_value(gammalib.TERSE, 'Warning',
+                            'Background cache is ignored for binned analysis.')
+
         # Return
         return
 
@@ -251,6 +260,90 @@ class cssens(ctools.cscript):
         # Return photon flux
         return flux
 
+    def _sim_background(self, test_model):
+        """
+        Simulate events for all models except the test source
+
+        Parameters
+        ----------
+        test_model : `~gammalib.GModels`
+            Test source model
+
+        Returns
+        -------
+        bkgsim : `~gammalib.GObservations`
+            Observation container with simulated background events
+        """
+        # Save models of observation container
+        obs_models = self._obs.models().copy()
+
+        # Set all models except the test source
+        models = test_model.copy()
+        models.remove(self._srcname)
+        self._obs.models(models)
+
+        # Simulate background events. A seed of zero is used so that the
+        # background simulation is independent from the source simulations
+        # which use the iteration number as seed.
+        bkgsim = obsutils.sim(self._obs, seed=0,
+                              log=self._log_clients,
+                              debug=self['debug'].boolean(),
+                              edisp=self['edisp'].boolean())
+
+        # Restore models of observation container
+        self._obs.models(obs_models)
+
+        # Return background simulation
+        return bkgsim
+
+    def _sim_source(self, bkgsim, models, seed):
+        """
+        Simulate test source events and merge them with background events
+
+        Parameters
+        ----------
+        bkgsim : `~gammalib.GObservations`
+            Observation container with simulated background events
+        models : `~gammalib.GModels`
+            Models including the test source
+        seed : int
+            Seed value for the test source simulation
+
+        Returns
+        -------
+        sim : `~gammalib.GObservations`
+            Observation container with simulated source and background events
+        """
+        # Save models of observation container
+        obs_models = self._obs.models().copy()
+
+        # Set test source model only
+        src_models = gammalib.GModels()
+        src_models.append(models[self._srcname])
+        self._obs.models(src_models)
+
+        # Simulate test source events
+        srcsim = obsutils.sim(self._obs, seed=seed,
+                              log=self._log_clients,
+                              debug=self['debug'].boolean(),
+                              edisp=self['edisp'].boolean())
+
+        # Restore models of observation container
+        self._obs.models(obs_models)
+
+        # Merge test source events into a copy of the background events.
+        # The merging is done by ctobssim, which also renumbers the event
+        # identifiers and makes the Monte Carlo identifiers of the test
+        # source events distinct from those of the background events.
+        sim = bkgsim.copy()
+        ctools.ctobssim()._merge_events(sim, srcsim)
+
+        # Attach full models to merged observation container
+        sim.models(models)
+
+        # Return merged simulation
+        return sim
+
     def _get_sensitivity(self, emin, emax, test_model):
         """
         Determine sensitivity for given observations
@@ -303,6 +396,14 @@ class cssens(ctools.cscript):
         # Initialise regression coefficient
         regcoeff = 0.0
 
+        # If requested, simulate the background once for this energy bin so
+        # that only the test source needs to be simulated in each iteration.
+        # The cache is only used for unbinned analysis since binned
+        # simulations are directly drawn from the predicted counts cube.
+        bkgsim = None
+        if self['bkgcache'].boolean() and enumbins == 0:
+            bkgsim = self._sim_background(test_model)
+
         # Write header for energy bin
         self._log_string(gammalib.TERSE, '')
         self._log_header2(gammalib.TERSE, 'Energies: '+str(emin)+' - '+str(emax))
@@ -342,11 +443,16 @@ class cssens(ctools.cscript):
 
             # Simulate events for the models. "sim" holds an observation
             # container with observations containing the simulated events.
-            sim = obsutils.sim(self._obs, nbins=enumbins, seed=iterations,
-                               binsz=binsz, npix=npix,
-                               log=self._log_clients,
-                               debug=self['debug'].boolean(),
-                               edisp=self['edisp'].boolean())
+            # If the background was cached then only simulate the test source
+            # and merge its events with the cached background events.
+            if bkgsim is not None:
+                sim = self._sim_source(bkgsim, models, iterations)
+            else:
+                sim = obsutils.sim(self._obs, nbins=enumbins, seed=iterations,
+                                   binsz=binsz, npix=npix,
+                                   log=self._log_clients,
+                                   debug=self['debug'].boolean(),
+                                   edisp=self['edisp'].boolean())
 
             # Determine number of events in simulation by summing the events
             # over all observations in the observation container
@@ -505,6 +611,270 @@ class cssens(ctools.cscript):
         # Return result
         return result
 
+    def _asimov_fit(self, geom, model, crab_prefactor, flux):
+        """
+        Fit test source to Asimov dataset for a given test source flux
+
+        Parameters
+        ----------
+        geom : `~gammalib.GObservations`
+            Observation container with an empty counts cube
+        model : `~ctools.ctmodel`
+            Model cube tool for the observation container
+        crab_prefactor : float
+            Prefactor that corresponds to a flux of 1 Crab
+        flux : float
+            Test source flux (Crab units)
+
+        Returns
+        -------
+        ts, fit, nevents : tuple of float, `~ctools.ctlike` and float
+            Test Statistic, likelihood fit and number of expected events
+        """
+        # Set test source prefactor in a copy of the models
+        models = geom.models().copy()
+        models[self._srcname]['Prefactor'].value(crab_prefactor * flux)
+
+        # Set up observation container for model cube computation
+        obs = geom.copy()
+        obs.models(models)
+
+        # Compute expected counts cube
+        model.models(models)
+        model.run()
+
+        # Use expected counts cube as data
+        cube = model.cube().copy()
+        obs[0].events(cube)
+        nevents = cube.number()
+
+        # Fit test source to the Asimov dataset
+        fit = ctools.ctlike(obs)
+        fit['edisp']   = self['edisp'].boolean()
+        fit['debug']   = self['debug'].boolean()
+        fit['chatter'] = self['chatter'].integer()
+        fit.run()
+
+        # Get Test Statistic
+        ts = fit.obs().models()[self._srcname].ts()
+
+        # Return
+        return (ts, fit, nevents)
+
+    def _get_sensitivity_asimov(self, emin, emax, test_model):
+        """
+        Determine sensitivity for given observations using Asimov datasets
+
+        The expected counts cube is computed with ctmodel and used as data
+        without any Poisson fluctuations. The test source flux at which the
+        Test Statistic reaches the threshold is then searched using a secant
+        root finder on log(TS) as function of log(flux).
+
+        Parameters
+        ----------
+        emin : `~gammalib.GEnergy`
+            Minimum energy for fitting and flux computation
+        emax : `~gammalib.GEnergy`
+            Maximum energy for fitting and flux computation
+        test_model : `~gammalib.GModels`
+            Test source model
+
+        Returns
+        -------
+        result : dict
+            Result dictionary
+        """
+        # Set TeV->erg conversion factor
+        tev2erg = 1.6021764
+
+        # Set parameters
+        ts_thres = self['sigma'].real() * self['sigma'].real()
+        max_iter = self['max_iter'].integer()
+        enumbins = self['enumbins'].integer()
+        if not enumbins == 0:
+            npix  = self['npix'].integer()
+            binsz = self['binsz'].real()
+        else:
+            npix     = 200
+            binsz    = 0.05
+            enumbins = max(1, int(10.0*math.log10(emax.TeV()/emin.TeV())+0.5))
+
+        # Set TS precision required for convergence to 1%
+        ts_precision = 0.01
+
+        # Set energy boundaries
+        self._set_obs_ebounds(emin, emax)
+
+        # Determine mean energy for energy boundary
+        e_mean   = math.sqrt(emin.TeV()*emax.TeV())
+        loge     = math.log10(e_mean)
+        erg_mean = e_mean * tev2erg
+
+        # Compute Crab unit. This is the factor with which the Prefactor needs
+        # to be multiplied to get 1 Crab.
+        crab_flux      = self._get_crab_flux(emin, emax)
+        src_flux       = test_model[self._srcname].spectral().flux(emin, emax)
+        crab_unit      = crab_flux/src_flux
+        crab_prefactor = test_model[self._srcname]['Prefactor'].value() * \
+                         crab_unit
+
+        # Regression is not used for Asimov datasets
+        regcoeff = 0.0
+
+        # Write header for energy bin
+        self._log_string(gammalib.TERSE, '')
+        self._log_header2(gammalib.TERSE, 'Energies: '+str(emin)+' - '+str(emax))
+
+        # Write initial parameters
+        self._log_header3(gammalib.TERSE, 'Initial parameters')
+        self._log_value(gammalib.TERSE, 'Crab flux', str(crab_flux)+' ph/cm2/s')
+        self._log_value(gammalib.TERSE, 'Source model flux', str(src_flux)+' ph/cm2/s')
+        self._log_value(gammalib.TERSE, 'Crab unit factor', crab_unit)
+
+        # Set up empty counts cube that is used as template for the Asimov
+        # datasets
+        self._obs.models(test_model.copy())
+        geom = obsutils.set_binned_obs(self._obs, log=self._log_clients,
+                                       debug=self['debug'].boolean(),
+                                       edisp=self['edisp'].boolean(),
+                                       emin=emin.TeV(), emax=emax.TeV(),
+                                       nbins=enumbins, binsz=binsz, npix=npix)
+
+        # Set up model cube tool. Since only the test source prefactor
+        # changes between iterations, the response-convolved model components
+        # are cached
+        model = ctools.ctmodel(geom)
+        model['edisp']   = self['edisp'].boolean()
+        model['cache']   = True
+        model['debug']   = self['debug'].boolean()
+        model['chatter'] = self['chatter'].integer()
+
+        # Initialise loop
+        log_thres      = math.log(ts_thres)
+        points         = []
+        iterations     = 0
+        test_crab_flux = 0.1 # Initial test flux in Crab units (100 mCrab)
+
+        # Write header for iterations for terse chatter level
+        if self._logTerse():
+            self._log_header3(gammalib.TERSE, 'Iterations')
+
+        # Loop until convergence or until the number of iterations is
+        # exhausted
+        while iterations < max_iter:
+
+            # Update iteration counter
+            iterations += 1
+
+            # Fit test source to Asimov dataset
+            ts, fit, nevents = self._asimov_fit(geom, model, crab_prefactor,
+                                                test_crab_flux)
+
+            # Get model fitting results
+            logL   = fit.opt().value()
+            npred  = fit.obs().npred()
+            models = fit.obs().models()
+            source = models[self._srcname]
+
+            # Get fitted Crab, photon and energy fluxes
+            crab_flux   = source['Prefactor'].value() / crab_prefactor
+            photon_flux = source.spectral().flux(emin, emax)
+            energy_flux = source.spectral().eflux(emin, emax)
+
+            # Compute differential sensitivity in unit erg/cm2/s
+            energy      = gammalib.GEnergy(e_mean, 'TeV')
+            sensitivity = source.spectral().eval(energy) * e_mean*erg_mean*1.0e6
+
+            # Write fit results into logger
+            name  = 'Iteration %d' % iterations
+            value = ('TS=%10.4f  Sim=%9.4f mCrab  Fit=%9.4f mCrab  '
+                     'Sens=%e erg/cm2/s' %
+                     (ts, test_crab_flux*1000.0, crab_flux*1000.0, sensitivity))
+            self._log_value(gammalib.TERSE, name, value)
+
+            # If TS was non-positive then increase the test flux and start over
+            if ts <= 0.0:
+                test_crab_flux *= 3.0
+                self._log_string(gammalib.EXPLICIT,
+                     'Non positive TS, increase test flux and start over.')
+                continue
+
+            # Store point of log(TS) versus log(flux) relation
+            points.append((math.log(test_crab_flux), math.log(ts)))
+
+            # Determine the slope of the log(TS) versus log(flux) relation
+            # from the last two points. If not enough points are available or
+            # if the slope is not positive then assume the background
+            # dominated scaling TS ~ flux^2.
+            slope = 2.0
+            if len(points) > 1:
+                dx = points[-1][0] - points[-2][0]
+                if dx != 0.0:
+                    slope = (points[-1][1] - points[-2][1]) / dx
+                if slope <= 0.0:
+                    slope = 2.0
+
+            # Compute flux correction factor that brings the TS to the
+            # threshold
+            correct = math.exp((log_thres - points[-1][1]) / slope)
+
+            # Compute extrapolated fluxes based on the flux correction factor
+            crab_flux   = correct * crab_flux
+            photon_flux = correct * photon_flux
+            energy_flux = correct * energy_flux
+            sensitivity = correct * sensitivity
+
+            # If TS is sufficiently close to the threshold then stop
+            if abs(ts/ts_thres - 1.0) < ts_precision:
+                value = ('TS=%10.4f  Sim=%9.4f mCrab                  '
+                         '     Sens=%e erg/cm2/s' %
+                         (ts, crab_flux*1000.0, sensitivity))
+                self._log_value(gammalib.TERSE, 'Converged result', value)
+                self._log_value(gammalib.TERSE, 'Log-log slope', slope)
+                break
+
+            # Set test flux for next iteration
+            test_crab_flux = correct * test_crab_flux
+
+        # Signal if the number of iterations was exhausted
+        if iterations >= max_iter and \
+           (len(points) == 0 or abs(ts/ts_thres - 1.0) >= ts_precision):
+            self._log_string(gammalib.TERSE,
+                             ' Test ended after %d iterations.' % max_iter)
+
+        # Write fit results into logger
+        self._log_header3(gammalib.TERSE, 'Fit results')
+        self._log_value(gammalib.TERSE, 'Photon flux',
+                        str(photon_flux)+' ph/cm2/s')
+        self._log_value(gammalib.TERSE, 'Energy flux',
+                        str(energy_flux)+' erg/cm2/s')
+        self._log_value(gammalib.TERSE, 'Crab flux',
+                        str(crab_flux*1000.0)+' mCrab')
+        self._log_value(gammalib.TERSE, 'Differential sensitivity',
+                        str(sensitivity)+' erg/cm2/s')
+        self._log_value(gammalib.TERSE, 'Number of expected events', nevents)
+        self._log_header3(gammalib.TERSE, 'Test source model fitting')
+        self._log_value(gammalib.TERSE, 'log likelihood', logL)
+        self._log_value(gammalib.TERSE, 'Number of predicted events', npred)
+        for model in models:
+            self._log_value(gammalib.TERSE, 'Model', model.name())
+            for par in model:
+                self._log_string(gammalib.TERSE, str(par))
+
+        # Restore energy boundaries of observation container
+        for i, obs in enumerate(self._obs):
+            obs.events().ebounds(self._obs_ebounds[i])
+
+        # Store result
+        result = {'loge': loge, 'emin': emin.TeV(), 'emax': emax.TeV(), \
+                  'crab_flux': crab_flux, 'photon_flux': photon_flux, \
+                  'energy_flux': energy_flux, \
+                  'sensitivity': sensitivity, 'regcoeff': regcoeff, \
+                  'nevents': nevents, 'npred': npred}
+
+        # Return result
+        return result
+
     def _predict_flux(self, results, ts):
         """
         Predict Crab flux for a given TS value
@@ -606,12 +976,14 @@ class cssens(ctools.cscript):
         # Write models into logger
         self._log_models(gammalib.NORMAL, models, 'Model')
 
-        # Get sensitivity type
+        # Get sensitivity type and method
         sensitivity_type = self['type'].string()
+        method           = self['method'].string()
 
         # Write header
         self._log_header1(gammalib.TERSE, 'Sensitivity determination')
         self._log_value(gammalib.TERSE, 'Type', sensitivity_type)
+        self._log_value(gammalib.TERSE, 'Method', method)
 
         # Loop over energy bins
         for ieng in range(self._ebounds.size()):
@@ -630,7 +1002,10 @@ class cssens(ctools.cscript):
                 raise RuntimeError(msg)
 
             # Determine sensitivity
-            result = self._get_sensitivity(emin, emax, models)
+            if method == 'ASIMOV':
+                result = self._get_sensitivity_asimov(emin, emax, models)
+            else:
+                result = self._get_sensitivity(emin, emax, models)
 
             # Write out trial result
             ioutils.write_csv_row(self['outfile'].filename().url(), ieng,
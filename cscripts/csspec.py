@@ -297,6 +297,26 @@ class csspec(ctools.cscript):
         flux_err.unit("erg/cm2/s")
         ulim_values.unit("erg/cm2/s")
 
+        # For unbinned analysis select events and distribute them in a single
+        # pass into the energy bins
+        if not self._binned_mode:
+
+            # Log information
+            if self._logExplicit():
+                self._log.header3("Selecting events")
+
+            # Select events
+            select = ctools.ctselect(self._obs)
+            select["emin"] = self._ebounds.emin().TeV()
+            select["emax"] = self._ebounds.emax().TeV()
+            select["tmin"] = "UNDEFINED"
+            select["tmax"] = "UNDEFINED"
+            select["rad"]  = "UNDEFINED"
+            select["ra"]   = "UNDEFINED"
+            select["dec"]  = "UNDEFINED"
+            select.energy_bins(self._ebounds)
+            select.run()
+
         # Loop over energy bins
         for i in range(nrows):
 
@@ -318,26 +338,11 @@ class csspec(ctools.cscript):
             energy_low[i]  = (elogmean - emin).TeV()
             energy_high[i] = (emax - elogmean).TeV()
 
-            # Use ctselect for unbinned analysis
+            # Use events selected by ctselect for unbinned analysis
             if not self._binned_mode:
-                
-                # Log information
-                if self._logExplicit():
-                    self._log.header3("Selecting events")
-    
-                # Select events
-                select = ctools.ctselect(self._obs)
-                select["emin"] = emin.TeV()    
-                select["emax"] = emax.TeV() 
-                select["tmin"] = "UNDEFINED"
-                select["tmax"] = "UNDEFINED"
-                select["rad"]  = "UNDEFINED"
-                select["ra"]   = "UNDEFINED"
-                select["dec"]  = "UNDEFINED"
-                select.run()  
-    
-                # Retrieve observation
-                obs = select.obs()
+
+                # Retrieve observation with the events of the energy bin
+                obs = select.bin_obs(i)
 
             # Use ctcubemask for binned analysis
             else:
@@ -24,6 +24,7 @@ import ctools
 from cscripts import obsutils
 from cscripts import modutils
 from cscripts import ioutils
+from cscripts import mputils
 
 
 # ============== #
@@ -44,8 +45,9 @@ class cstsdist(ctools.cscript):
         self._version = ctools.__version__
 
         # Initialise some members
-        self._srcname     = ''
-        self._log_clients = False
+        self._srcname       = ''
+        self._log_clients   = False
+        self._trial_threads = 0
 
         # Initialise observation container from constructor arguments
         self._obs, argv = self._set_input_obs(argv)
@@ -85,6 +87,8 @@ class cstsdist(ctools.cscript):
         self['ntrials'].integer()
         self['outfile'].filename()
         self['debug'].boolean()
+        self['nthreads'].integer()
+        self['resume'].boolean()
 
         #  Write input parameters into logger
         self._log_parameters(gammalib.TERSE)
@@ -125,14 +129,15 @@ class cstsdist(ctools.cscript):
 
         # Simulate events
         sim = obsutils.sim(self._obs,
-                           nbins = self['enumbins'].integer(),
-                           seed  = seed,
-                           proj  = proj,
-                           coord = coordsys,
-                           binsz = binsz,
-                           npix  = npix,
-                           log   = self._log_clients,
-                           debug = self['debug'].boolean())
+                           nbins    = self['enumbins'].integer(),
+                           seed     = seed,
+                           proj     = proj,
+                           coord    = coordsys,
+                           binsz    = binsz,
+                           npix     = npix,
+                           log      = self._log_clients,
+                           debug    = self['debug'].boolean(),
+                           nthreads = self._trial_threads)
 
         # Determine number of events in simulation
         nevents = 0.0
@@ -212,6 +217,56 @@ class cstsdist(ctools.cscript):
         # Return
         return result
 
+    def _mp_trial(self, seed):
+        """
+        Create the TS for a single trial within a worker process
+
+        Parameters
+        ----------
+        seed : int
+            Random number generator seed
+
+        Returns
+        -------
+        result : dict
+            Result dictionary
+        """
+        # Suppress logging since the log file is shared with the parent
+        # process
+        self['chatter'] = 0
+
+        # Use a single thread in the tools since the trials are already
+        # distributed over the worker processes
+        self._trial_threads = 1
+
+        # Return trial result
+        return self._trial(seed)
+
+    def _log_trial(self, seed, result):
+        """
+        Log the result of a trial that was run in a worker process
+
+        Parameters
+        ----------
+        seed : int
+            Random number generator seed
+        result : dict
+            Result dictionary
+        """
+        # Get Prefactor value and error
+        name      = self._srcname+'_Prefactor'
+        prefactor = result['values'].get(name, 0.0)
+        error     = result['values'].get('e_'+name, 0.0)
+
+        # Write trial result
+        name  = 'Trial %d' % seed
+        value = 'TS=%.3f  Prefactor=%e +/- %e' % \
+                (result['values']['TS'], prefactor, error)
+        self._log_value(gammalib.NORMAL, name, value)
+
+        # Return
+        return
+
 
     # Public methods
     def run(self):
@@ -251,15 +306,47 @@ class cstsdist(ctools.cscript):
             self._log('\n')
             self._log.header1('Generate TS distribution')
 
-        # Loop over trials
-        for seed in range(self['ntrials'].integer()):
-
-            # Make a trial
-            result = self._trial(seed)
-
-            # Write out trial result
-            ioutils.write_csv_row(self['outfile'].filename().url(), seed,
-                                  result['colnames'], result['values'])
+        # Get output filename and number of processes
+        outfile  = self['outfile'].filename().url()
+        nthreads = mputils.nprocs(self['nthreads'].integer())
+
+        # Open results sink. If the run is resumed then the trials that are
+        # already in the output file are kept and skipped.
+        sink = ioutils.results_sink(outfile, append=self['resume'].boolean())
+
+        # Determine first trial
+        first = sink.nrows()
+        if self['resume'].boolean():
+            self._log_value(gammalib.TERSE, 'Resumed trials', first)
+
+        # Set random number generator seeds of trials. The seed of each
+        # trial is its index so that the results do not depend on the number
+        # of processes or on resuming.
+        seeds = list(range(first, self['ntrials'].integer()))
+
+        # Make trials, either in a pool of worker processes or serially. The
+        # trial results are returned in the order of the seeds.
+        parallel = nthreads > 1 and len(seeds) > 1
+        if parallel:
+            self._log_value(gammalib.TERSE, 'Number of processes', nthreads)
+            self._log.flush(True)
+            results = mputils.process(nthreads, self._mp_trial, seeds)
+        else:
+            results = (self._trial(seed) for seed in seeds)
+
+        # Loop over trial results and make sure that the results sink is
+        # closed in any case
+        try:
+            for i, result in enumerate(results):
+
+                # Log trial result if trial was made in a worker process
+                if parallel:
+                    self._log_trial(seeds[i], result)
+
+                # Write out trial result
+                sink.write(result['colnames'], result['values'])
+        finally:
+            sink.close()
 
         # Return
         return
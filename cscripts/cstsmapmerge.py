@@ -124,77 +124,112 @@ class cstsmapmerge(ctools.cscript):
         # Return
         return
  
-    def _init_ts_map(self, fitsfile):
+    def _read_ts_map(self, fitsfile):
         """
-        Initialise Test Statistic map.
+        Read TS map file
+
+        The range of computed map bins is read from the "BINMIN" and "BINMAX"
+        keywords of the status map extension. If the keywords are not present
+        the range is determined from the status map.
+
+        Args:
+            fitsfile: TS map FITS file.
+
+        Returns:
+            Tuple of TS map, status map, list of parameter maps, list of
+            parameter map names, first computed bin and last computed bin + 1.
         """
-        # Set filename
-        self._in_filename = fitsfile
-        
         # Open FITS file
         fits = gammalib.GFits(fitsfile)
 
         # Read TS and status maps
-        self._tsmap     = gammalib.GSkyMap()
-        self._tsmap.read(fits[0])
-        self._statusmap = gammalib.GSkyMap()
-        self._statusmap.read(fits['STATUS MAP'])
-        
-        # Get other maps 
-        self._maps     = []
-        self._mapnames = []
-        
+        tsmap     = gammalib.GSkyMap()
+        tsmap.read(fits[0])
+        statusmap = gammalib.GSkyMap()
+        statusmap.read(fits['STATUS MAP'])
+
+        # Get range of computed bins from status map header
+        hdu = fits['STATUS MAP']
+        if hdu.has_card('BINMIN') and hdu.has_card('BINMAX'):
+            binmin = hdu.integer('BINMIN')
+            binmax = hdu.integer('BINMAX')
+
+        # ... otherwise determine the range from the status map
+        else:
+            binmin = statusmap.npix()
+            binmax = 0
+            for i, status in enumerate(statusmap):
+                if status > -0.5:
+                    if i < binmin:
+                        binmin = i
+                    binmax = i + 1
+
+        # Get other maps
+        maps     = []
+        mapnames = []
+
         # Loop over extensions
         for hdu in fits:
-            
+
             # Leave out primary and status extension
             if hdu.extname() != 'IMAGE' and hdu.extname() != 'STATUS MAP':
-                
+
                 # Add present maps
                 skymap = gammalib.GSkyMap()
                 skymap.read(hdu)
-                self._maps.append(skymap)
-                self._mapnames.append(hdu.extname())
-                
-        # Close FITS file       
+                maps.append(skymap)
+                mapnames.append(hdu.extname())
+
+        # Close FITS file
         fits.close()
-        
-        # Return
-        return
+
+        # Return maps and range of computed bins
+        return tsmap, statusmap, maps, mapnames, binmin, binmax
+
+    def _init_ts_map(self, fitsfile):
+        """
+        Initialise Test Statistic map.
+
+        Args:
+            fitsfile: FITS file to initialise the TS map from.
+
+        Returns:
+            Number of pixels for which TS has been computed.
+        """
+        # Set filename
+        self._in_filename = fitsfile
+
+        # Read TS map file
+        self._tsmap, self._statusmap, self._maps, self._mapnames, \
+        binmin, binmax = self._read_ts_map(fitsfile)
+
+        # Count computed bins
+        count = 0
+        for i in range(binmin, binmax):
+            if self._statusmap[i] > -0.5:
+                count += 1
+
+        # Return number of computed bins
+        return count
 
     def _merge_ts_map(self, fitsfile):
         """
         Merge TS map from FITS file into output TS map.
 
+        Only the range of computed map bins is copied, hence the total
+        number of copied map bins does not depend on the number of files
+        that are merged.
+
         Args:
             fitsfile: FITS file to be merged.
+
+        Returns:
+            Number of pixels for which TS has been computed.
         """
-        # Open FITS file
-        fits = gammalib.GFits(fitsfile)
+        # Read TS map file
+        add_tsmap, add_statusmap, add_maps, _, binmin, binmax = \
+            self._read_ts_map(fitsfile)
 
-        # Read TS and status maps
-        add_tsmap     = gammalib.GSkyMap()
-        add_tsmap.read(fits[0])
-        add_statusmap = gammalib.GSkyMap()
-        add_statusmap.read(fits['STATUS MAP'])
-        
-        # Get other maps 
-        add_maps = []
-        
-        # Loop over extensions
-        for hdu in fits:
-            
-            # Leave out primary and status extension
-            if hdu.extname() != 'IMAGE' and hdu.extname() != 'STATUS MAP':
-                
-                # Add present maps
-                skymap = gammalib.GSkyMap()
-                skymap.read(hdu)
-                add_maps.append(skymap)
-                
-        # Close FITS file
-        fits.close()
-        
         # Compare size of maps
         if not len(add_maps) == len(self._maps):
             msg = 'Cannot merge map "'+fitsfile+'" into map "'+\
@@ -202,8 +237,9 @@ class cstsmapmerge(ctools.cscript):
                   'between both maps is different.'
             raise RuntimeError(msg) 
 
-        # Loop over bins    
-        for i in range(self._tsmap.npix()):
+        # Loop over range of computed bins
+        count = 0
+        for i in range(binmin, binmax):
 
             # Consider only bins that have been computed
             if add_statusmap[i] > -0.5:
@@ -225,31 +261,41 @@ class cstsmapmerge(ctools.cscript):
                 # Loop over maps and copy entries
                 for j in range(len(self._maps)):
                     self._maps[j][i] = add_maps[j][i]
+
+                # Increment number of computed bins
+                count += 1
         
-        # Return
-        return
+        # Return number of computed bins
+        return count
 
-    def _get_number_of_ts_pixels(self, fitsfile):
+    def _is_ts_map_file(self, fitsfile):
         """
-        Return number of pixels with TS values.
+        Check whether a file is a TS map file
 
         Args:
-            fitsfile: FITS file to be merged.
+            fitsfile: File name.
 
         Returns:
-            Number of pixels for which TS has been computed.
+            True if the file is a FITS file with a "STATUS MAP" extension.
         """
-        # Get status map for this file
-        status = gammalib.GSkyMap(fitsfile+'[STATUS MAP]')
+        # Skip file if it's not a FITS file
+        if not gammalib.GFilename(fitsfile).is_fits():
+            self._log_value(gammalib.EXPLICIT, 'Skip file',
+                            fitsfile +' (not a FITS file)')
+            return False
+
+        # Open FITS file and check for status map
+        fits     = gammalib.GFits(fitsfile)
+        contains = fits.contains('STATUS MAP')
+        fits.close()
 
-        # Count number of pixels with TS status set
-        count = 0
-        for pix in status:
-            if pix > -0.5:
-                count += 1
+        # Skip file if it has no status map
+        if not contains:
+            self._log_value(gammalib.EXPLICIT, 'Skip file',
+                            fitsfile +' (no "STATUS MAP" extension)')
 
-        # Return number of pixels
-        return count
+        # Return
+        return contains
 
 
     # Public methods
@@ -267,107 +313,49 @@ class cstsmapmerge(ctools.cscript):
         # Write header into logger
         self._log_header1(gammalib.TERSE, 'Merge TS maps')
         
-        # Initialise file to start with
-        file0              = ''
+        # Initialise merged files
         self._merged_files = []
-        
-        # Test files for the entry status map. Use the first one to appear
-        # useful
-        for fitsfile in self._files:
 
-            # Skip file if it's not a FITS file
-            if not gammalib.GFilename(fitsfile).is_fits():
-                
-                # Log message
-                self._log_value(gammalib.EXPLICIT, 'Skip file', fitsfile +' (not a FITS file)')
+        # Loop over files. The first TS map file initialises the TS map and
+        # all other TS map files are merged into that map. Each file is
+        # closed before the next file is read.
+        for fitsfile in self._files:
 
-                # Continue
+            # Skip files that are no TS map files
+            if not self._is_ts_map_file(fitsfile):
                 continue
 
-            # Open FITS file
-            fits = gammalib.GFits(fitsfile)
+            # If no TS map file was found so far then initialise the TS map
+            if len(self._merged_files) == 0:
+                count = self._init_ts_map(fitsfile)
+                self._log_value(gammalib.TERSE, 'Initial TS map file',
+                                fitsfile + ' (%d TS pixels computed)' % count)
 
-            # If file contains a status map then use it
-            if fits.contains('STATUS MAP'):
-                
-                # Close FITS file
-                fits.close()
-                
-                # Set filename to initial filename
-                file0 = fitsfile
-                
-                # Log message
-                pix_info = ' (%d TS pixels computed)' % self._get_number_of_ts_pixels(fitsfile)
-                self._log_value(gammalib.TERSE, 'Initial TS map file', fitsfile + pix_info)
-                
-                # Leave loop
-                break
-
-            # ... otherwise signal that file is useless
+            # ... otherwise merge the TS map
             else:
-                
-                # Close fits file
-                fits.close()  
-                
-                # Info message             
-                self._log_value(gammalib.EXPLICIT, 'Skip file', fitsfile +' (no "STATUS MAP" extension)')
-                
-                # Continue
-                continue
+                count = self._merge_ts_map(fitsfile)
+                self._log_value(gammalib.TERSE, 'Merge TS map file',
+                                fitsfile + ' (%d TS pixels computed)' % count)
+
+            # Append FITS file to merged files
+            self._merged_files.append(fitsfile)
 
         # Signal if no suitable file was found
-        if file0 == '':
+        if len(self._merged_files) == 0:
             msg = 'None of the provided files seems to be a sliced ' + \
                           'TS map file (none has a "STATUS MAP" ' + \
                           'extension)'
             raise RuntimeError(msg)
-                          
 
-        # ... otherwise merge files
-        else:
-            
-            # Copy file list
-            workfiles = self._files
-            
-            # Remove entry which will be used to initalise the map
-            workfiles.remove(file0)
-            
-            # Initialise map from first file
-            self._init_ts_map(file0) 
-            
-            # Append to added files 
-            self._merged_files.append(file0)
-            
-            # Loop over files
-            for fitsfile in workfiles:
-                
-                # Skip if file is not FITS
-                if not gammalib.GFilename(fitsfile).is_fits():
-                    self._log_value(gammalib.EXPLICIT, 'Skip file', fitsfile +' (not a FITS file)')
-                    continue   
+        # Log number of map bins that were interpolated by the adaptive
+        # method of cttsmap. These bins have a status of 100.
+        ninterpolated = 0
+        for status in self._statusmap:
+            if status > 99.5:
+                ninterpolated += 1
+        self._log_value(gammalib.NORMAL, 'Interpolated TS pixels',
+                        ninterpolated)
 
-                # Open FITS file
-                fits = gammalib.GFits(fitsfile)
-                
-                # Skip if file does not contain status map
-                if not fits.contains('STATUS MAP'):
-                    fits.close()
-                    self._log_value(gammalib.EXPLICIT, 'Skip file', fitsfile +' (no "STATUS MAP" extension)')
-                    continue
-
-                # Close FITS file
-                fits.close()
-                
-                # Logging
-                pix_info = ' (%d TS pixels computed)' % self._get_number_of_ts_pixels(fitsfile)
-                self._log_value(gammalib.TERSE, 'Merge TS map file', fitsfile + pix_info)
-                    
-                # Merge TS map
-                self._merge_ts_map(fitsfile)
-                
-                # Append FITS file to merged files
-                self._merged_files.append(fitsfile)
-                
         # Return
         return
 
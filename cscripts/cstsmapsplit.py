@@ -21,8 +21,12 @@
 import os
 import sys
 import math
+import time
+import hashlib
 import gammalib
 import ctools
+from cscripts import mputils
+from cscripts.cstsmapmerge import cstsmapmerge
 
 
 # ================== #
@@ -37,6 +41,10 @@ class cstsmapsplit(ctools.cscript):
     the ctools.cscript class which provides support for parameter files,
     command line arguments, and logging. In that way the Python script
     behaves just as a regular ctool. 
+
+    Optionally, the jobs are executed by the script itself in a pool of
+    worker processes, and the resulting TS maps are merged into a single
+    TS map.
     """
     
     # Consructor
@@ -56,6 +64,10 @@ class cstsmapsplit(ctools.cscript):
         self._outfile      = gammalib.GFilename()
         self._map          = gammalib.GSkyMap()
         self._cmd          = []
+        self._jobs         = []
+        self._job_pars     = []
+        self._logL0        = 0.0
+        self._job_threads  = 0
         self._srcname      = ''
         
         # Initialise observation container from constructor arguments.
@@ -93,6 +105,12 @@ class cstsmapsplit(ctools.cscript):
         self._compute_null = self['compute_null'].boolean()
         self._outfile      = self['outfile'].filename()
         
+        # Query parameters for job execution
+        if self['run_jobs'].boolean():
+            self['nthreads'].integer()
+            self['retries'].integer()
+            self['merge'].boolean()
+
         #  Write input parameters into logger
         self._log_parameters(gammalib.TERSE)
         
@@ -132,6 +150,261 @@ class cstsmapsplit(ctools.cscript):
               
         # Return optimised log-likelihood of null hypothesis
         return -(opt.value())
+
+    def _state_filename(self):
+        """
+        Return name of job state file
+
+        Returns
+        -------
+        filename : str
+            Name of job state file
+        """
+        # Return job state file name
+        return os.path.splitext(self._outmap.url())[0] + '_jobs.dat'
+
+    def _read_state(self):
+        """
+        Read indices of finished jobs from job state file
+
+        A job is considered as finished if it was recorded as done in the
+        job state file with the same bin range and parameter hash as the
+        current job definition, and if its TS map file exists.
+
+        Returns
+        -------
+        finished : set of int
+            Indices of finished jobs
+        """
+        # Initialise set of finished jobs
+        finished = set()
+
+        # Set job definitions of current jobs
+        jobs = {}
+        for job in self._jobs:
+            jobs[job['index']] = (job['binmin'], job['binmax'], job['hash'])
+
+        # Read job state file if it exists. Records of jobs whose definition
+        # differs from the current job definition are ignored.
+        filename = self._state_filename()
+        if os.path.isfile(filename):
+            with open(filename, 'r') as f:
+                for line in f:
+                    fields = line.split()
+                    if len(fields) < 6 or fields[1] != 'done':
+                        continue
+                    index      = int(fields[0])
+                    definition = (int(fields[3]), int(fields[4]), fields[5])
+                    if jobs.get(index) == definition:
+                        finished.add(index)
+
+        # Remove jobs for which the TS map file does not exist
+        for job in self._jobs:
+            if job['index'] in finished and not os.path.isfile(job['outmap']):
+                finished.remove(job['index'])
+
+        # Return finished jobs
+        return finished
+
+    def _write_state(self, result):
+        """
+        Append job result to job state file
+
+        The job result is recorded together with the job definition, given
+        by the bin range and the hash of the job parameters.
+
+        Parameters
+        ----------
+        result : dict
+            Job result
+        """
+        # Get job definition
+        job = self._jobs[result['index']]
+
+        # Append job result and make sure that it is written immediately
+        with open(self._state_filename(), 'a') as f:
+            f.write('%d %s %d %d %d %s\n' % (result['index'], result['status'],
+                                             result['attempts'], job['binmin'],
+                                             job['binmax'], job['hash']))
+            f.flush()
+            os.fsync(f.fileno())
+
+        # Return
+        return
+
+    def _job(self, job):
+        """
+        Execute a cttsmap job
+
+        The cttsmap tool is set up from the observation container of the
+        script, hence the input files are not read again. Failed jobs are
+        retried for the number of times given by the "retries" parameter.
+
+        Parameters
+        ----------
+        job : dict
+            Job definition
+
+        Returns
+        -------
+        result : dict
+            Job result
+        """
+        # Initialise result
+        result = {'index': job['index'], 'status': 'failed', 'attempts': 0,
+                  'message': '', 'outmap': job['outmap']}
+
+        # Loop over attempts
+        for attempt in range(self['retries'].integer()+1):
+
+            # Update number of attempts
+            result['attempts'] = attempt + 1
+
+            # Execute cttsmap and catch any exception
+            try:
+                tsmap = ctools.cttsmap(self._obs)
+                for name, value in self._job_pars:
+                    tsmap[name] = value
+                tsmap['logL0']    = self._logL0
+                tsmap['nthreads'] = self._job_threads
+                tsmap['binmin']   = job['binmin']
+                tsmap['binmax']   = job['binmax']
+                tsmap['outmap']   = job['outmap']
+                tsmap['logfile']  = job['outmap'].replace('.fits','.log')
+                tsmap.execute()
+                result['status']  = 'done'
+                result['message'] = ''
+                break
+            except Exception as e:
+                result['message'] = str(e)
+
+        # Return result
+        return result
+
+    def _mp_job(self, job):
+        """
+        Execute a cttsmap job within a worker process
+
+        The worker process is forked from the script, hence the observation
+        container with the loaded instrument response functions is reused
+        without reading it again.
+
+        Parameters
+        ----------
+        job : dict
+            Job definition
+
+        Returns
+        -------
+        result : dict
+            Job result
+        """
+        # Suppress logging since the log file is shared with the parent
+        # process
+        self['chatter'] = 0
+
+        # Return job result
+        return self._job(job)
+
+    def _run_jobs(self):
+        """
+        Execute cttsmap jobs in a pool of worker processes
+
+        Jobs that were already finished in a previous run are skipped. The
+        result of each job is recorded in the job state file as soon as it
+        becomes available, and the progress is logged together with an
+        estimate of the remaining time.
+        """
+        # Write header
+        self._log_header1(gammalib.TERSE, 'Execute jobs')
+
+        # Determine jobs that need to be executed
+        finished = self._read_state()
+        jobs     = [job for job in self._jobs if job['index'] not in finished]
+        nthreads = mputils.nprocs(self['nthreads'].integer())
+
+        # Log job information
+        self._log_value(gammalib.TERSE, 'Number of jobs', len(self._jobs))
+        self._log_value(gammalib.TERSE, 'Finished jobs', len(finished))
+        self._log_value(gammalib.TERSE, 'Job state file', self._state_filename())
+
+        # Execute jobs, either in a pool of worker processes or serially.
+        # The job results are returned in the order of the jobs. If the jobs
+        # are executed in parallel then each job uses a single thread,
+        # otherwise cttsmap uses all available threads.
+        parallel = nthreads > 1 and len(jobs) > 1
+        if parallel:
+            self._log_value(gammalib.TERSE, 'Number of processes', nthreads)
+            self._log.flush(True)
+            self._job_threads = 1
+            results = mputils.process(nthreads, self._mp_job, jobs)
+        else:
+            self._job_threads = 0
+            results = (self._job(job) for job in jobs)
+
+        # Loop over job results
+        failed = []
+        tstart = time.time()
+        for i, result in enumerate(results):
+
+            # Record job result
+            self._write_state(result)
+            if result['status'] != 'done':
+                failed.append(result)
+
+            # Estimate remaining time
+            elapsed = time.time() - tstart
+            eta     = elapsed / float(i+1) * float(len(jobs)-i-1)
+
+            # Log progress
+            value = '%s after %d attempt(s) (%d/%d, ETA %.0f s)' % \
+                    (result['status'], result['attempts'], i+1, len(jobs), eta)
+            self._log_value(gammalib.NORMAL, 'Job %d' % result['index'], value)
+            if result['status'] != 'done':
+                self._log_value(gammalib.NORMAL, 'Error', result['message'])
+
+        # Throw an exception if jobs failed. Since finished jobs are recorded
+        # in the job state file, only the failed jobs will be executed when
+        # the script is run again.
+        if len(failed) > 0:
+            msg = '%d of %d cttsmap jobs failed, run the script again to '\
+                  'execute only the failed jobs. First error: %s' % \
+                  (len(failed), len(jobs), failed[0]['message'])
+            raise RuntimeError(msg)
+
+        # Return
+        return
+
+    def _merge_maps(self):
+        """
+        Merge TS maps of all jobs into the output TS map
+        """
+        # Write header
+        self._log_header1(gammalib.TERSE, 'Merge TS maps')
+
+        # Get TS map files
+        files = [job['outmap'] for job in self._jobs]
+
+        # If there is a single TS map file then simply copy it, otherwise
+        # merge the TS map files using cstsmapmerge
+        if len(files) == 1:
+            fits = gammalib.GFits(files[0])
+            fits.saveto(self._outmap.url(), self._clobber())
+        else:
+            merge = cstsmapmerge()
+            merge['inmaps']  = ';'.join(files)
+            merge['outmap']  = self._outmap.url()
+            merge['chatter'] = self['chatter'].integer()
+            merge['clobber'] = self._clobber()
+            merge['logfile'] = os.path.splitext(self._outmap.url())[0] + \
+                               '_merge.log'
+            merge.execute()
+
+        # Log output TS map
+        self._log_value(gammalib.TERSE, 'TS map file', self._outmap.url())
+
+        # Return
+        return
     
     
     # Public methods
@@ -156,6 +429,7 @@ class cstsmapsplit(ctools.cscript):
         
         # Set log-likelihood to zero
         logL0 = 0.0
+        self._logL0 = 0.0
         
         # Pre-compute null hypothesis if requested
         if self._compute_null:
@@ -167,6 +441,7 @@ class cstsmapsplit(ctools.cscript):
             
             # Compute null hypothesis
             logL0 = self._compute_null_hypothesis()
+            self._logL0 = logL0
             
             # Write likelihood into logger
             self._log_value(gammalib.TERSE, 'Source removed', self._srcname)
@@ -180,7 +455,8 @@ class cstsmapsplit(ctools.cscript):
         njobs = int(math.ceil(float(nbins) / float(self._bins_per_job)) + 0.1)   
         
         # Set parameters to be skipped now, we will deal with them later
-        skip_pars = ['binmin', 'binmax', 'logL0', 'outmap', 'logfile']
+        skip_pars = ['binmin', 'binmax', 'logL0', 'outmap', 'logfile',
+                     'nthreads']
         
         # Set tool name for computation
         base_command = 'cttsmap'
@@ -189,6 +465,9 @@ class cstsmapsplit(ctools.cscript):
         self._log_header1(gammalib.TERSE, 'Create commands')
         self._log_value(gammalib.TERSE, 'Number of cttsmap calls', njobs)
         
+        # Clear job parameters
+        self._job_pars = []
+
         # Loop over TS map parameters
         for par in pars:
             
@@ -196,6 +475,11 @@ class cstsmapsplit(ctools.cscript):
             if par.name() in skip_pars:
                 continue
             
+            # Skip if the parameter is not a parameter of this script, so
+            # that cttsmap uses its default value
+            if not self.pars().contains(par.name()):
+                continue
+
             # Skip if they need to be queried
             # This way we ensure we pass only parameters
             # that were queried before
@@ -208,16 +492,24 @@ class cstsmapsplit(ctools.cscript):
             
             # Append command to set parameter
             base_command += ' ' + par.name() + '=' + par.value()
+
+            # Append job parameter
+            self._job_pars.append((par.name(), par.value()))
             
         # Append null hypothesis parameter
         base_command += ' logL0=' + repr(logL0)  
+
+        # Compute hash of job parameters that is recorded in the job state
+        # file
+        job_hash = hashlib.md5(base_command.encode('utf-8')).hexdigest()
         
         # Set binning to start from zero
         binmin = 0
         binmax = 0
         
-        # Clear command sequence
-        self._cmd = []
+        # Clear command sequence and jobs
+        self._cmd  = []
+        self._jobs = []
         
         # Loop over jobs and create commands
         for job in range(njobs):
@@ -242,6 +534,11 @@ class cstsmapsplit(ctools.cscript):
 
             # Append command to list of commands
             self._cmd.append(sliced_command)
+
+            # Append job
+            self._jobs.append({'index': job, 'binmin': binmin,
+                               'binmax': binmax, 'outmap': outmap,
+                               'hash': job_hash})
         
         # Write information into logger
         if self._logExplicit():
@@ -252,6 +549,12 @@ class cstsmapsplit(ctools.cscript):
                 self._log('\n')
             self._log('\n')
 
+        # Optionally execute jobs and merge the resulting TS maps
+        if self['run_jobs'].boolean():
+            self._run_jobs()
+            if self['merge'].boolean():
+                self._merge_maps()
+
         # Return
         return
     
@@ -17,8 +17,10 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 # ==========================================================================
+import os
 import csv
 import sys
+import time
 import gammalib
 import ctools
 
@@ -65,6 +67,342 @@ def write_csv_row(outfile, row, colnames, colvalues):
     return
 
 
+# ============ #
+# Results sink #
+# ============ #
+class results_sink(object):
+    """
+    Buffered sink for writing results row by row
+
+    The sink keeps the output file open and buffers the result rows. The
+    buffered rows are written into the file at checkpoints, which occur
+    every ``nbuffer`` rows or if more than ``interval`` seconds have elapsed
+    since the last checkpoint, and when the sink is closed. At each
+    checkpoint the file is synchronised to disk so that all rows written
+    before a crash can be recovered.
+
+    If the output filename has a ``.fits`` or ``.fit`` extension the results
+    are written into a binary FITS table, otherwise they are written into
+    a CSV file. Since a FITS table can not be appended, the FITS file is
+    entirely written at each checkpoint into a temporary file that is
+    synchronised to disk and then replaces the output file. To keep the
+    total amount of writing linear in the number of rows, a row-triggered
+    checkpoint of a FITS file only occurs once the number of buffered rows
+    reaches the number of rows that are already in the file.
+    """
+    def __init__(self, outfile, append=False, nbuffer=10, interval=60.0):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        outfile : str
+            Output file name
+        append : bool, optional
+            Append rows to existing output file?
+        nbuffer : int, optional
+            Maximum number of buffered rows
+        interval : float, optional
+            Maximum time between checkpoints (s)
+        """
+        # Set members
+        self._outfile  = outfile
+        self._nbuffer  = nbuffer
+        self._interval = interval
+        self._fits     = os.path.splitext(outfile)[1].lower() in \
+                         ['.fits', '.fit']
+        self._file     = None
+        self._writer   = None
+        self._colnames = []
+        self._rows     = []
+        self._buffer   = []
+        self._nrows    = 0
+        self._time     = time.time()
+
+        # If rows should be appended then get existing rows
+        if append:
+            if self._fits:
+                self._read_fits()
+            else:
+                self._nrows = resume_csv_file(outfile)
+
+        # Return
+        return
+
+    def __enter__(self):
+        """
+        Enter context
+        """
+        return self
+
+    def __exit__(self, type, value, traceback):
+        """
+        Exit context
+        """
+        self.close()
+        return False
+
+    def _read_fits(self):
+        """
+        Read rows from existing FITS file
+        """
+        # Continue only if file exists
+        if os.path.isfile(self._outfile):
+
+            # Get results table
+            fits  = gammalib.GFits(self._outfile)
+            table = fits.table('RESULTS')
+
+            # Get column names
+            self._colnames = [table[i].name() for i in range(table.ncols())]
+
+            # Read rows
+            for row in range(table.nrows()):
+                values = {}
+                for colname in self._colnames:
+                    values[colname] = table[colname].real(row)
+                self._rows.append(values)
+
+            # Set number of rows
+            self._nrows = len(self._rows)
+
+            # Close FITS file
+            fits.close()
+
+        # Return
+        return
+
+    def _write_csv(self):
+        """
+        Write buffered rows into CSV file
+        """
+        # If file is not yet open then open it. If no rows exist so far
+        # then create a new file and write the header, otherwise append
+        # to the existing file.
+        if self._file is None:
+            if self._nrows == len(self._buffer):
+                self._file   = open(self._outfile, 'w')
+                self._writer = csv.DictWriter(self._file, self._colnames)
+                headers = {}
+                for colname in self._colnames:
+                    headers[colname] = colname
+                self._writer.writerow(headers)
+            else:
+                self._file   = open(self._outfile, 'a')
+                self._writer = csv.DictWriter(self._file, self._colnames)
+
+        # Write buffered rows
+        for values in self._buffer:
+            self._writer.writerow(values)
+
+        # Flush file and synchronise it to disk
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        # Return
+        return
+
+    def _write_fits(self):
+        """
+        Write all rows into FITS file
+        """
+        # Append buffered rows to rows
+        self._rows.extend(self._buffer)
+
+        # Create binary table
+        nrows = len(self._rows)
+        table = gammalib.GFitsBinTable(nrows)
+        table.extname('RESULTS')
+        for colname in self._colnames:
+            column = gammalib.GFitsTableDoubleCol(colname, nrows)
+            for row, values in enumerate(self._rows):
+                column[row] = float(values[colname])
+            table.append(column)
+
+        # Write FITS file into temporary file
+        tmpfile = self._outfile+'.tmp'
+        fits    = gammalib.GFits()
+        fits.append(table)
+        fits.saveto(tmpfile, True)
+        fits.close()
+
+        # Synchronise temporary file to disk
+        _fsync_path(tmpfile)
+
+        # Replace output file by temporary file and synchronise the directory
+        # to disk so that the renaming survives a crash
+        os.rename(tmpfile, self._outfile)
+        _fsync_path(os.path.dirname(os.path.abspath(self._outfile)))
+
+        # Return
+        return
+
+    def nrows(self):
+        """
+        Return number of rows
+
+        Returns
+        -------
+        nrows : int
+            Number of rows, including the rows that exist in the output file
+            and the buffered rows
+        """
+        return self._nrows
+
+    def write(self, colnames, values):
+        """
+        Write one row
+
+        Parameters
+        ----------
+        colnames : list of str
+            Column names
+        values : dict
+            Column values
+        """
+        # Set column names from the first row
+        if len(self._colnames) == 0:
+            self._colnames = list(colnames)
+
+        # Buffer row
+        self._buffer.append(values)
+        self._nrows += 1
+
+        # Set number of buffered rows for a checkpoint. Since a FITS file
+        # is entirely rewritten at each checkpoint, the number of buffered
+        # rows grows with the number of rows in the file.
+        nbuffer = self._nbuffer
+        if self._fits:
+            nbuffer = max(nbuffer, len(self._rows))
+
+        # Flush rows at checkpoint
+        if len(self._buffer) >= nbuffer or \
+           time.time() - self._time >= self._interval:
+            self.flush()
+
+        # Return
+        return
+
+    def flush(self):
+        """
+        Write buffered rows into output file
+        """
+        # Write buffered rows
+        if len(self._buffer) > 0:
+            if self._fits:
+                self._write_fits()
+            else:
+                self._write_csv()
+
+        # Clear buffer and set time of checkpoint
+        self._buffer = []
+        self._time   = time.time()
+
+        # Return
+        return
+
+    def close(self):
+        """
+        Write buffered rows and close output file
+        """
+        # Write buffered rows
+        self.flush()
+
+        # Close file
+        if self._file is not None:
+            self._file.close()
+            self._file   = None
+            self._writer = None
+
+        # Return
+        return
+
+
+# ============================= #
+# Synchronise file path to disk #
+# ============================= #
+def _fsync_path(path):
+    """
+    Synchronise a file or directory to disk
+
+    Parameters
+    ----------
+    path : str
+        File or directory name
+    """
+    # Open path, synchronise it and close it. Directories can not be opened
+    # on all platforms, in which case nothing is done.
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+    # Return
+    return
+
+
+# =================================== #
+# Prepare CSV file for resuming a run #
+# =================================== #
+def resume_csv_file(outfile):
+    """
+    Prepare CSV file for resuming a run
+
+    Returns the number of complete data rows in a CSV file that was written
+    using write_csv_row(). Incomplete rows at the end of the file, which may
+    result from a killed job, are removed from the file so that the run can
+    be resumed by appending rows.
+
+    Parameters
+    ----------
+    outfile : str
+        Output file name
+
+    Returns
+    -------
+    nrows : int
+        Number of complete data rows
+    """
+    # If the file does not exist then there are no rows
+    if not os.path.isfile(outfile):
+        return 0
+
+    # Read all lines of the file
+    f     = open(outfile, 'r')
+    lines = f.readlines()
+    f.close()
+
+    # If the file has no header then there are no rows
+    if len(lines) == 0:
+        return 0
+
+    # Determine number of columns from header
+    ncols = len(lines[0].split(','))
+
+    # Keep all complete data rows. A row is complete if it has the expected
+    # number of columns and is terminated by a newline character.
+    nrows = 0
+    for line in lines[1:]:
+        if not line.endswith('\n') or len(line.split(',')) != ncols:
+            break
+        nrows += 1
+
+    # If incomplete rows were found then rewrite the file
+    if nrows < len(lines)-1:
+        f = open(outfile, 'w')
+        f.writelines(lines[:nrows+1])
+        f.close()
+
+    # Return number of complete data rows
+    return nrows
+
+
 # ================ #
 # Read pull values #
 # ================ #
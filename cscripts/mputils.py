@@ -0,0 +1,138 @@
+# ==========================================================================
+# Utility functions for multiprocessing
+#
+# Copyright (C) 2026 Juergen Knoedlseder
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# ==========================================================================
+import multiprocessing as mp
+
+
+# ========================================= #
+# Function executed by the worker processes #
+# ========================================= #
+_mp_function = None
+
+
+# ======================================== #
+# Execute function within a worker process #
+# ======================================== #
+def _mp_call(arg):
+    """
+    Execute function within a worker process
+
+    Parameters
+    ----------
+    arg : object
+        Function argument
+
+    Returns
+    -------
+    result : object
+        Function result
+    """
+    # Return function result
+    return _mp_function(arg)
+
+
+# ========================== #
+# Return number of processes #
+# ========================== #
+def nprocs(nthreads):
+    """
+    Return number of processes
+
+    Parameters
+    ----------
+    nthreads : int
+        Requested number of processes (0=use all available CPUs)
+
+    Returns
+    -------
+    nprocs : int
+        Number of processes
+    """
+    # Use all available CPUs if the requested number is not positive
+    if nthreads < 1:
+        try:
+            nthreads = mp.cpu_count()
+        except NotImplementedError:
+            nthreads = 1
+
+    # Return number of processes
+    return nthreads
+
+
+# ================================= #
+# Process arguments in process pool #
+# ================================= #
+def process(nthreads, function, args):
+    """
+    Process arguments in a pool of worker processes
+
+    The function is executed for all arguments using a pool of forked worker
+    processes. Since the worker processes are forked, the function may be a
+    bound method of an object that holds GammaLib instances, which do not
+    need to be pickled. Only the arguments and the function results are
+    exchanged between processes and need to be picklable.
+
+    The function is a generator that yields the function results in the
+    order of the arguments as soon as they become available, so that results
+    can be written out while the remaining arguments are still processed.
+
+    Since every worker process already uses one CPU, the function should
+    run the tools with a single thread to avoid oversubscribing the CPUs.
+    Note that forking a process after OpenMP has been used by the parent
+    process is not supported by all OpenMP runtimes.
+
+    Parameters
+    ----------
+    nthreads : int
+        Number of worker processes (0=use all available CPUs)
+    function : callable
+        Function that takes a single argument
+    args : list
+        List of arguments
+
+    Returns
+    -------
+    results : generator
+        Function results in the order of the arguments
+    """
+    # Set function that is executed by the worker processes. This needs to
+    # be done before the pool is created so that the forked processes
+    # inherit the function.
+    global _mp_function
+    _mp_function = function
+
+    # Use fork context if available
+    if hasattr(mp, 'get_context'):
+        context = mp.get_context('fork')
+    else:
+        context = mp
+
+    # Create pool of worker processes
+    pool = context.Pool(processes=nprocs(nthreads))
+
+    # Yield results in the order of the arguments
+    try:
+        for result in pool.imap(_mp_call, args):
+            yield result
+
+    # Shut down the pool and reset function
+    finally:
+        pool.terminate()
+        pool.join()
+        _mp_function = None
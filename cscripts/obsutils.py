@@ -27,17 +27,19 @@ import ctools
 # ===================== #
 def sim(obs, log=False, debug=False, chatter=2, edisp=False, seed=0,
         emin=None, emax=None, nbins=0, addbounds=False,
-        binsz=0.05, npix=200, proj='TAN', coord='GAL'):
+        binsz=0.05, npix=200, proj='TAN', coord='GAL', nthreads=0):
     """
     Simulate events for all observations in the container
 
     Simulate events for all observations using ctobssim. If the number of
-    energy bins is positive, the events are binned into a counts cube using
-    ctbin. If multiple observations are simulated, the counts cube is a
-    stacked cube and the corresponding response cubes are computed using
-    ctexpcube, ctpsfcube, ctbkgcube and optionally ctedispcube. The response
-    cubes are attached to the first observation in the container, which
-    normally is the observation with the counts cube.
+    energy bins is positive, an empty counts cube is set up using ctbin
+    and ctobssim draws the counts in each bin directly from the predicted
+    number of counts, which is statistically equivalent to simulating and
+    binning events. If multiple observations are simulated, the counts cube
+    is a stacked cube and the corresponding response cubes are computed
+    using ctexpcube, ctpsfcube, ctbkgcube and optionally ctedispcube. The
+    response cubes are attached to the first observation in the container,
+    which normally is the observation with the counts cube.
 
     Parameters
     ----------
@@ -69,18 +71,41 @@ def sim(obs, log=False, debug=False, chatter=2, edisp=False, seed=0,
         Projection for binned simulation
     coord : str, optional
         Coordinate system for binned simulation
+    nthreads : int, optional
+        Number of threads for the simulation (0=use all available)
 
     Returns
     -------
     obs : `~gammalib.GObservations`
         Observation container filled with simulated events
     """
-    # Allocate ctobssim application and set parameters
-    sim = ctools.ctobssim(obs)
-    sim['seed']    = seed
-    sim['edisp']   = edisp
-    sim['chatter'] = chatter
-    sim['debug']   = debug
+    # Binned option?
+    if nbins > 0:
+
+        # Set up an empty counts cube, including the stacked response for
+        # multiple observations
+        binned = set_binned_obs(obs, log=log, debug=debug, chatter=chatter,
+                                edisp=edisp, emin=emin, emax=emax,
+                                nbins=nbins, addbounds=addbounds,
+                                binsz=binsz, npix=npix, proj=proj,
+                                coord=coord)
+
+        # Allocate ctobssim application and set parameters. Since the
+        # observation is binned, ctobssim draws the counts in each bin
+        # directly from the predicted number of counts.
+        sim = ctools.ctobssim(binned)
+
+    else:
+
+        # Allocate ctobssim application
+        sim = ctools.ctobssim(obs)
+
+    # Set ctobssim parameters
+    sim['seed']     = seed
+    sim['edisp']    = edisp
+    sim['nthreads'] = nthreads
+    sim['chatter']  = chatter
+    sim['debug']    = debug
 
     # Optionally open the log file
     if log:
@@ -92,81 +117,10 @@ def sim(obs, log=False, debug=False, chatter=2, edisp=False, seed=0,
     # separately.
     sim.run()
 
-    # Binned option?
-    if nbins > 0:
-
-        # If energy boundaries are not given then determine the minimum and
-        # the maximum energies from all observations and use these values
-        # as energy boundaries. The energy boundaries are given in TeV.
-        if emin == None or emax == None:
-            emin = 1.0e30
-            emax = 0.0
-            for run in sim.obs():
-                emin = min(run.events().ebounds().emin().TeV(), emin)
-                emax = max(run.events().ebounds().emax().TeV(), emax)
-
-        # Allocate ctbin application and set parameters
-        bin = ctools.ctbin(sim.obs())
-        bin['ebinalg']  = 'LOG'
-        bin['emin']     = emin
-        bin['emax']     = emax
-        bin['enumbins'] = nbins
-        bin['usepnt']   = True # Use pointing for map centre
-        bin['nxpix']    = npix
-        bin['nypix']    = npix
-        bin['binsz']    = binsz
-        bin['coordsys'] = coord
-        bin['proj']     = proj
-        bin['chatter']  = chatter
-        bin['debug']    = debug
-
-        # Optionally open the log file
-        if log:
-            bin.logFileOpen()
-
-        # Run ctbin application. This will loop over all observations in
-        # the container and bin the events in counts maps
-        bin.run()
-
-        # If we have multiple input observations then create stacked response
-        # cubes and append them to the observation
-        if len(sim.obs()) > 1:
-
-            # Get stacked response (use pointing for map centre)
-            response = get_stacked_response(sim.obs(), None, None,
-                                            binsz=binsz, nxpix=npix, nypix=npix,
-                                            emin=emin, emax=emax, enumbins=nbins,
-                                            edisp=edisp,
-                                            coordsys=coord, proj=proj,
-                                            addbounds=addbounds,
-                                            log=log, debug=debug,
-                                            chatter=chatter)
-
-            # Set stacked response
-            if edisp:
-                bin.obs()[0].response(response['expcube'],
-                                      response['psfcube'],
-                                      response['edispcube'],
-                                      response['bkgcube'])
-            else:
-                bin.obs()[0].response(response['expcube'],
-                                      response['psfcube'],
-                                      response['bkgcube'])
-
-            # Set new models
-            bin.obs().models(response['models'])
-
-        # Make a deep copy of the observation that will be returned
-        # (the ctbin object will go out of scope one the function is
-        # left)
-        obs = bin.obs().copy()
-
-    else:
-
-        # Make a deep copy of the observation that will be returned
-        # (the ctobssim object will go out of scope one the function is
-        # left)
-        obs = sim.obs().copy()
+    # Make a deep copy of the observation that will be returned
+    # (the ctobssim object will go out of scope one the function is
+    # left)
+    obs = sim.obs().copy()
 
     # Delete the simulation
     del sim
@@ -175,6 +129,121 @@ def sim(obs, log=False, debug=False, chatter=2, edisp=False, seed=0,
     return obs
 
 
+# ============================================ #
+# Set up binned observation without any events #
+# ============================================ #
+def set_binned_obs(obs, log=False, debug=False, chatter=2, edisp=False,
+                   emin=None, emax=None, nbins=20, addbounds=False,
+                   binsz=0.05, npix=200, proj='TAN', coord='GAL'):
+    """
+    Set up a binned observation with an empty counts cube
+
+    Sets up an empty counts cube for all observations in the container using
+    ctbin. If the container holds multiple observations, the counts cube is
+    a stacked cube and the corresponding response cubes and models are
+    attached to the binned observation.
+
+    Parameters
+    ----------
+    obs : `~gammalib.GObservations`
+        Observation container without events
+    log : bool, optional
+        Create log file(s)
+    debug : bool, optional
+        Create console dump?
+    chatter : int, optional
+        Chatter level
+    edisp : bool, optional
+        Apply energy dispersion?
+    emin : float, optional
+        Minimum energy of counts cube (TeV)
+    emax : float, optional
+        Maximum energy of counts cube (TeV)
+    nbins : int, optional
+        Number of energy bins
+    addbounds : bool, optional
+        Add boundaries at observation energies
+    binsz : float, optional
+        Pixel size (deg/pixel)
+    npix : int, optional
+        Number of pixels in X and Y
+    proj : str, optional
+        Projection
+    coord : str, optional
+        Coordinate system
+
+    Returns
+    -------
+    obs : `~gammalib.GObservations`
+        Observation container with a single binned observation
+    """
+    # If energy boundaries are not given then determine the minimum and
+    # the maximum energies from all observations and use these values
+    # as energy boundaries. The energy boundaries are given in TeV.
+    if emin == None or emax == None:
+        emin = 1.0e30
+        emax = 0.0
+        for run in obs:
+            emin = min(run.events().ebounds().emin().TeV(), emin)
+            emax = max(run.events().ebounds().emax().TeV(), emax)
+
+    # Allocate ctbin application and set parameters. Since the
+    # observations do not contain any events, ctbin only sets up the
+    # counts cube geometry, the weights and the Good Time Intervals.
+    bin = ctools.ctbin(obs)
+    bin['ebinalg']  = 'LOG'
+    bin['emin']     = emin
+    bin['emax']     = emax
+    bin['enumbins'] = nbins
+    bin['usepnt']   = True # Use pointing for map centre
+    bin['nxpix']    = npix
+    bin['nypix']    = npix
+    bin['binsz']    = binsz
+    bin['coordsys'] = coord
+    bin['proj']     = proj
+    bin['chatter']  = chatter
+    bin['debug']    = debug
+
+    # Optionally open the log file
+    if log:
+        bin.logFileOpen()
+
+    # Run ctbin application. This will loop over all observations in
+    # the container and set up an empty counts cube
+    bin.run()
+
+    # If we have multiple input observations then create stacked response
+    # cubes and append them to the observation
+    if len(obs) > 1:
+
+        # Get stacked response (use pointing for map centre)
+        response = get_stacked_response(obs, None, None,
+                                        binsz=binsz, nxpix=npix, nypix=npix,
+                                        emin=emin, emax=emax, enumbins=nbins,
+                                        edisp=edisp,
+                                        coordsys=coord, proj=proj,
+                                        addbounds=addbounds,
+                                        log=log, debug=debug,
+                                        chatter=chatter)
+
+        # Set stacked response
+        if edisp:
+            bin.obs()[0].response(response['expcube'],
+                                  response['psfcube'],
+                                  response['edispcube'],
+                                  response['bkgcube'])
+        else:
+            bin.obs()[0].response(response['expcube'],
+                                  response['psfcube'],
+                                  response['bkgcube'])
+
+        # Set new models
+        bin.obs().models(response['models'])
+
+    # Return binned observation container
+    return bin.obs().copy()
+
+
 # ======================= #
 # Set one CTA observation #
 # ======================= #
@@ -476,6 +545,17 @@ def get_stacked_response(obs, xref, yref, binsz=0.05, nxpix=200, nypix=200,
     If the xref or yref arguments are "None" the response cube centre will be
     determined from the pointing information in the observation container.
 
+    The response cubes are built directly from the observation container
+    without running ctexpcube, ctpsfcube, ctbkgcube and ctedispcube. The cube
+    geometry and energies are determined once and are shared by all cubes,
+    each cube is allocated only once, and the observation container is not
+    copied. Each cube is still filled by its own loop over the observations,
+    hence the instrument response functions are evaluated separately for
+    each cube. The mean pointing,
+    the energy boundary insertion and the background model handling are
+    delegated to the corresponding ctools methods, and the log files of the
+    tools are used for logging.
+
     Parameters
     ----------
     obs : `~gammalib.GObservations`
@@ -516,18 +596,37 @@ def get_stacked_response(obs, xref, yref, binsz=0.05, nxpix=200, nypix=200,
     result : dict
         Dictionary of response cubes
     """
-    # If no xref and yref arguments have been specified then use the pointing
-    # information
-    if xref == None or yref == None:
-        usepnt = True
-    else:
-        usepnt = False
-
     # Set number of energy bins to at least 30 per energy decade
     _enumbins = int((math.log10(emax) - math.log10(emin)) * 30.0)
     if enumbins > _enumbins:
         _enumbins = enumbins
 
+    # Allocate tools that provide the helper methods and the loggers for
+    # the response cubes. The tools are not run, hence the observation
+    # container is not copied.
+    tools = {'expcube': ctools.ctexpcube(),
+             'psfcube': ctools.ctpsfcube(),
+             'bkgcube': ctools.ctbkgcube()}
+    if edisp:
+        tools['edispcube'] = ctools.ctedispcube()
+
+    # Set tool parameters and optionally open the log files
+    loggers = {}
+    for name, tool in tools.items():
+        tool['chatter'] = chatter
+        tool['debug']   = debug
+        if log:
+            tool.logFileOpen()
+        if debug:
+            tool._log.cout(True)
+        loggers[name] = tool._log if (log or debug) and chatter > 1 else None
+
+    # Get response cube centre and energies that are shared by all cubes
+    xref, yref, energies = _get_stacked_geometry(tools['bkgcube'], obs,
+                                                 xref, yref, emin, emax,
+                                                 _enumbins, coordsys,
+                                                 addbounds)
+
     # Compute spatial binning for point spread function and energy dispersion
     # cubes. The spatial binning is 10 times coarser than the spatial binning
     # of the exposure and background cubes. At least 2 spatial are required.
@@ -535,112 +634,116 @@ def get_stacked_response(obs, xref, yref, binsz=0.05, nxpix=200, nypix=200,
     psf_nxpix = max(nxpix // 10, 2)  # Make sure result is int
     psf_nypix = max(nypix // 10, 2)  # Make sure result is int
 
-    # Create exposure cube
-    expcube = ctools.ctexpcube(obs)
-    expcube['incube']    = 'NONE'
-    expcube['usepnt']    = usepnt
-    expcube['ebinalg']   = 'LOG'
-    expcube['binsz']     = binsz
-    expcube['nxpix']     = nxpix
-    expcube['nypix']     = nypix
-    expcube['enumbins']  = _enumbins
-    expcube['emin']      = emin
-    expcube['emax']      = emax
-    expcube['coordsys']  = coordsys
-    expcube['proj']      = proj
-    expcube['addbounds'] = addbounds
-    expcube['debug']     = debug
-    expcube['chatter']   = chatter
-    if not usepnt:
-        expcube['xref'] = xref
-        expcube['yref'] = yref
-    if log:
-        expcube.logFileOpen()
-    expcube.run()
-
-    # Create point spread function cube
-    psfcube = ctools.ctpsfcube(obs)
-    psfcube['incube']    = 'NONE'
-    psfcube['usepnt']    = usepnt
-    psfcube['ebinalg']   = 'LOG'
-    psfcube['binsz']     = psf_binsz
-    psfcube['nxpix']     = psf_nxpix
-    psfcube['nypix']     = psf_nypix
-    psfcube['enumbins']  = _enumbins
-    psfcube['emin']      = emin
-    psfcube['emax']      = emax
-    psfcube['coordsys']  = coordsys
-    psfcube['proj']      = proj
-    psfcube['addbounds'] = addbounds
-    psfcube['debug']     = debug
-    psfcube['chatter']   = chatter
-    if not usepnt:
-        psfcube['xref'] = xref
-        psfcube['yref'] = yref
-    if log:
-        psfcube.logFileOpen()
-    psfcube.run()
-
-    # Create background cube
-    bkgcube = ctools.ctbkgcube(obs)
-    bkgcube['incube']    = 'NONE'
-    bkgcube['usepnt']    = usepnt
-    bkgcube['ebinalg']   = 'LOG'
-    bkgcube['binsz']     = binsz
-    bkgcube['nxpix']     = nxpix
-    bkgcube['nypix']     = nypix
-    bkgcube['enumbins']  = _enumbins
-    bkgcube['emin']      = emin
-    bkgcube['emax']      = emax
-    bkgcube['coordsys']  = coordsys
-    bkgcube['proj']      = proj
-    bkgcube['addbounds'] = addbounds
-    bkgcube['debug']     = debug
-    bkgcube['chatter']   = chatter
-    if not usepnt:
-        bkgcube['xref'] = xref
-        bkgcube['yref'] = yref
-    if log:
-        bkgcube.logFileOpen()
-    bkgcube.run()
-
-    # If energy dispersion is requested then create energy dispersion cube
-    if edisp:
-        edispcube = ctools.ctedispcube(obs)
-        edispcube['incube']    = 'NONE'
-        edispcube['usepnt']    = usepnt
-        edispcube['ebinalg']   = 'LOG'
-        edispcube['binsz']     = psf_binsz
-        edispcube['nxpix']     = psf_nxpix
-        edispcube['nypix']     = psf_nypix
-        edispcube['enumbins']  = _enumbins
-        edispcube['emin']      = emin
-        edispcube['emax']      = emax
-        edispcube['coordsys']  = coordsys
-        edispcube['proj']      = proj
-        edispcube['addbounds'] = addbounds
-        edispcube['debug']     = debug
-        edispcube['chatter']   = chatter
-        if not usepnt:
-            edispcube['xref'] = xref
-            edispcube['yref'] = yref
-        if log:
-            edispcube.logFileOpen()
-        edispcube.run()
+    # Allocate response cubes
+    expcube = gammalib.GCTACubeExposure(proj, coordsys, xref, yref,
+                                        -binsz, binsz, nxpix, nypix,
+                                        energies)
+    psfcube = gammalib.GCTACubePsf(proj, coordsys, xref, yref,
+                                   -psf_binsz, psf_binsz,
+                                   psf_nxpix, psf_nypix, energies,
+                                   0.3, 200)
+    bkgcube = gammalib.GCTACubeBackground(proj, coordsys, xref, yref,
+                                          -binsz, binsz, nxpix, nypix,
+                                          energies)
+
+    # Fill exposure and point spread function cubes
+    expcube.fill(obs, loggers['expcube'])
+    psfcube.fill(obs, loggers['psfcube'])
+
+    # Fill background cube using only the CTA background models of the
+    # observation container and get the output models
+    models = tools['bkgcube']._fill_cube(obs, bkgcube)
 
     # Build response dictionary
     response = {}
-    response['expcube'] = expcube.expcube().copy()
-    response['psfcube'] = psfcube.psfcube().copy()
-    response['bkgcube'] = bkgcube.bkgcube().copy()
-    response['models']  = bkgcube.models().copy()
+    response['expcube'] = expcube
+    response['psfcube'] = psfcube
+    response['bkgcube'] = bkgcube
+    response['models']  = models
+
+    # If energy dispersion is requested then create energy dispersion cube
     if edisp:
-        response['edispcube'] = edispcube.expcube().copy()
+        edispcube = gammalib.GCTACubeEdisp(proj, coordsys, xref, yref,
+                                           -psf_binsz, psf_binsz,
+                                           psf_nxpix, psf_nypix, energies,
+                                           2.0, 100)
+        edispcube.fill(obs, loggers['edispcube'])
+        response['edispcube'] = edispcube
 
     # Return response cubes
     return response
 
 
+# ============================================= #
+# Get stacked response cube centre and energies #
+# ============================================= #
+def _get_stacked_geometry(tool, obs, xref, yref, emin, emax, enumbins,
+                          coordsys, addbounds):
+    """
+    Get stacked response cube centre and energies
+
+    The mean pointing is computed if no response centre was specified, and
+    the energy boundaries of all event lists are inserted into the
+    logarithmically spaced energies if requested. Both are computed using
+    the corresponding methods of the ``tool`` so that the result is
+    identical to the one of the ctools.
+
+    Parameters
+    ----------
+    tool : `~ctools.ctool`
+        Tool providing the helper methods
+    obs : `~gammalib.GObservations`
+        Observation container
+    xref : float
+        Right Ascension or Galactic longitude of response centre (deg)
+    yref : float
+        Declination or Galactic latitude of response centre (deg)
+    emin : float
+        Minimum energy (TeV)
+    emax : float
+        Maximum energy (TeV)
+    enumbins : int
+        Number of energy bins
+    coordsys : str
+        Coordinate system
+    addbounds : bool
+        Add boundaries at observation energies
+
+    Returns
+    -------
+    xref, yref, energies : tuple of float, float, `~gammalib.GEnergies`
+        Response cube centre and energies
+    """
+    # Set logarithmically spaced energies
+    ebounds  = gammalib.GEbounds(enumbins, gammalib.GEnergy(emin, 'TeV'),
+                                           gammalib.GEnergy(emax, 'TeV'))
+    energies = gammalib.GEnergies()
+    for i in range(ebounds.size()):
+        energies.append(ebounds.emin(i))
+    energies.append(ebounds.emax())
+
+    # Optionally insert event list energy boundaries of all CTA observations
+    if addbounds:
+        for run in obs:
+            if run.classname() == 'GCTAObservation' and \
+               run.eventtype() == 'EventList':
+                energies = tool._insert_energy_boundaries(energies, run)
+
+    # If no xref and yref arguments have been specified then set the response
+    # cube centre from the mean pointing
+    if xref == None or yref == None:
+        pnt = tool._get_mean_pointing(obs)
+        if coordsys.upper() == 'GAL':
+            xref = pnt.l_deg()
+            yref = pnt.b_deg()
+        else:
+            xref = pnt.ra_deg()
+            yref = pnt.dec_deg()
+
+    # Return centre and energies
+    return xref, yref, energies
+
+
 # ================================= #
 # Get stacked observation container #
 # ================================= #
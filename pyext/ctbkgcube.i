@@ -50,6 +50,12 @@ public:
     void                      publish(const std::string& name = "");
     const GCTACubeBackground& bkgcube(void) const;
     const GModels&            models(void) const;
+
+    // Make methods private in Python by prepending an underscore
+    %rename(_fill_cube) fill_cube;
+
+    // Protected methods
+    GModels fill_cube(GObservations& obs, GCTACubeBackground& cube);
 };
 
 /***********************************************************************//**
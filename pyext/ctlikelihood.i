@@ -90,6 +90,10 @@ public:
     // Methods
     const GOptimizer* opt(void) const;
 
+    // Static methods
+    static void clear_profile_cache(void);
+    static int  profile_cache_size(void);
+
     // Make methods private in Python by prepending an underscore
     %rename(_evaluate) evaluate;
 
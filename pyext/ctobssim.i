@@ -50,6 +50,12 @@ public:
     void          publish(const std::string& name = "");
     const double& max_rate(void) const;
     void          max_rate(const double& max_rate);
+
+    // Make methods private in Python by prepending an underscore
+    %rename(_merge_events) merge_events;
+
+    // Protected methods
+    void merge_events(GObservations& obs, const GObservations& merge);
 };
 
 
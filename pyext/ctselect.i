@@ -44,10 +44,14 @@ public:
     virtual ~ctselect(void);
 
     // Methods
-    void clear(void);
-    void run(void);
-    void save(void);
-    void publish(const std::string& name = "");
+    void                 clear(void);
+    void                 run(void);
+    void                 save(void);
+    void                 publish(const std::string& name = "");
+    void                 time_bins(const GGti& bins);
+    void                 energy_bins(const GEbounds& bins);
+    int                  nbins(void) const;
+    const GObservations& bin_obs(const int& index) const;
 };
 
 
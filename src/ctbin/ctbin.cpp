@@ -29,19 +29,28 @@
 #include <config.h>
 #endif
 #include <cstdio>
+#include <cmath>
+#include <algorithm>
 #include "ctbin.hpp"
 #include "GTools.hpp"
+#ifdef _OPENMP
+#include <omp.h>
+#endif
 
 /* __ Method name definitions ____________________________________________ */
+#define G_RUN                                                  "ctbin::run()"
 #define G_GET_PARAMETERS                            "ctbin::get_parameters()"
-#define G_FILL_CUBE                      "ctbin::fill_cube(GCTAObservation*)"
+#define G_FILL_CUBE                    "ctbin::fill_cube(GCTAObservation*, "\
+                           "std::vector<std::vector<double> >&, const bool&)"
 #define G_SET_WEIGHTS                  "ctbin::set_weights(GCTAObservation*)"
+#define G_LOAD_CUBE                                    "ctbin::load_cube()"
 
 /* __ Debug definitions __________________________________________________ */
 
 /* __ Coding definitions _________________________________________________ */
 
 /* __ Constants __________________________________________________________ */
+const int g_block_size = 1024;  //!< Number of events per binning block
 
 
 /*==========================================================================
@@ -253,24 +262,72 @@ void ctbin::run(void)
     // Write header into logger
     log_header1(TERSE, gammalib::number("Bin observation", m_obs.size()));
 
+    // Determine number of threads
+    int nthreads = 1;
+    #ifdef _OPENMP
+    nthreads = omp_get_max_threads();
+    #endif
+
+    // Allocate one partial counts cube per thread. The partial counts cubes
+    // are allocated by the threads on first use and are reused for all
+    // observations, and they are added to the counts cube once all
+    // observations were binned.
+    std::vector<std::vector<double> > partial(nthreads);
+
+    // If there are at least as many observations as threads then distribute
+    // the observations over the threads, otherwise distribute the events of
+    // each observation over the threads
+    bool parallel_obs = (nthreads > 1 && obs_list.size() >= nthreads);
+
+    // Initialise error message. Exceptions can not be thrown out of a
+    // parallel region, hence we keep the first error message and throw an
+    // exception after the parallel region.
+    std::string error;
+
     // Loop over all unbinned CTA observations in the container
-    #pragma omp parallel for
+    #pragma omp parallel for schedule(dynamic) num_threads(nthreads) \
+                             if(parallel_obs)
     for (int i = 0; i < obs_list.size(); ++i) {
 
         // Get pointer to observation
         GCTAObservation* obs = obs_list[i];
 
-        // Fill the cube
-        fill_cube(obs);
-
-        // Set the counts cube weights
-        set_weights(obs);
+        // Fill the cube and set the counts cube weights
+        try {
+            fill_cube(obs, partial, !parallel_obs);
+            set_weights(obs);
+        }
+        catch (std::exception& e) {
+            #pragma omp critical(ctbin_run)
+            {
+                if (error.empty()) {
+                    error = e.what();
+                }
+            }
+        }
 
         // Dispose events to free memory
         obs->dispose_events();
 
     } // endfor: looped over observations
 
+    // Throw exception if binning failed for one of the observations
+    if (!error.empty()) {
+        throw GException::invalid_value(G_RUN, error);
+    }
+
+    // Add partial counts cubes to counts cube
+    double*   pixels = m_counts.pixels();
+    const int nbins  = m_counts.npix() * m_counts.nmaps();
+    #pragma omp parallel for num_threads(nthreads)
+    for (int k = 0; k < nbins; ++k) {
+        for (int ithread = 0; ithread < partial.size(); ++ithread) {
+            if (!partial[ithread].empty()) {
+                pixels[k] += partial[ithread][k];
+            }
+        }
+    }
+
     // Build event cube (needs to come before obs_cube() since this method
     // relies on correct setting of m_cube)
     m_cube = GCTAEventCube(m_counts, m_weights, m_ebounds, m_gti);
@@ -368,6 +425,7 @@ void ctbin::publish(const std::string& name)
 void ctbin::init_members(void)
 {
     // Initialise members
+    m_incube.clear();
     m_outcube.clear();
     m_usepnt  = false;
     m_publish = false;
@@ -379,12 +437,10 @@ void ctbin::init_members(void)
     m_ebounds.clear();
     m_gti.clear();
     m_cube.clear();
+    m_pointing.clear();
     m_ontime   = 0.0;
     m_livetime = 0.0;
 
-    // Initialise cache members
-    m_dirs.clear();
-
     // Set CTA reference time
     m_gti.reference(m_cta_ref);
 
@@ -401,6 +457,7 @@ void ctbin::init_members(void)
 void ctbin::copy_members(const ctbin& app)
 {
     // Copy attributes
+    m_incube  = app.m_incube;
     m_outcube = app.m_outcube;
     m_usepnt  = app.m_usepnt;
     m_publish = app.m_publish;
@@ -412,12 +469,10 @@ void ctbin::copy_members(const ctbin& app)
     m_ebounds  = app.m_ebounds;
     m_gti      = app.m_gti;
     m_cube     = app.m_cube;
+    m_pointing = app.m_pointing;
     m_ontime   = app.m_ontime;
     m_livetime = app.m_livetime;
 
-    // Copy cache members
-    m_dirs = app.m_dirs;
-
     // Return
     return;
 }
@@ -448,17 +503,34 @@ void ctbin::get_parameters(void)
     // information and do not accept counts cubes.
     setup_observations(m_obs, false, true, false);
 
-    // Create an event cube based on task parameters
-    GCTAEventCube cube = create_cube(m_obs);
+    // Get input counts cube filename
+    m_incube = (*this)["incube"].filename();
 
-    // Get the skymap from the cube and initialise all counts cube bins and
-    // weights to zero
-    m_counts  = cube.counts();
-    m_counts  = 0.0;
-    m_weights = m_counts;
+    // If an input counts cube was specified then append the events to the
+    // counts cube
+    if (!is_valid_filename(m_incube)) {
+        m_incube.clear();
+    }
+    if (!m_incube.is_empty()) {
+        load_cube();
+    }
+
+    // ... otherwise create an event cube based on task parameters
+    else {
+
+        // Create an event cube based on task parameters
+        GCTAEventCube cube = create_cube(m_obs);
 
-    // Get energy boundaries
-    m_ebounds = cube.ebounds();
+        // Get the skymap from the cube and initialise all counts cube bins
+        // and weights to zero
+        m_counts  = cube.counts();
+        m_counts  = 0.0;
+        m_weights = m_counts;
+
+        // Get energy boundaries
+        m_ebounds = cube.ebounds();
+
+    } // endelse: created event cube
 
     // Get remaining parameters
     m_publish = (*this)["publish"].boolean();
@@ -470,12 +542,8 @@ void ctbin::get_parameters(void)
         m_outcube = (*this)["outcube"].filename();
     }
 
-    // Cache sky directions in m_counts
-    m_dirs.resize(m_counts.npix());
-    for (int pix = 0; pix < m_counts.npix(); ++pix) {
-        m_dirs[pix] = m_counts.inx2dir(pix);
-        m_dirs[pix].radec(m_dirs[pix].ra(), m_dirs[pix].dec());
-    }
+    // Set counts cube map for determination of the pixels within the RoI
+    set_roi_map(m_counts);
 
     // Write parameters into logger
     log_parameters(TERSE);
@@ -486,16 +554,80 @@ void ctbin::get_parameters(void)
 
 
 /***********************************************************************//**
- * @brief Fill events into counts cube
+ * @brief Load input counts cube
+ *
+ * @exception GException::invalid_value
+ *            Input file does not contain a counts cube.
+ *
+ * Loads the counts cube, the weights, the energy boundaries, the Good Time
+ * Intervals and the ontime and livetime of the input counts cube, so that
+ * the events of the observations are appended to the input counts cube.
+ ***************************************************************************/
+void ctbin::load_cube(void)
+{
+    // Load input counts cube
+    GCTAObservation obs(m_incube.url());
+
+    // Make sure that the observation holds a counts cube. If this is not
+    // the case then throw an exception.
+    const GCTAEventCube* cube = dynamic_cast<const GCTAEventCube*>
+                                (obs.events());
+    if (cube == NULL) {
+        std::string msg = "Input file \""+m_incube.url()+"\" does not "
+                          "contain a counts cube. Please specify a counts "
+                          "cube to which the events should be appended.";
+        throw GException::invalid_value(G_LOAD_CUBE, msg);
+    }
+
+    // Get counts, weights, energy boundaries and Good Time Intervals
+    m_counts  = cube->counts();
+    m_weights = cube->weights();
+    m_ebounds = cube->ebounds();
+    m_gti     = cube->gti();
+
+    // Get ontime, livetime and pointing
+    m_ontime   = obs.ontime();
+    m_livetime = obs.livetime();
+    m_pointing = obs.pointing();
+
+    // Log input counts cube
+    log_header1(TERSE, "Input counts cube");
+    log_value(NORMAL, "Counts cube file", m_incube.url());
+    log_value(NORMAL, "Events in cube", cube->number());
+    log_value(NORMAL, "Ontime", gammalib::str(m_ontime)+" s");
+    log_value(NORMAL, "Livetime", gammalib::str(m_livetime)+" s");
+
+    // Return
+    return;
+}
+
+
+/***********************************************************************//**
+ * @brief Fill events into partial counts cubes
  *
  * @param[in] obs CTA observation.
+ * @param[in,out] partial Partial counts cubes of all threads.
+ * @param[in] parallel Distribute events over threads?
  *
  * @exception GException::invalid_value
  *            No event list or valid RoI found in observation.
  *
- * Fills the events from an event list into the counts cube.
+ * Fills the events from an event list into the partial counts cube of the
+ * calling thread. If @p parallel is true then the events are distributed
+ * over the available threads, and each thread fills its events into its
+ * own partial counts cube. A partial counts cube is allocated on first use
+ * and is reused for all observations, hence no synchronisation between the
+ * threads is needed for the individual events. The partial counts cubes are
+ * added to the counts cube by the run() method.
+ *
+ * The events are handled in blocks of events. For each block, the sky
+ * directions of all events within the RoI are first converted into counts
+ * cube pixels, and only if a conversion fails the events of the block are
+ * converted one by one to identify the events with an invalid WCS.
  ***************************************************************************/
-void ctbin::fill_cube(GCTAObservation* obs)
+void ctbin::fill_cube(GCTAObservation*                   obs,
+                      std::vector<std::vector<double> >& partial,
+                      const bool&                        parallel)
 {
     // Make sure that the observation holds a CTA event list. If this
     // is not the case then throw an exception.
@@ -523,6 +655,36 @@ void ctbin::fill_cube(GCTAObservation* obs)
     // Get counts cube usage flags
     std::vector<bool> usage = cube_layer_usage(m_ebounds, events->ebounds());
 
+    // Get RoI centre and cosine of RoI radius so that the RoI test can be
+    // done without computing any trigonometric inverse function
+    const GSkyDir& centre  = roi.centre().dir();
+    const double   cos_rad = std::cos(roi.radius() * gammalib::deg2rad);
+
+    // Cache energy boundaries in MeV for binary search of energy bins
+    int                 nebins = m_ebounds.size();
+    std::vector<double> emin(nebins);
+    std::vector<double> emax(nebins);
+    for (int k = 0; k < nebins; ++k) {
+        emin[k] = m_ebounds.emin(k).MeV();
+        emax[k] = m_ebounds.emax(k).MeV();
+    }
+
+    // Get counts cube dimensions
+    const int    npix = m_counts.npix();
+    const double xmax = m_counts.nx() - 0.5;
+    const double ymax = m_counts.ny() - 0.5;
+
+    // Determine number of event blocks
+    const int nevents = events->size();
+    const int nblocks = (nevents + g_block_size - 1) / g_block_size;
+
+    // Get index of calling thread. This is the index of the partial counts
+    // cube that is used if the events are not distributed over the threads.
+    int caller = 0;
+    #ifdef _OPENMP
+    caller = omp_get_thread_num();
+    #endif
+
     // Initialise binning statistics
     int num_outside_roi  = 0;
     int num_invalid_wcs  = 0;
@@ -530,74 +692,140 @@ void ctbin::fill_cube(GCTAObservation* obs)
     int num_outside_ebds = 0;
     int num_in_map       = 0;
 
-    // Fill counts sky map
-    for (int i = 0; i < events->size(); ++i) {
-
-        // Get event
-        const GCTAEventAtom* event = (*events)[i];
-
-        // Determine event sky direction
-        GCTAInstDir* inst = (GCTAInstDir*)&(event->dir());
-        GSkyDir      dir  = inst->dir();
-
-        // Skip event if it is outside the RoI
-        if (roi.centre().dir().dist_deg(dir) > roi.radius()) {
-            num_outside_roi++;
-            continue;
-        }
-
-        // Determine sky pixel
-        GSkyPixel pixel;
-        try {
-            pixel = m_counts.dir2pix(dir);
-        }
-        catch (std::exception &e) {
-            num_invalid_wcs++;
-            continue;
+    // Fill events into partial counts cubes
+    #pragma omp parallel num_threads(partial.size()) if(parallel)
+    {
+        // Get partial counts cube of the thread and allocate it on first use
+        int ithread = caller;
+        #ifdef _OPENMP
+        if (parallel) {
+            ithread = omp_get_thread_num();
         }
-
-        // Skip event if corresponding counts cube pixel is outside the
-        // counts cube map range
-        if (pixel.x() < -0.5 || pixel.x() > (m_counts.nx()-0.5) ||
-            pixel.y() < -0.5 || pixel.y() > (m_counts.ny()-0.5)) {
-            num_outside_map++;
-            continue;
+        #endif
+        std::vector<double>& counts = partial[ithread];
+        if (counts.empty()) {
+            counts.assign(npix * nebins, 0.0);
         }
 
-        // Determine counts cube energy bin
-        int iebin = m_ebounds.index(event->energy());
-
-        // Skip event if the corresponding counts cube energy bin is not
-        // fully contained in the event list energy range. This avoids
-        // having partially filled bins.
-        if (iebin == -1 || !usage[iebin]) {
-            num_outside_ebds++;
-            continue;
-        }
-
-        // Fill event in skymap
-        #pragma omp critical(ctbin_fill_cube)
-        m_counts(pixel, iebin) += 1.0;
-
-        // Increment number of maps
-        num_in_map++;
+        // Allocate block buffers
+        std::vector<const GCTAEventAtom*> block(g_block_size);
+        std::vector<GSkyPixel>            pixels(g_block_size);
+        std::vector<bool>                 valid(g_block_size);
+
+        // Loop over event blocks
+        #pragma omp for schedule(static) \
+                reduction(+:num_outside_roi,num_invalid_wcs,num_outside_map, \
+                            num_outside_ebds,num_in_map)
+        for (int iblock = 0; iblock < nblocks; ++iblock) {
+
+            // Collect all events of the block that are within the RoI
+            int istart = iblock * g_block_size;
+            int istop  = std::min(istart + g_block_size, nevents);
+            int nblock = 0;
+            for (int i = istart; i < istop; ++i) {
+                const GCTAEventAtom* event = (*events)[i];
+                const GCTAInstDir*   inst  = static_cast<const GCTAInstDir*>
+                                             (&(event->dir()));
+                if (centre.cos_dist(inst->dir()) < cos_rad) {
+                    num_outside_roi++;
+                    continue;
+                }
+                block[nblock++] = event;
+            }
 
-    } // endfor: looped over all events
+            // Convert sky directions of all events of the block into counts
+            // cube pixels. If the conversion fails for any event then
+            // convert the sky directions one by one to identify the events
+            // with an invalid WCS.
+            try {
+                for (int k = 0; k < nblock; ++k) {
+                    const GCTAInstDir* inst = static_cast<const GCTAInstDir*>
+                                              (&(block[k]->dir()));
+                    pixels[k] = m_counts.dir2pix(inst->dir());
+                    valid[k]  = true;
+                }
+            }
+            catch (std::exception &e) {
+                for (int k = 0; k < nblock; ++k) {
+                    const GCTAInstDir* inst = static_cast<const GCTAInstDir*>
+                                              (&(block[k]->dir()));
+                    try {
+                        pixels[k] = m_counts.dir2pix(inst->dir());
+                        valid[k]  = true;
+                    }
+                    catch (std::exception &e) {
+                        valid[k] = false;
+                    }
+                }
+            }
 
-    // Update time information
+            // Fill events of the block into partial counts cube
+            for (int k = 0; k < nblock; ++k) {
+
+                // Skip event if the sky direction could not be converted
+                if (!valid[k]) {
+                    num_invalid_wcs++;
+                    continue;
+                }
+
+                // Skip event if corresponding counts cube pixel is outside
+                // the counts cube map range
+                const GSkyPixel& pixel = pixels[k];
+                if (pixel.x() < -0.5 || pixel.x() > xmax ||
+                    pixel.y() < -0.5 || pixel.y() > ymax) {
+                    num_outside_map++;
+                    continue;
+                }
+
+                // Determine counts cube energy bin by binary search of the
+                // first energy bin with an upper boundary not below the
+                // event energy
+                double energy = block[k]->energy().MeV();
+                int    low    = 0;
+                int    high   = nebins;
+                while (low < high) {
+                    int mid = (low + high) / 2;
+                    if (emax[mid] < energy) {
+                        low = mid + 1;
+                    }
+                    else {
+                        high = mid;
+                    }
+                }
+                int iebin = (low < nebins && energy >= emin[low]) ? low : -1;
+
+                // Skip event if the corresponding counts cube energy bin is
+                // not fully contained in the event list energy range. This
+                // avoids having partially filled bins.
+                if (iebin == -1 || !usage[iebin]) {
+                    num_outside_ebds++;
+                    continue;
+                }
+
+                // Fill event in partial counts cube
+                counts[m_counts.pix2inx(pixel) + iebin * npix] += 1.0;
+
+                // Increment number of maps
+                num_in_map++;
+
+            } // endfor: looped over events of block
+
+        } // endfor: looped over event blocks
+
+    } // end pragma omp parallel
+
+    // Update time information and log filling results. This needs to be
+    // protected since the observations may be binned in parallel.
     #pragma omp critical(ctbin_fill_cube)
     {
-        // Append GTIs
+        // Update time information
         m_gti.extend(events->gti());
 
         // Update ontime and livetime
         m_ontime   += obs->ontime();
         m_livetime += obs->livetime();
-    }
 
-    // Log filling results
-    #pragma omp critical(ctbin_fill_cube)
-    {
+        // Log filling results
         log_header3(TERSE, get_obs_header(obs));
         log_value(NORMAL, "Events in list", obs->events()->size());
         log_value(NORMAL, "Events in cube", num_in_map);
@@ -621,7 +849,8 @@ void ctbin::fill_cube(GCTAObservation* obs)
  *            No event list or valid RoI found in observation.
  *
  * Sets the counts cube weights for all bins that are considered for the
- * specific observation to unity.
+ * specific observation to unity. Only the counts cube pixels within the
+ * RoI of the observation are visited.
  ***************************************************************************/
 void ctbin::set_weights(GCTAObservation* obs)
 {
@@ -651,13 +880,16 @@ void ctbin::set_weights(GCTAObservation* obs)
     // Get counts cube usage flags
     std::vector<bool> usage = cube_layer_usage(m_ebounds, events->ebounds());
 
-    // Loop over all pixels in counts cube
-    for (int pixel = 0; pixel < m_counts.npix(); ++pixel) {
+    // Get counts cube pixels within the RoI
+    std::vector<int> pixels = roi_pixels(roi);
 
-        // Skip pixel if it is outside the RoI
-        if (roi.centre().dir().dist_deg(m_dirs[pixel]) > roi.radius()) {
-            continue;
-        }
+    // Loop over all counts cube pixels within the RoI. This needs to be
+    // protected since the observations may be binned in parallel.
+    #pragma omp critical(ctbin_set_weights)
+    for (int i = 0; i < pixels.size(); ++i) {
+
+        // Get pixel index
+        int pixel = pixels[i];
 
         // Loop over all energy layers of counts cube
         for (int iebin = 0; iebin < m_ebounds.size(); ++iebin){
@@ -668,12 +900,11 @@ void ctbin::set_weights(GCTAObservation* obs)
             }
 
             // Signal that bin was filled
-            #pragma omp critical(ctbin_set_weights)
             m_weights(pixel, iebin) = 1.0;
 
         } // endfor: looped over energy layers of counts cube
 
-    } // endfor: looped over pixels of counts cube
+    } // endfor: looped over pixels within RoI
 
     // Return
     return;
@@ -684,7 +915,9 @@ void ctbin::set_weights(GCTAObservation* obs)
  * @brief Create output observation container.
  *
  * Creates an output observation container that combines all input CTA
- * observation into a single stacked observation. All non-CTA observations
+ * observation into a single stacked observation. If an input counts cube
+ * was specified, the stacked observation keeps the pointing of the input
+ * counts cube. All non-CTA observations
  * and all binned CTA observations that were present in the observation
  * container are append to the observation container so that they can
  * be used by other tools. The method furthermore conserves any response
@@ -693,11 +926,11 @@ void ctbin::set_weights(GCTAObservation* obs)
  ***************************************************************************/
 void ctbin::obs_cube(void)
 {
-    // If we have only a single CTA observation in the container, then
-    // keep that observation and just attach the event cube to it. Reset
-    // the filename, otherwise we still will have the old event filename
-    // in the log file.
-    if (m_obs.size() == 1) {
+    // If we have only a single CTA observation in the container and no
+    // input counts cube, then keep that observation and just attach the
+    // event cube to it. Reset the filename, otherwise we still will have the
+    // old event filename in the log file.
+    if (m_obs.size() == 1 && m_incube.is_empty()) {
 
         // Attach event cube to CTA observation
         GCTAObservation* obs = dynamic_cast<GCTAObservation*>(m_obs[0]);
@@ -765,6 +998,13 @@ void ctbin::obs_cube(void)
         dir.radec(ra, dec);
         GCTAPointing pointing(dir);
 
+        // If events were appended to an input counts cube then keep the
+        // pointing of the input counts cube
+        if (!m_incube.is_empty()) {
+            pointing = m_pointing;
+            dir      = m_pointing.dir();
+        }
+
         // Compute deadtime correction
         double deadc = (m_ontime > 0.0) ? m_livetime / m_ontime : 0.0;
 
@@ -47,6 +47,10 @@
  * XML definition file, the class will merge these events into a single
  * counts cube.
  *
+ * If an input counts cube is specified using the incube parameter, the
+ * events are appended to the input counts cube, so that only new
+ * observations need to be binned.
+ *
  * Results are stored in an observation container that can be written to disk
  * in form of a single FITS file. On output, the observation container will
  * have merged the input event lists into a single observation.
@@ -84,11 +88,15 @@ protected:
     void copy_members(const ctbin& app);
     void free_members(void);
     void get_parameters(void);
-    void fill_cube(GCTAObservation* obs);
+    void load_cube(void);
+    void fill_cube(GCTAObservation*                   obs,
+                   std::vector<std::vector<double> >& partial,
+                   const bool&                        parallel);
     void set_weights(GCTAObservation* obs);
     void obs_cube(void);
 
     // User parameters
+    GFilename     m_incube;   //!< Input counts cube file name
     GFilename     m_outcube;  //!< Output counts map file name
     bool          m_usepnt;   //!< Use pointing instead of xref/yref parameters
     bool          m_publish;  //!< Publish counts cube?
@@ -100,11 +108,9 @@ protected:
     GEbounds      m_ebounds;  //!< Energy boundaries
     GGti          m_gti;      //!< Good time intervals
     GCTAEventCube m_cube;     //!< Events cube (for cube() method)
+    GCTAPointing  m_pointing; //!< Pointing of input counts cube
     double        m_ontime;   //!< Total ontime
     double        m_livetime; //!< Total livetime
-
-    // Cache members
-    std::vector<GSkyDir> m_dirs; //!< Cached GSkyDir for each pixel in m_counts
 };
 
 
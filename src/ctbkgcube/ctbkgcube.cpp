@@ -33,7 +33,7 @@
 #include "GTools.hpp"
 
 /* __ Method name definitions ____________________________________________ */
-#define G_RUN                                              "ctbkgcube::run()"
+#define G_FILL_CUBE   "ctbkgcube::fill_cube(GObservations&, GCTACubeBackground&)"
 
 /* __ Debug definitions __________________________________________________ */
 
@@ -228,107 +228,8 @@ void ctbkgcube::run(void)
     // Initialise exposure cube
     init_cube();
 
-    // Write header
-    log_header1(TERSE, "Prepare model");
-
-    // Copy models from observation container and reset output model
-    // container
-    GModels models_orig = m_obs.models();
-    m_bkgmdl            = m_obs.models();
-    m_outmdl.clear();
-
-    // Initialise instruments string
-    std::string instruments;
-
-    // Remove all models that are not CTA background models from the
-    // container and put all removed components in the output
-    // container
-    int num = m_bkgmdl.size();
-    for (int i = num-1; i >= 0; --i) {
-
-        // Flag removal
-        bool remove = true;
-
-        // If we have a data space model with "GCTA" classname then we
-        // have a CTA background model and we want to keep the model
-        if ((dynamic_cast<GModelData*>(m_bkgmdl[i]) != NULL) &&
-            (m_bkgmdl[i]->classname().substr(0,4) == "GCTA")) {
-
-            // Signal that model should be kept
-            remove = false;
-
-            // Collect instrument identifiers
-            if (instruments.length() > 0) {
-                instruments += ",";
-            }
-            instruments += m_bkgmdl[i]->instruments();
-        }
-
-        // Log model removal or keeping
-        std::string what  = (remove) ? "Remove model" : "Keep model";
-        std::string value = m_bkgmdl[i]->name()+" "+m_bkgmdl[i]->type()+"("+
-                            m_bkgmdl[i]->instruments()+")";
-        log_value(NORMAL, what, value);
-
-        // If removal is requested, append model to output container and
-        // remove it from the background model container. We use here the
-        // insert() method to assure that the model order is preserved.
-        if (remove) {
-            m_outmdl.insert(0, *(m_bkgmdl[i]));
-            m_bkgmdl.remove(i);
-        }
-
-    } // endfor: looped over all background models
-
-    // If there are no models in the background model container then throw
-    // an exception since we need at least one model to generate a background
-    // cube
-    if (m_bkgmdl.size() == 0) {
-        std::string msg = "No background model found in model container. "
-                          "At least one background model is required in the "
-                          "model container to generate a background cube.";
-        throw GException::invalid_value(G_RUN, msg);
-    }
-
-    // Write header
-    log_header1(TERSE, "Generate background cube");
-
-    // Assign background models to container
-    m_obs.models(m_bkgmdl);
-
-    // Set pointer to logger dependent on chattiness
-    GLog* logger = (logNormal()) ? &log : NULL;
-
-    // Fill background cube from observations
-    m_background.fill(m_obs, logger);
-
-    // Create a background model for the output background cube and append
-    // that model to the input model in place of the original
-    // background models
-    // TODO: We might think of creating the spectral model via user parameter
-    GModelSpectralPlaw spectral(1.0, 0.0, GEnergy(1.0, "TeV"));
-    spectral["Prefactor"].range(0.01, 100.0);
-    spectral["Index"].range(-5.0, 5.0);
-    GCTAModelCubeBackground model(spectral);
-
-    // Set model name
-    model.name("BackgroundModel");
-
-    // Set model instruments
-    //model.instruments(instruments);
-    model.instruments("CTA,HESS,MAGIC,VERITAS"); // Temporary fix for #2140
-
-    // Append model to output container
-    m_outmdl.append(model);
-
-    // Write background cube into logger
-    log_string(NORMAL, m_background.print(m_chatter));
-
-    // Write input model container into logger
-    log_models(NORMAL, m_outmdl, "Output model");
-
-    // Recover original models
-    m_obs.models(models_orig);
+    // Fill background cube and set output models
+    m_outmdl = fill_cube(m_obs, m_background);
 
     // Optionally publish background cube
     if (m_publish) {
@@ -577,3 +478,128 @@ void ctbkgcube::init_cube(void)
     // Return
     return;
 }
+
+
+/***********************************************************************//**
+ * @brief Fill background cube
+ *
+ * @param[in,out] obs Observation container.
+ * @param[in,out] cube Background cube.
+ * @return Output models.
+ *
+ * @exception GException::invalid_value
+ *            No background model found in model container.
+ *
+ * Fills the background @p cube using only the CTA background models of the
+ * observation container. The returned output models contain all other
+ * models of the observation container and a background cube model in place
+ * of the CTA background models. The models of the observation container
+ * are restored on return.
+ ***************************************************************************/
+GModels ctbkgcube::fill_cube(GObservations& obs, GCTACubeBackground& cube)
+{
+    // Write header
+    log_header1(TERSE, "Prepare model");
+
+    // Copy models from observation container and initialise output model
+    // container
+    GModels models_orig = obs.models();
+    GModels outmdl;
+    m_bkgmdl            = obs.models();
+
+    // Initialise instruments string
+    std::string instruments;
+
+    // Remove all models that are not CTA background models from the
+    // container and put all removed components in the output
+    // container
+    int num = m_bkgmdl.size();
+    for (int i = num-1; i >= 0; --i) {
+
+        // Flag removal
+        bool remove = true;
+
+        // If we have a data space model with "GCTA" classname then we
+        // have a CTA background model and we want to keep the model
+        if ((dynamic_cast<GModelData*>(m_bkgmdl[i]) != NULL) &&
+            (m_bkgmdl[i]->classname().substr(0,4) == "GCTA")) {
+
+            // Signal that model should be kept
+            remove = false;
+
+            // Collect instrument identifiers
+            if (instruments.length() > 0) {
+                instruments += ",";
+            }
+            instruments += m_bkgmdl[i]->instruments();
+        }
+
+        // Log model removal or keeping
+        std::string what  = (remove) ? "Remove model" : "Keep model";
+        std::string value = m_bkgmdl[i]->name()+" "+m_bkgmdl[i]->type()+"("+
+                            m_bkgmdl[i]->instruments()+")";
+        log_value(NORMAL, what, value);
+
+        // If removal is requested, append model to output container and
+        // remove it from the background model container. We use here the
+        // insert() method to assure that the model order is preserved.
+        if (remove) {
+            outmdl.insert(0, *(m_bkgmdl[i]));
+            m_bkgmdl.remove(i);
+        }
+
+    } // endfor: looped over all background models
+
+    // If there are no models in the background model container then throw
+    // an exception since we need at least one model to generate a background
+    // cube
+    if (m_bkgmdl.size() == 0) {
+        std::string msg = "No background model found in model container. "
+                          "At least one background model is required in the "
+                          "model container to generate a background cube.";
+        throw GException::invalid_value(G_FILL_CUBE, msg);
+    }
+
+    // Write header
+    log_header1(TERSE, "Generate background cube");
+
+    // Assign background models to container
+    obs.models(m_bkgmdl);
+
+    // Set pointer to logger dependent on chattiness
+    GLog* logger = (logNormal()) ? &log : NULL;
+
+    // Fill background cube from observations
+    cube.fill(obs, logger);
+
+    // Create a background model for the output background cube and append
+    // that model to the input model in place of the original
+    // background models
+    // TODO: We might think of creating the spectral model via user parameter
+    GModelSpectralPlaw spectral(1.0, 0.0, GEnergy(1.0, "TeV"));
+    spectral["Prefactor"].range(0.01, 100.0);
+    spectral["Index"].range(-5.0, 5.0);
+    GCTAModelCubeBackground model(spectral);
+
+    // Set model name
+    model.name("BackgroundModel");
+
+    // Set model instruments
+    //model.instruments(instruments);
+    model.instruments("CTA,HESS,MAGIC,VERITAS"); // Temporary fix for #2140
+
+    // Append model to output container
+    outmdl.append(model);
+
+    // Write background cube into logger
+    log_string(NORMAL, cube.print(m_chatter));
+
+    // Write input model container into logger
+    log_models(NORMAL, outmdl, "Output model");
+
+    // Recover original models
+    obs.models(models_orig);
+
+    // Return output models
+    return outmdl;
+}
@@ -62,6 +62,12 @@ public:
     const GCTACubeBackground& bkgcube(void) const;
     const GModels&            models(void) const;
 
+#ifndef SWIG
+protected:
+#endif
+    // Background cube filling
+    GModels fill_cube(GObservations& obs, GCTACubeBackground& cube);
+
 protected:
     // Protected methods
     void init_members(void);
@@ -29,12 +29,16 @@
 #include <config.h>
 #endif
 #include <iostream>
+#include <cmath>
+#ifdef _OPENMP
+#include <omp.h>
+#endif
 #include "cterror.hpp"
 #include "GTools.hpp"
 #include "GOptimizer.hpp"
 
 /* __ Method name definitions ____________________________________________ */
-#define G_ERR_BISECTION         "cterror::error_bisection(double&, double&)"
+#define G_RUN                                            "cterror::run()"
 
 /* __ Debug definitions __________________________________________________ */
 
@@ -257,7 +261,11 @@ void cterror::run(void)
     // Get number of parameters
     int npars = model->size();
 
-    // Loop over parameters of sky model
+    // Collect the scans of the lower and upper boundaries of all free
+    // parameters. The scan of the lower boundary of a parameter is followed
+    // by the scan of its upper boundary.
+    std::vector<int>    scan_pars;
+    std::vector<double> scan_limits;
     for (int i = 0; i < npars; ++i) {
 
         // Skip parameter if it is fixed
@@ -265,49 +273,137 @@ void cterror::run(void)
             continue;
         }
 
-        // Initialise with best fitting models
-        m_obs.models(models_best);
+        // Get model parameter
+        const GModelPar& par = model->at(i);
 
-        // Get pointer on model parameter
-        GModels& current_models = const_cast<GModels&>(m_obs.models());
-        m_model_par             = &(current_models[m_srcname]->at(i));
+        // Compute parameter bracketing
+        double parmin = std::max(par.factor_min(),
+                                 par.factor_value() - 10.0*par.factor_error());
+        double parmax = std::min(par.factor_max(),
+                                 par.factor_value() + 10.0*par.factor_error());
+
+        // Append scans
+        scan_pars.push_back(i);
+        scan_limits.push_back(parmin);
+        scan_pars.push_back(i);
+        scan_limits.push_back(parmax);
+
+    } // endfor: looped over parameters
+
+    // Determine number of threads
+    int nthreads = 1;
+    #ifdef _OPENMP
+    nthreads = (m_nthreads > 0) ? m_nthreads : omp_get_max_threads();
+    #endif
+
+    // Initialise scan results
+    int                      nscans = scan_pars.size();
+    std::vector<double>      scan_values(nscans, 0.0);
+    std::vector<int>         scan_status(nscans, 0);
+    std::vector<std::string> scan_errors(nscans);
+
+    // Compute boundaries. The scans are distributed dynamically over the
+    // threads, where each thread owns a copy of the observation container
+    // and the optimizer. Each scan starts from the best fitting models.
+    #pragma omp parallel num_threads(nthreads)
+    {
+        // Get thread copies
+        GObservations obs(m_obs);
+        GOptimizerLM  opt(m_opt);
+
+        // Disable optimizer logging if several threads are used
+        if (nthreads > 1) {
+            opt.logger(NULL);
+        }
 
-        // Extract current value
-        m_value = m_model_par->factor_value();
+        // Loop over scans
+        #pragma omp for schedule(dynamic)
+        for (int k = 0; k < nscans; ++k) {
 
-        // Compute parameter bracketing
-        double parmin = std::max(m_model_par->factor_min(),
-                                 m_value - 10.0*m_model_par->factor_error());
-        double parmax = std::min(m_model_par->factor_max(),
-                                 m_value + 10.0*m_model_par->factor_error());
+            // Compute boundary. Exceptions are caught since they cannot be
+            // thrown out of a parallel region.
+            try {
+                scan_values[k] = error_limit(obs, opt, models_best,
+                                             scan_pars[k], scan_limits[k],
+                                             scan_status[k]);
+            }
+            catch (std::exception& e) {
+                scan_errors[k] = e.what();
+            }
+
+        } // endfor: looped over scans
+
+    } // end pragma omp parallel
+
+    // Loop over scans of free parameters
+    for (int k = 0; k < nscans; k += 2) {
+
+        // Get model parameter
+        GModelPar& par = model->at(scan_pars[k]);
 
         // Write header and initial parameters into logger
         log_header1(TERSE, "Compute error for source \""+m_srcname+"\""
-                           " parameter \""+m_model_par->name()+"\"");
+                           " parameter \""+par.name()+"\"");
         log_value(NORMAL, "Confidence level",
                   gammalib::str(m_confidence*100.0)+" %");
         log_value(NORMAL, "Log-likelihood difference", m_dlogL);
         log_value(NORMAL, "Initial factor range",
-                  "["+gammalib::str(parmin)+", "+gammalib::str(parmax)+"]");
+                  "["+gammalib::str(scan_limits[k])+", "+
+                  gammalib::str(scan_limits[k+1])+"]");
+
+        // Check scan results
+        for (int j = k; j < k+2; ++j) {
+
+            // Throw an exception if the scan failed
+            if (!scan_errors[j].empty()) {
+                throw GException::invalid_value(G_RUN, scan_errors[j]);
+            }
+
+            // Signal if the parameter limit has been reached
+            if (scan_status[j] == 1) {
+                std::string bound  = (j == k) ? "minimum" : "maximum";
+                std::string change = (j == k) ? "lower" : "higher";
+                std::string msg    = "The \""+par.name()+"\" parameter "+
+                                     bound+" has been reached during error "
+                                     "calculation. To obtain accurate errors, "
+                                     "consider setting the "+bound+" parameter "
+                                     "value to a "+change+" value, and re-run "
+                                     "cterror.";
+                log_string(TERSE, msg);
+            }
+
+            // Throw an exception if the maximum number of iterations was
+            // reached
+            else if (scan_status[j] == 2) {
+                std::string msg = "The maximum number of "+
+                                  gammalib::str(m_max_iter)+" iterations has "
+                                  "been reached. Please increase the "
+                                  "\"max_iter\" parameter, and re-run "
+                                  "cterror.";
+                throw GException::invalid_value(G_RUN, msg);
+            }
 
-        // Compute lower and upper boundaries
-        double value_lo = error_bisection(parmin, m_value);
-        double value_hi = error_bisection(m_value, parmax);
+        } // endfor: checked scan results
+
+        // Get lower and upper boundaries
+        double value    = par.factor_value();
+        double value_lo = scan_values[k];
+        double value_hi = scan_values[k+1];
 
         // Compute errors
         double error           = 0.5 * (value_hi - value_lo);
-        double error_neg       = m_value  - value_lo;
-        double error_pos       = value_hi - m_value;
-        double error_value     = std::abs(error*m_model_par->scale());
-        double error_value_neg = std::abs(error_neg*m_model_par->scale());
-        double error_value_pos = std::abs(error_pos*m_model_par->scale());
+        double error_neg       = value    - value_lo;
+        double error_pos       = value_hi - value;
+        double error_value     = std::abs(error*par.scale());
+        double error_value_neg = std::abs(error_neg*par.scale());
+        double error_value_pos = std::abs(error_pos*par.scale());
 
         // Write results into logger
-        std::string unit = " " + m_model_par->unit();
+        std::string unit = " " + par.unit();
         log_value(NORMAL, "Lower parameter factor", value_lo);
         log_value(NORMAL, "Upper parameter factor", value_hi);
         log_value(NORMAL, "Error from curvature",
-                  gammalib::str(m_model_par->error()) + unit);
+                  gammalib::str(par.error()) + unit);
         log_value(NORMAL, "Error from profile",
                   gammalib::str(error_value) + unit);
         log_value(NORMAL, "Negative profile error",
@@ -316,9 +412,9 @@ void cterror::run(void)
                   gammalib::str(error_value_pos) + unit);
 
         // Save error result
-        model->at(i).factor_error(error);
+        par.factor_error(error);
 
-    } // endfor: looped over spectral parameters
+    } // endfor: looped over free parameters
 
     // Restore best fitting models (now with new errors computed)
     m_obs.models(models_best);
@@ -386,13 +482,12 @@ void cterror::init_members(void)
     m_tol         = 1.0e-3;
     m_max_iter    = 50;
     m_apply_edisp = false;
+    m_nthreads    = 0;
     m_chatter     = static_cast<GChatter>(2);
 
     // Initialise protected members
-    m_value       = 0.0;
     m_dlogL       = 0.0;
     m_best_logL   = 0.0;
-    m_model_par   = NULL;
 
     // Set optimizer parameters
     m_opt.max_iter(m_max_iter);
@@ -417,13 +512,12 @@ void cterror::copy_members(const cterror& app)
     m_tol         = app.m_tol;
     m_max_iter    = app.m_max_iter;
     m_apply_edisp = app.m_apply_edisp;
+    m_nthreads    = app.m_nthreads;
     m_chatter     = app.m_chatter;
 
     // Copy protected members
-    m_value     = app.m_value;
     m_dlogL     = app.m_dlogL;
     m_best_logL = app.m_best_logL;
-    m_model_par = NULL;
 
     // Return
     return;
@@ -468,7 +562,9 @@ void cterror::get_parameters(void)
     // Read other parameters
     m_tol      = (*this)["tol"].real();
     m_max_iter = (*this)["max_iter"].integer();
-    m_chatter  = static_cast<GChatter>((*this)["chatter"].integer());
+    m_nthreads  = (*this)["nthreads"].integer();
+    m_use_cache = (*this)["profcache"].boolean();
+    m_chatter   = static_cast<GChatter>((*this)["chatter"].integer());
 
     // Read ahead parameters that are only needed when the tool gets
     // executed
@@ -485,110 +581,52 @@ void cterror::get_parameters(void)
 
 
 /***********************************************************************//**
- * @brief Calculate error using a bisection method
+ * @brief Calculate error boundary using a bracketed root finder
+ *
+ * @param[in,out] obs Observation container.
+ * @param[in,out] opt Optimizer.
+ * @param[in] models Best fitting models.
+ * @param[in] ipar Index of source model parameter.
+ * @param[in] limit Parameter factor limit of the search.
+ * @param[out] status Status (0=converged, 1=limit reached, 2=maximum
+ *                    number of iterations reached).
+ * @return Parameter factor value of the error boundary.
  *
- * @param[in] min Minimum parameter value
- * @param[in] max Maximum parameter value
+ * Calculates the parameter factor value between the best fitting value and
+ * @p limit where the log-likelihood increased by the log-likelihood
+ * difference that corresponds to the requested confidence level. The
+ * search starts from the best fitting @p models and from the estimate of
+ * the parabolic approximation of the log-likelihood using the parameter
+ * error from the covariance matrix, and the root is then determined using
+ * the Illinois variant of the regula falsi method (see
+ * ctlikelihood::profile_root).
  *
- * Calculates the error using a bisection method.
+ * The method only changes @p obs and @p opt, hence it may be called in
+ * parallel for distinct observation containers and optimizers.
  ***************************************************************************/
-double cterror::error_bisection(const double& min, const double& max)
+double cterror::error_limit(GObservations& obs,
+                            GOptimizerLM&  opt,
+                            const GModels& models,
+                            const int&     ipar,
+                            const double&  limit,
+                            int&           status)
 {
-    // Copy values to working values
-    double wrk_min = min;
-    double wrk_max = max;
-
-    // Initialise iteration counter
-    int iter = 1;
-
-    // Initialize mid value
-    double mid = (wrk_min + wrk_max) / 2.0;
-
-    // Loop until breaking condition is reached
-    while (true) {
-
-        // Throw exception if maximum iterations are reached
-        if (iter > m_max_iter) {
-            if (wrk_min - m_model_par->factor_min() < m_tol) {
-                std::string msg = "The \""+m_model_par->name()+"\" parameter "
-                                  "minimum has been reached during error "
-                                  "calculation. To obtain accurate errors, "
-                                  "consider setting the minimum parameter "
-                                  "value to a lower value, and re-run "
-                                  "cterror.";
-                log_string(TERSE, msg);
-                break;
-            }
-            else if (m_model_par->factor_max() - wrk_max < m_tol) {
-                std::string msg = "The \""+m_model_par->name()+"\" parameter "
-                                  "maximum has been reached during error "
-                                  "calculation. To obtain accurate errors, "
-                                  "consider setting the maximum parameter "
-                                  "value to a higher value, and re-run "
-                                  "cterror.";
-                log_string(TERSE, msg);
-                break;
-            }
-            else {
-                std::string msg = "The maximum number of "+
-                                  gammalib::str(m_max_iter)+" iterations has "
-                                  "been reached. Please increase the "
-                                  "\"max_iter\" parameter, and re-run "
-                                  "cterror.";
-                throw GException::invalid_value(G_ERR_BISECTION, msg);
-            }
-        }
-
-        // Compute center of boundary
-        mid = (wrk_min + wrk_max) / 2.0;
-
-        // Calculate function value
-        double eval_mid = evaluate(*m_model_par, mid) - (m_best_logL + m_dlogL);
-
-        // Write interval into logger
-        log_value(EXPLICIT, "  Iteration "+gammalib::str(iter),
-                  "["+gammalib::str(wrk_min)+", "+gammalib::str(wrk_max)+"]");
-
-        // Check for convergence inside tolerance
-        if (std::abs(eval_mid) < m_tol) {
-            break;
-        }
-
-        // Check if interval is smaller than 1.0e-6
-        if (std::abs(wrk_max-wrk_min) < 1.0e-6) {
-            break;
-        }
-
-        // If we are on the crescent side of the parabola ...
-        if (mid > m_value) {
-
-            // Change boundaries for further iteration
-            if (eval_mid > 0.0) {
-                wrk_max = mid;
-            }
-            else if (eval_mid < 0.0) {
-                wrk_min = mid;
-            }
-        }
-
-        // ... otherwise we are on the decrescent side of the parabola
-        else {
-
-            // Change boundaries for further iteration
-            if (eval_mid > 0.0) {
-                wrk_min = mid;
-            }
-            else if (eval_mid < 0.0) {
-                wrk_max = mid;
-            }
-        }
+    // Start from best fitting models
+    obs.models(models);
 
-        // Increment counter
-        iter++;
+    // Get model parameter
+    GModels&   current = const_cast<GModels&>(obs.models());
+    GModelPar& par     = current[m_srcname]->at(ipar);
 
-    } // endwhile
+    // Get best fitting value
+    double value = par.factor_value();
 
-    // Return mid value
-    return mid;
+    // Compute parabolic estimate of error boundary
+    double sign  = (limit < value) ? -1.0 : 1.0;
+    double guess = value + sign * std::sqrt(2.0 * m_dlogL) * par.factor_error();
 
+    // Find and return error boundary
+    return (profile_root(obs, opt, par, m_best_logL + m_dlogL, value,
+                         -m_dlogL, guess, limit, m_tol, 1.0e-6, m_max_iter,
+                         status));
 }
@@ -63,7 +63,12 @@ protected:
     void   copy_members(const cterror& app);
     void   free_members(void);
     void   get_parameters(void);
-    double error_bisection(const double& min, const double& max);
+    double error_limit(GObservations& obs,
+                       GOptimizerLM&  opt,
+                       const GModels& models,
+                       const int&     ipar,
+                       const double&  limit,
+                       int&           status);
 
     // User parameters
     std::string   m_srcname;      //!< Name of source
@@ -72,12 +77,11 @@ protected:
     double        m_tol;          //!< Tolerance for limit determination
     int           m_max_iter;     //!< Maximum number of iterations
     bool          m_apply_edisp;  //!< Apply energy dispersion?
+    int           m_nthreads;     //!< Number of threads (0=all available)
     GChatter      m_chatter;      //!< Chattiness
 
     // Protected members
-    double        m_value;        //!< Parameter value 
     double        m_dlogL;        //!< Likelihood difference for upper limit computation
-    GModelPar*    m_model_par;    //!< Pointer to model parameter
     double        m_best_logL;    //!< Best fit log likelihood of given model
 };
 
@@ -29,12 +29,18 @@
 #include <config.h>
 #endif
 #include <cstdio>
+#include <sstream>
+#include <iomanip>
 #include "ctmodel.hpp"
 #include "GTools.hpp"
+#ifdef _OPENMP
+#include <omp.h>
+#endif
 
 /* __ Method name definitions ____________________________________________ */
 #define G_GET_PARAMETERS                          "ctmodel::get_parameters()"
-#define G_FILL_CUBE                    "ctmodel::fill_cube(GCTAObservation*)"
+#define G_RUN                                                "ctmodel::run()"
+#define G_FILL_CUBE              "ctmodel::fill_cube(GCTAObservation*, int&)"
 
 /* __ Debug definitions __________________________________________________ */
 
@@ -234,8 +240,8 @@ void ctmodel::run(void)
     // Write header
     log_header1(TERSE, "Generate model cube");
 
-    // Loop over all observations in the container
-    #pragma omp parallel for
+    // Collect all observations for which the cube should be filled
+    std::vector<GCTAObservation*> obs_list;
     for (int i = 0; i < m_obs.size(); ++i) {
         
         // Get CTA observation
@@ -252,7 +258,7 @@ void ctmodel::run(void)
         // Fill cube and leave loop if we are binned mode (meaning we
         // only have one binned observation)
         else if (m_binned) {
-            fill_cube(obs);
+            obs_list.push_back(obs);
             i = m_obs.size();
         }
 
@@ -266,17 +272,67 @@ void ctmodel::run(void)
 
         // Otherwise, everything seems to be fine, so fill the cube from obs
         else {
-            // Fill the cube
-            fill_cube(obs);
-            
-            // Dispose events to free memory if event file exists on disk
-            if (obs->eventfile().length() > 0 && obs->eventfile().exists()) {
-                obs->dispose_events();
+            obs_list.push_back(obs);
+        }
+
+    } // endfor: looped over observations
+
+    // Get number of threads
+    int nthreads = 1;
+    #ifdef _OPENMP
+    nthreads = (m_nthreads > 0) ? m_nthreads : omp_get_max_threads();
+    #endif
+
+    // If there are more observations than threads then distribute the
+    // observations over the threads, and each observation is computed by a
+    // single thread using the response of the observation. Otherwise the
+    // cube bins of each observation are computed in parallel by the
+    // fill_cube() method.
+    bool parallel_obs = (nthreads > 1 && obs_list.size() > nthreads);
+    int  obs_threads  = (parallel_obs) ? 1 : nthreads;
+
+    // Initialise error message. Exceptions can not be thrown out of a
+    // parallel region, hence we keep the first error message and throw an
+    // exception after the parallel region.
+    std::string error;
+
+    // Loop over all observations. The model values of each observation are
+    // added to the cube in the order of the observations (see fill_cube()),
+    // hence the model cube does not depend on the number of threads.
+    #pragma omp parallel for ordered schedule(dynamic) num_threads(nthreads) \
+                             if(parallel_obs)
+    for (int i = 0; i < obs_list.size(); ++i) {
+
+        // Get CTA observation
+        GCTAObservation* obs = obs_list[i];
+
+        // Fill the cube
+        try {
+            fill_cube(obs, obs_threads);
+        }
+        catch (std::exception& e) {
+            #pragma omp critical(ctmodel_run)
+            {
+                if (error.empty()) {
+                    error = e.what();
+                }
             }
         }
 
+        // Dispose events to free memory if event file exists on disk
+        if (!m_binned &&
+            obs->eventfile().length() > 0 && obs->eventfile().exists()) {
+            obs->dispose_events();
+        }
+
     } // endfor: looped over observations
 
+    // Throw exception if the cube could not be filled for one of the
+    // observations
+    if (!error.empty()) {
+        throw GException::invalid_value(G_RUN, error);
+    }
+
     // Write model cube into header
     log_header1(NORMAL, "Model cube");
     log_string(NORMAL, m_cube.print());
@@ -364,6 +420,9 @@ void ctmodel::cube(const GCTAEventCube& cube)
     // Set cube
     m_cube = cube;
 
+    // Clear GTIs of cube
+    m_gti.clear();
+
     // Set all cube bins to zero
     for (int i = 0; i < m_cube.size(); ++i) {
         m_cube[i]->counts(0.0);
@@ -391,6 +450,8 @@ void ctmodel::init_members(void)
     // Initialise members
     m_outcube.clear();
     m_apply_edisp = false;
+    m_use_cache   = false;
+    m_nthreads    = 0;
     m_publish     = false;
     m_chatter     = static_cast<GChatter>(2);
 
@@ -405,6 +466,9 @@ void ctmodel::init_members(void)
     m_energy.clear();
     m_ewidth.clear();
     m_time.clear();
+    m_cache_geom.clear();
+    m_cache_keys.clear();
+    m_cache_values.clear();
 
     // Return
     return;
@@ -421,20 +485,25 @@ void ctmodel::copy_members(const ctmodel& app)
     // Copy attributes
     m_outcube     = app.m_outcube;
     m_apply_edisp = app.m_apply_edisp;
+    m_use_cache   = app.m_use_cache;
+    m_nthreads    = app.m_nthreads;
     m_publish     = app.m_publish;
     m_chatter     = app.m_chatter;
 
     // Copy protected members
-    m_cube        = app.m_cube;
-    m_gti         = app.m_gti;
-    m_has_cube    = app.m_has_cube;
-    m_append_cube = app.m_append_cube;
-    m_binned      = app.m_binned;
-    m_dir         = app.m_dir;
-    m_solidangle  = app.m_solidangle;
-    m_energy      = app.m_energy;
-    m_ewidth      = app.m_ewidth;
-    m_time        = app.m_time;
+    m_cube         = app.m_cube;
+    m_gti          = app.m_gti;
+    m_has_cube     = app.m_has_cube;
+    m_append_cube  = app.m_append_cube;
+    m_binned       = app.m_binned;
+    m_dir          = app.m_dir;
+    m_solidangle   = app.m_solidangle;
+    m_energy       = app.m_energy;
+    m_ewidth       = app.m_ewidth;
+    m_time         = app.m_time;
+    m_cache_geom   = app.m_cache_geom;
+    m_cache_keys   = app.m_cache_keys;
+    m_cache_values = app.m_cache_values;
 
     // Return
     return;
@@ -520,6 +589,12 @@ void ctmodel::get_parameters(void)
     // Get energy dispersion flag parameters
     m_apply_edisp = (*this)["edisp"].boolean();
 
+    // Get model component cache flag
+    m_use_cache = (*this)["cache"].boolean();
+
+    // Get number of threads
+    m_nthreads = (*this)["nthreads"].integer();
+
     // If we do not have yet a counts cube for model computation then check
     // whether we should read it from the "incube" parameter or whether we
     // should create it from scratch using the task parameters
@@ -774,6 +849,24 @@ void ctmodel::extract_cube_properties(void)
     // Set time
     m_time = m_cube[0]->time();
 
+    // Set cube map for determination of the pixels within the RoI
+    set_roi_map(m_cube.counts());
+
+    // Set cube geometry key for the model component cache
+    std::ostringstream geom;
+    geom << std::setprecision(17) << m_cube.nx() << "x" << m_cube.ny()
+         << "x" << nebins << "|" << m_time.secs();
+    if (npix > 0) {
+        geom << "|" << m_dir[0].dir().ra_deg()
+             << "|" << m_dir[0].dir().dec_deg()
+             << "|" << m_dir[npix-1].dir().ra_deg()
+             << "|" << m_dir[npix-1].dir().dec_deg();
+    }
+    for (int iebin = 0; iebin < nebins; ++iebin) {
+        geom << "|" << m_energy[iebin].MeV() << "|" << m_ewidth[iebin].MeV();
+    }
+    m_cache_geom = geom.str();
+
     // Return
     return;
 }
@@ -783,13 +876,31 @@ void ctmodel::extract_cube_properties(void)
  * @brief Fill model into model cube
  *
  * @param[in] obs CTA observation.
+ * @param[in] nthreads Number of threads.
  *
  * Adds the expected number of events for a given observation to the events
  * that are already found in the model cube. The method also updates the
  * GTI of the model cube so that cube GTI is a list of the GTIs of all
- * observations that were used to generate the model cube.
+ * observations that were used to generate the model cube. For unbinned
+ * observations only the spatial bins within the RoI are visited.
+ *
+ * The model components are computed separately using eval_component(). If
+ * the cache parameter is set, the model component values are cached divided
+ * by the normalisation parameter of the component. In subsequent calls, the
+ * cached values are scaled by the normalisation parameter if all other
+ * parameters of the component are unchanged. The model values are added to
+ * the model cube and summed in a fixed order, hence the results do not
+ * depend on the number of threads.
+ *
+ * The cube bins are computed using @p nthreads threads. If more than one
+ * thread is used then each thread evaluates the models using its own copy
+ * of the instrument response (see response_observation()). The method may
+ * be called for several observations in parallel from the ordered loop in
+ * run(). The model component cache is therefore protected, and the model
+ * values are added to the model cube within an ordered region, hence the
+ * observations are added in their order in the container.
  ***************************************************************************/
-void ctmodel::fill_cube(const GCTAObservation* obs)
+void ctmodel::fill_cube(const GCTAObservation* obs, const int& nthreads)
 {
     // Get number of spatial and spectral bins in counts cube
     int npix   = m_cube.npix();
@@ -818,90 +929,378 @@ void ctmodel::fill_cube(const GCTAObservation* obs)
     int    num_outside_ebds = 0;
     int    num_outside_roi  = 0;
 
-    // Extract copy of models from observation container
-    GModels models(m_obs.models());
-
     // Get pointer to event cube pixels
     double* pixels = const_cast<double*>(m_cube.counts().pixels());
 
-    // Initialise event bin
-    GCTAEventBin bin;
+    // Get spatial bins within the RoI if the RoI is valid, otherwise use
+    // all spatial bins
+    std::vector<int> indices;
+    if (roi.is_valid()) {
+        indices         = roi_pixels(roi);
+        num_outside_roi = (npix - (int)indices.size()) * nebins;
+    }
+    else {
+        indices.reserve(npix);
+        for (int i = 0; i < npix; ++i) {
+            indices.push_back(i);
+        }
+    }
 
-    // Set event bin attributes that are constant for a counts cube
-    bin.time(m_time);
-    bin.ontime(obs->ontime());
-    bin.weight(1.0);
+    // Allocate model values for all cube bins within the RoI
+    int                 nindices = indices.size();
+    std::vector<double> values(nindices * nebins, 0.0);
 
-    // Loop over all the spatial bins
-    for (int i = 0; i < npix; ++i) {
+    // Get models
+    const GModels& models = m_obs.models();
 
-        // If RoI is valid then skip bin if it is outside the RoI of the
-        // observation
-        if (roi.is_valid() && !roi.contains(m_dir[i])) {
-            num_outside_roi += nebins;
-            continue;
+    // Initialise number of model components taken from the cache
+    int num_cached = 0;
+
+    // If more than one thread is used then set up one response observation
+    // per thread so that the threads do not share the internal caches of
+    // the instrument response
+    std::vector<GCTAObservation> thread_obs;
+    if (nthreads > 1) {
+        thread_obs.reserve(nthreads);
+        for (int i = 0; i < nthreads; ++i) {
+            thread_obs.push_back(response_observation(obs));
         }
+    }
+
+    // Loop over all model components
+    for (int m = 0; m < models.size(); ++m) {
 
-        // Set instrument direction, solid angle and pixel index of bin
-        bin.dir(m_dir[i]);
-        bin.solidangle(m_solidangle[i]);
-        bin.ipix(i);
+        // Get model component
+        const GModel* model = models[m];
 
-        // Loop over all of the energy bins of the cube
-        for (int iebin = 0, ibin = i; iebin < nebins; ++iebin, ibin += npix) {
+        // Skip model component if it does not apply to the observation
+        if (!model->is_valid(obs->instrument(), obs->id())) {
+            continue;
+        }
 
-            // Skip bin if the corresponding counts cube energy bin is not fully
-            // contained in the event list energy range. This avoids having
-            // partially filled bins.
-            if (!usage[iebin]) {
-                num_outside_ebds++;
-                continue;
+        // If caching is requested then get the cache key and the linear
+        // scaling of the model component
+        double      norm = 1.0;
+        std::string key  = (m_use_cache) ? cache_key(model, obs, norm) : "";
+
+        // Search model component in cache and, if it was found, scale the
+        // cached values. The cache is protected since observations may be
+        // handled in parallel.
+        int icache = -1;
+        if (!key.empty()) {
+            #pragma omp critical(ctmodel_cache)
+            {
+                for (int i = 0; i < m_cache_keys.size(); ++i) {
+                    if (m_cache_keys[i] == key) {
+                        icache = i;
+                        break;
+                    }
+                }
+                if (icache != -1) {
+                    const std::vector<double>& cache = m_cache_values[icache];
+                    for (int k = 0; k < values.size(); ++k) {
+                        values[k] += norm * cache[k];
+                    }
+                }
             }
+        }
 
-            // Set energy, energy width and energy index of bin
-            bin.energy(m_energy[iebin]);
-            bin.ewidth(m_ewidth[iebin]);
-            bin.ieng(iebin);
+        // If model component was found in the cache then count it
+        if (icache != -1) {
+            num_cached++;
+        }
 
-            // Compute model value for cube bin
-            double model = models.eval(bin, *obs) * bin.size();
+        // ... otherwise compute the model component values
+        else {
 
-            // Sum model
-            sum += model;
+            // Compute model component values
+            std::vector<double> component = eval_component(model, obs,
+                                                           thread_obs,
+                                                           indices, usage);
 
-            // Store value
-            #pragma omp critical(ctmodel_fill_cube)
-            pixels[ibin] += model;
+            // Add model component values
+            for (int k = 0; k < values.size(); ++k) {
+                values[k] += component[k];
+            }
 
-        } // endfor: looped over all spatial bins
+            // Put model component values divided by the linear scaling
+            // into cache
+            if (!key.empty() && norm != 0.0) {
+                for (int k = 0; k < component.size(); ++k) {
+                    component[k] /= norm;
+                }
+                #pragma omp critical(ctmodel_cache)
+                {
+                    m_cache_keys.push_back(key);
+                    m_cache_values.push_back(component);
+                }
+            }
 
-    } // endfor: looped over all cube bins
+        } // endelse: computed model component values
 
-    // Update GTIs
-    #pragma omp critical(ctmodel_fill_cube)
+    } // endfor: looped over model components
+
+    // Add model values to the cube and log the results. This is done in the
+    // order of the observations since observations may be handled in
+    // parallel.
+    #pragma omp ordered
     {
+
+        // Add model values to the cube. The model values are summed in the
+        // same order as in a serial computation so that the sum does not
+        // depend on the number of threads.
+        for (int k = 0; k < nindices; ++k) {
+
+            // Get spatial bin index
+            int i = indices[k];
+
+            // Loop over all of the energy bins of the cube
+            for (int iebin = 0, ibin = i; iebin < nebins;
+                 ++iebin, ibin += npix) {
+
+                // Skip bin if the corresponding counts cube energy bin is
+                // not fully contained in the event list energy range
+                if (!usage[iebin]) {
+                    num_outside_ebds++;
+                    continue;
+                }
+
+                // Get model value
+                double model = values[k * nebins + iebin];
+
+                // Sum model
+                sum += model;
+
+                // Store value
+                pixels[ibin] += model;
+
+            } // endfor: looped over all energy bins
+
+        } // endfor: looped over all spatial bins
+
         // Append GTIs of observation to list of GTIs
         m_gti.extend(gti);
 
         // Update GTIs
         m_cube.gti(m_gti);
-    }
 
-    // Log filling results
-    #pragma omp critical(ctmodel_fill_cube)
-    {
+        // Log filling results
         log_header3(TERSE, get_obs_header(obs));
         log_value(NORMAL, "Model events in cube", sum);
         log_value(NORMAL, "Bins outside energy range", num_outside_ebds);
         log_value(NORMAL, "Bins outside RoI", num_outside_roi);
-    }
+        if (m_use_cache) {
+            log_value(NORMAL, "Cached model components", num_cached);
+        }
 
-    // Write model cube into header
-    if (m_chatter >= EXPLICIT) {
-        log_header2(EXPLICIT, "Model cube");
-        log_string(EXPLICIT, m_cube.print(m_chatter));
-    }
+        // Write model cube into header
+        if (m_chatter >= EXPLICIT) {
+            log_header2(EXPLICIT, "Model cube");
+            log_string(EXPLICIT, m_cube.print(m_chatter));
+        }
+
+    } // end pragma omp ordered
 
     // Return
     return;
 }
+
+
+/***********************************************************************//**
+ * @brief Compute model component values for cube bins
+ *
+ * @param[in] model Model component.
+ * @param[in] obs CTA observation.
+ * @param[in] thread_obs Response observations for all threads.
+ * @param[in] indices Indices of spatial cube bins.
+ * @param[in] usage Counts cube energy layer usage flags.
+ * @return Model component values.
+ *
+ * Computes the expected number of events of a model component for all
+ * energy layers of the specified spatial cube bins. The model values are
+ * returned for spatial bin @c k and energy layer @c iebin at index
+ * @c k * nebins + @c iebin, where @c nebins is the number of energy layers
+ * in the cube. Energy layers that are not used are set to zero.
+ *
+ * The spatial bins are distributed over the threads, and each thread uses
+ * its own copy of the model component and the event bin. If @p thread_obs
+ * is not empty, the model values of each thread are computed for its own
+ * response observation (see response_observation()), since the instrument
+ * response functions hold internal caches that must not be shared between
+ * threads. The number of threads is given by the size of @p thread_obs, and
+ * a single thread is used if @p thread_obs is empty. Each model value is
+ * written exactly once, hence no synchronisation between the threads is
+ * needed.
+ ***************************************************************************/
+std::vector<double> ctmodel::eval_component(const GModel*                       model,
+                                            const GCTAObservation*              obs,
+                                            const std::vector<GCTAObservation>& thread_obs,
+                                            const std::vector<int>&             indices,
+                                            const std::vector<bool>&            usage)
+{
+    // Get number of spatial bins and energy layers
+    int nindices = indices.size();
+    int nebins   = m_cube.ebins();
+
+    // Allocate model values
+    std::vector<double> values(nindices * nebins, 0.0);
+
+    // Get number of threads
+    int nthreads = (thread_obs.empty()) ? 1 : (int)thread_obs.size();
+
+    // Compute model values
+    #pragma omp parallel num_threads(nthreads)
+    {
+        // Get observation of thread
+        int ithread = 0;
+        #ifdef _OPENMP
+        ithread = omp_get_thread_num();
+        #endif
+        const GCTAObservation& rsp_obs = (thread_obs.empty())
+                                         ? *obs : thread_obs[ithread];
+
+        // Get copy of model component
+        GModel* clone = model->clone();
+
+        // Initialise event bin
+        GCTAEventBin bin;
+
+        // Set event bin attributes that are constant for a counts cube
+        bin.time(m_time);
+        bin.ontime(rsp_obs.ontime());
+        bin.weight(1.0);
+
+        // Loop over all the spatial bins
+        #pragma omp for schedule(dynamic)
+        for (int k = 0; k < nindices; ++k) {
+
+            // Get spatial bin index
+            int i = indices[k];
+
+            // Set instrument direction, solid angle and pixel index of bin
+            bin.dir(m_dir[i]);
+            bin.solidangle(m_solidangle[i]);
+            bin.ipix(i);
+
+            // Loop over all of the energy bins of the cube
+            for (int iebin = 0; iebin < nebins; ++iebin) {
+
+                // Skip bin if the energy layer is not used
+                if (!usage[iebin]) {
+                    continue;
+                }
+
+                // Set energy, energy width and energy index of bin
+                bin.energy(m_energy[iebin]);
+                bin.ewidth(m_ewidth[iebin]);
+                bin.ieng(iebin);
+
+                // Compute model value for cube bin
+                values[k * nebins + iebin] = clone->eval(bin, rsp_obs) * bin.size();
+
+            } // endfor: looped over all energy bins
+
+        } // endfor: looped over all spatial bins
+
+        // Free copy of model component
+        delete clone;
+
+    } // end pragma omp parallel
+
+    // Return model values
+    return values;
+}
+
+
+/***********************************************************************//**
+ * @brief Return response observation for model evaluation
+ *
+ * @param[in] obs CTA observation.
+ * @return Response observation.
+ *
+ * Returns a CTA observation that holds a copy of the instrument response,
+ * the pointing, the identifiers and the time information of @p obs, but no
+ * events. The observation can be used to evaluate models independently of
+ * @p obs, without copying the event list or counts cube of @p obs.
+ ***************************************************************************/
+GCTAObservation ctmodel::response_observation(const GCTAObservation* obs) const
+{
+    // Set observation without events
+    GCTAObservation rsp_obs;
+    rsp_obs.instrument(obs->instrument());
+    rsp_obs.id(obs->id());
+    rsp_obs.name(obs->name());
+    rsp_obs.pointing(obs->pointing());
+    rsp_obs.response(*(obs->response()));
+    rsp_obs.ontime(obs->ontime());
+    rsp_obs.livetime(obs->livetime());
+    rsp_obs.deadc(obs->deadc());
+
+    // Return observation
+    return rsp_obs;
+}
+
+
+/***********************************************************************//**
+ * @brief Return cache key for model component
+ *
+ * @param[in] model Model component.
+ * @param[in] obs CTA observation.
+ * @param[out] norm Normalisation of model component.
+ * @return Cache key (empty if model component can not be cached).
+ *
+ * Returns a key that identifies the response-convolved model component
+ * values for an observation and the model cube geometry. The first model
+ * parameter named "Prefactor" or "Normalization" is considered as the
+ * linear normalisation of the model component, and its value is returned
+ * in @p norm. All other model parameters enter the key. If the model
+ * component has no normalisation parameter, an empty key is returned.
+ ***************************************************************************/
+std::string ctmodel::cache_key(const GModel*          model,
+                               const GCTAObservation* obs,
+                               double&                norm) const
+{
+    // Initialise key stream
+    std::ostringstream key;
+    key << std::setprecision(17);
+
+    // Initialise normalisation flag
+    bool has_norm = false;
+
+    // Add model component and parameters to key
+    key << model->classname() << ":" << model->name();
+    for (int i = 0; i < model->size(); ++i) {
+        const GModelPar& par = (*model)[i];
+        if (!has_norm && (par.name() == "Prefactor" ||
+                          par.name() == "Normalization")) {
+            norm     = par.value();
+            has_norm = true;
+        }
+        else {
+            key << "|" << par.name() << "=" << par.value();
+        }
+    }
+
+    // Return empty key if model component has no normalisation
+    if (!has_norm) {
+        return "";
+    }
+
+    // Add observation to key
+    key << "|" << obs->instrument() << ":" << obs->id() << ":" << obs->name()
+        << "|" << obs->ontime() << "|" << obs->livetime()
+        << "|" << obs->pointing().dir().ra_deg()
+        << "|" << obs->pointing().dir().dec_deg()
+        << "|" << obs->ebounds().print() << "|" << m_apply_edisp;
+    if (obs->eventtype() == "EventList") {
+        key << "|" << obs->roi().centre().dir().ra_deg()
+            << "|" << obs->roi().centre().dir().dec_deg()
+            << "|" << obs->roi().radius();
+    }
+
+    // Add cube geometry to key
+    key << "|" << m_cache_geom;
+
+    // Return key
+    return (key.str());
+}
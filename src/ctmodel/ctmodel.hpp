@@ -49,6 +49,11 @@
  * Results are stored in an observation container that can be written to disk
  * in form of FITS files (model maps) and an updated observation definition
  * XML file.
+ *
+ * If the cache parameter is set, the response-convolved values of each
+ * model component are cached, so that subsequent runs in which only the
+ * normalisations of the model components change just rescale the cached
+ * values.
  ***************************************************************************/
 class ctmodel : public ctobservation {
 
@@ -80,12 +85,23 @@ protected:
     void get_parameters(void);
     void get_obs(void);
     void extract_cube_properties(void);
-    void fill_cube(const GCTAObservation* obs);
+    void fill_cube(const GCTAObservation* obs, const int& nthreads);
     bool has_cube(void) const;
+    std::vector<double> eval_component(const GModel*                       model,
+                                       const GCTAObservation*              obs,
+                                       const std::vector<GCTAObservation>& thread_obs,
+                                       const std::vector<int>&             indices,
+                                       const std::vector<bool>&            usage);
+    GCTAObservation     response_observation(const GCTAObservation* obs) const;
+    std::string         cache_key(const GModel*          model,
+                                  const GCTAObservation* obs,
+                                  double&                norm) const;
 
     // User parameters
     GFilename m_outcube;      //!< Output model cube
     bool      m_apply_edisp;  //!< Apply energy dispersion?
+    bool      m_use_cache;    //!< Cache model components?
+    int       m_nthreads;     //!< Number of threads
     bool      m_publish;      //!< Publish model cube?
     GChatter  m_chatter;      //!< Chattiness
 
@@ -100,6 +116,11 @@ protected:
     std::vector<GEnergy>     m_energy;      //!< Cube energies
     std::vector<GEnergy>     m_ewidth;      //!< Cube energy widths
     GTime                    m_time;        //!< Cube time
+
+    // Model component cache
+    std::string                       m_cache_geom;   //!< Cube geometry key
+    std::vector<std::string>          m_cache_keys;   //!< Component keys
+    std::vector<std::vector<double> > m_cache_values; //!< Normalised values
 };
 
 
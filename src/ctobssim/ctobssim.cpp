@@ -30,30 +30,68 @@
 #endif
 #include <cstdio>
 #include <typeinfo> 
+#ifdef _OPENMP
+#include <omp.h>
+#endif
 #include "ctobssim.hpp"
 #include "GTools.hpp"
 #include "GFits.hpp"
+#if defined(HAVE_LIBCFITSIO)
+#if defined(HAVE_CFITSIO_FITSIO_H)
+#include <cfitsio/fitsio.h>
+#elif defined(HAVE_FITSIO_H)
+#include <fitsio.h>
+#endif
+#endif
 
 
 /* __ Method name definitions ____________________________________________ */
+#define G_MERGE_EVENTS             "ctobssim::merge_events(GObservations&, "\
+                                                            "GObservations&)"
 #define G_GET_PARAMETERS                         "ctobssim::get_parameters()"
 #define G_SIMULATE_SOURCE      "ctobssim::simulate_source(GCTAObservation*, "\
-                                                    "GModels&, GRan&, GLog*)"
+                                            "GModels&, GRan&, GLog*, void*)"
 #define G_SIMULATE_INTERVAL    "ctobssim::simulate_interval(GCTAObservation*"\
-                       ", GCTAEventList*, GCTAResponseIrf*, GModels&, GTime&"\
-                           ", GTime&, GEnergy&, GEnergy&, GEnergy&, GEnergy&"\
-                          ", GSkyDir&, double&, double&, GRan&, GLog*, int&)"
+                       ", GCTAResponseIrf*, GCTAEventList*, GModels&, GTime&"\
+                          ", GTime&, GEbounds&, int&, GSkyDir&, double&, GRan&"\
+                        ", GLog*, int&, std::vector<int>&, std::vector<int>&)"
+#define G_OPEN_STREAM          "ctobssim::open_stream(GCTAObservation*, "\
+                                          "GModels&, std::string&, GLog*)"
+#define G_STREAM_ROWS               "ctobssim::stream_rows(void*, GFitsTable&)"
+#define G_CLOSE_STREAM                     "ctobssim::close_stream(void*, int&)"
 #define G_GET_AREA      "ctobssim::get_area(GCTAObservation* obs, GEnergy&, "\
                                                                   "GEnergy&)"
 
 /* __ Constants __________________________________________________________ */
-const double g_roi_margin = 0.5;      //!< Simulation radius margin (degrees)
+const double g_roi_margin   = 0.5;    //!< Simulation radius margin (degrees)
+const double g_max_interval = 1800.0; //!< Maximum parallel interval (sec)
 
 /* __ Debug definitions __________________________________________________ */
 //#define G_SOURCE_DEBUG
 //#define G_BACKGROUND_DEBUG
 
 /* __ Coding definitions _________________________________________________ */
+#if defined(HAVE_LIBCFITSIO) && \
+    (defined(HAVE_CFITSIO_FITSIO_H) || defined(HAVE_FITSIO_H))
+#define G_STREAM_EVENTS                //!< Event streaming into FITS files
+#endif
+
+/* __ Type definitions ___________________________________________________ */
+#if defined(G_STREAM_EVENTS)
+/***********************************************************************//**
+ * @brief Output file for event streaming
+ *
+ * Holds the cfitsio file pointer of an output file together with a lock
+ * that serialises the access to this output file. Output files of
+ * different observations can hence be written simultaneously.
+ ***************************************************************************/
+struct ctobssim_stream {
+    fitsfile*  fptr;  //!< cfitsio file pointer
+    #ifdef _OPENMP
+    omp_lock_t lock;  //!< Lock for output file access
+    #endif
+};
+#endif
 
 
 /*==========================================================================
@@ -226,7 +264,9 @@ void ctobssim::clear(void)
  * @brief Run the ctobssim tool.
  *
  * Gets the user parameters, loops over all CTA observations in the
- * observation container, and simulate events for each observation. 
+ * observation container, and simulate events for each observation. For
+ * binned CTA observations the counts cube is simulated directly from the
+ * predicted number of counts in each bin.
  ***************************************************************************/
 void ctobssim::run(void)
 {
@@ -272,8 +312,17 @@ void ctobssim::run(void)
     std::string xml  = (m_use_xml)
                        ? "Write Observation Definition XML file"
                        : "Write single event list FITS file";
+    std::string parallel = (m_split_obs)
+                           ? "Parallelise within observations"
+                           : "Parallelise over observations";
     log_value(NORMAL, "Event list management", mode);
     log_value(NORMAL, "Output format", xml);
+    log_value(NORMAL, "Parallelisation", parallel);
+    log_value(NORMAL, "Number of threads", number_of_threads());
+    if (m_save_and_dispose && m_chunk_size > 0) {
+        log_value(NORMAL, "Event streaming", "Chunks of "+
+                  gammalib::str(m_chunk_size)+" events");
+    }
 
     // Write seed values into logger
     log_header1(NORMAL, "Seed values");
@@ -288,10 +337,15 @@ void ctobssim::run(void)
     // Write header
     log_header1(TERSE, gammalib::number("Simulate observation", m_obs.size()));
 
+    // Determine number of threads
+    int nthreads = number_of_threads();
+
     // From here on the code can be parallelized if OpenMP support
     // is enabled. The code in the following block corresponds to the
-    // code that will be executed in each thread
-    #pragma omp parallel
+    // code that will be executed in each thread. If the simulation of
+    // each observation is distributed over several threads, the
+    // observations are processed sequentially.
+    #pragma omp parallel num_threads(nthreads) if(!m_split_obs)
     {
         // Each thread will have it's own logger to avoid conflicts
         GLog wrklog;
@@ -332,15 +386,35 @@ void ctobssim::run(void)
                 continue;
             }
 
-            // Skip observation if we have a binned observation
+            // If we have a binned observation then simulate the counts
+            // cube directly from the model
             if (obs->eventtype() == "CountsCube") {
-                if (logTerse()) {
-                    wrklog << " Skipping binned ";
-                    wrklog << obs->instrument();
-                    wrklog << " observation" << std::endl;
-                }
+
+                // Simulate counts cube
+                simulate_cube(obs, models, m_rans[i], &wrklog);
+
+                // If requested, counts cube is saved immediately
+                if (m_save_and_dispose) {
+
+                    // Set output file name
+                    std::string outfile = this->outfile(i);
+
+                    // Store output file name in original observation
+                    obs->eventfile(outfile);
+
+                    // Save observation into FITS file. This is a critical
+                    // zone to avoid multiple threads writing simultaneously
+                    #pragma omp critical(ctobssim_run)
+                    {
+                        obs->save(outfile, clobber());
+                    }
+
+                } // endif: save and dispose requested
+
+                // Continue with next observation
                 continue;
-            }
+
+            } // endif: observation was binned
 
             // Remove now all events from the event list but keep the
             // event list information such as ROI, Good Time Intervals,
@@ -357,23 +431,65 @@ void ctobssim::run(void)
             // Save number of events before entering simulation
             int events_before = obs_clone.events()->size();
 
-            // Simulate source events
-            simulate_source(&obs_clone, models, m_rans[i], &wrklog);
+            // If events should be streamed then write the observation
+            // without any events into the output file and keep the file
+            // open. The simulated events will then be appended in chunks to
+            // the events table of this file, so that only a chunk of events
+            // is held in memory.
+            void*       stream = NULL;
+            std::string outfile;
+            if (m_save_and_dispose && m_chunk_size > 0) {
+                outfile = this->outfile(i);
+                stream  = open_stream(&obs_clone, models, outfile, &wrklog);
+            }
 
             // Simulate source events
-            simulate_background(&obs_clone, models, m_rans[i], &wrklog);
+            simulate_source(&obs_clone, models, m_rans[i], &wrklog, stream);
 
-            // Set Monte Carlo identifier and name correspondance
-            set_mc_id_names(&obs_clone, models, &wrklog);
+            // Simulate source events
+            simulate_background(&obs_clone, models, m_rans[i], &wrklog,
+                                stream);
+
+            // If events are streamed then write the remaining events and
+            // close the output file, otherwise set Monte Carlo identifier
+            // and name correspondance
+            int nstreamed = 0;
+            if (stream != NULL) {
+                GCTAEventList* list =
+                     static_cast<GCTAEventList*>(obs_clone.events());
+                stream_events(list, stream);
+                close_stream(stream, nstreamed);
+            }
+            else {
+                set_mc_id_names(&obs_clone, models, &wrklog);
+            }
 
             // Dump simulation results
             if (logTerse()) {
+                int nevents = (stream != NULL)
+                    ? nstreamed
+                    : obs_clone.events()->size() - events_before;
                 wrklog << gammalib::parformat("MC events");
-                wrklog << obs_clone.events()->size() - events_before;
+                wrklog << nevents;
                 wrklog << " (all models)";
                 wrklog << std::endl;
             }
 
+            // If events were streamed then store the output file name and
+            // dispose the events
+            if (stream != NULL) {
+
+                // Store output file name in original observation
+                obs->eventfile(outfile);
+
+                // Dispose events
+                obs->dispose_events();
+
+                // Continue with next observation
+                continue;
+
+            } // endif: events were streamed
+
             // Append the event list to the original observation
             obs->events(*(obs_clone.events()));
 
@@ -498,12 +614,20 @@ void ctobssim::publish(const std::string& name)
                 // Write event list name into logger
                 log_value(NORMAL, "Event list name", user_name);
 
-                // Write events into in-memory FITS file
-                GFits fits;
-                obs->write(fits);
+                // Publish counts cube of binned observation
+                if (obs->eventtype() == "CountsCube") {
+                    const GCTAEventCube* cube =
+                          static_cast<const GCTAEventCube*>(obs->events());
+                    cube->counts().publish(user_name);
+                }
 
-                // Publish
-                fits.publish(gammalib::extname_cta_events, user_name);
+                // ... otherwise write events into in-memory FITS file and
+                // publish event list
+                else {
+                    GFits fits;
+                    obs->write(fits);
+                    fits.publish(gammalib::extname_cta_events, user_name);
+                }
 
             } // endif: there were events
 
@@ -538,6 +662,9 @@ void ctobssim::init_members(void)
     m_eslices     = 10;
     m_apply_edisp = false;
     m_max_rate    = 1.0e6;
+    m_nthreads    = 0;
+    m_split_obs   = false;
+    m_chunk_size  = 0;
 
     // Initialise protected members
     m_rans.clear();
@@ -569,6 +696,9 @@ void ctobssim::copy_members(const ctobssim& app)
     m_eslices     = app.m_eslices;
     m_apply_edisp = app.m_apply_edisp;
     m_max_rate    = app.m_max_rate;
+    m_nthreads    = app.m_nthreads;
+    m_split_obs   = app.m_split_obs;
+    m_chunk_size  = app.m_chunk_size;
 
     // Copy protected members
     m_max_photons      = app.m_max_photons;
@@ -634,6 +764,14 @@ void ctobssim::get_parameters(void)
     m_eslices     = (*this)["eslices"].integer();
     m_apply_edisp = (*this)["edisp"].boolean();
     m_max_rate    = (*this)["maxrate"].real();
+    m_nthreads    = (*this)["nthreads"].integer();
+    m_split_obs   = (*this)["splitobs"].boolean();
+    m_chunk_size  = (*this)["chunksize"].integer();
+
+    // Event streaming requires the cfitsio library
+    #if !defined(G_STREAM_EVENTS)
+    m_chunk_size = 0;
+    #endif
 
     // Optionally read ahead parameters so that they get correctly
     // dumped into the log file
@@ -703,6 +841,11 @@ void ctobssim::get_parameters(void)
  * @param[in] models Model list.
  * @param[in,out] ran Random number generator.
  * @param[in] wrklog Pointer to logger.
+ * @param[in,out] stream Pointer to output file for event streaming.
+ *
+ * @exception GException::invalid_value
+ *            No CTA IRF response found in observation or simulation of a
+ *            time and energy interval failed in a parallel thread.
  *
  * Simulate source events from a photon list for a given CTA observation and
  * all source models. The events are stored in form of an event list in the
@@ -717,13 +860,30 @@ void ctobssim::get_parameters(void)
  * is large, the simulation may be done within time slices so that the
  * memory requirements won't get too large.
  *
+ * If the hidden "splitobs" parameter is true, the time and energy
+ * intervals are distributed over the threads. Each interval is then
+ * simulated into its own event list using its own random number generator,
+ * with a seed that is drawn from the random number generator of the
+ * observation. The event lists are merged in the order of the intervals,
+ * hence the simulated events do not depend on the number of threads. Each
+ * interval is merged as soon as it and all preceding intervals have been
+ * simulated, hence only the intervals that are not yet merged are held in
+ * memory.
+ *
+ * Event identifiers are assigned in the order of the merged events.
+ *
+ * If a @p stream output file is specified, the events are appended to the
+ * events table of this FITS file and removed from the event list as soon
+ * as the number of events reaches the chunk size.
+ *
  * This method does nothing if the observation pointer is NULL. It verifies
  * if the observation has a CTA IRF response.
  ***************************************************************************/
 void ctobssim::simulate_source(GCTAObservation* obs,
                                const GModels&   models,
                                GRan&            ran,
-                               GLog*            wrklog)
+                               GLog*            wrklog,
+                               void*            stream)
 {
     // Debug code: signal that we step into the simulate_source method
     #if defined(G_SOURCE_DEBUG)
@@ -768,113 +928,200 @@ void ctobssim::simulate_source(GCTAObservation* obs,
             *wrklog << ", radius=" << rad << " deg" << std::endl;
         }
 
-        // Initialise indentation for logging
-        int indent = 0;
-
-        // Initialise photon and event counters
-        std::vector<int> nphotons(models.size(),0);
-        std::vector<int> nevents(models.size(),0);
-
-        // Loop over all Good Time Intervals
+        // Set time intervals for the simulation. If the simulation is
+        // distributed over several threads, the Good Time Intervals are
+        // split into time intervals of at most g_max_interval seconds so
+        // that a single long observation can make use of all threads.
+        std::vector<GTime> tmins;
+        std::vector<GTime> tmaxs;
         for (int it = 0; it < events->gti().size(); ++it) {
-
-            // Extract time interval
             GTime tmin = events->gti().tstart(it);
             GTime tmax = events->gti().tstop(it);
-
-            // Log time interval. Increment indentation if there are
-            // several Good Time Intervals.
-            if (logNormal()) {
-                if (events->gti().size() > 1) {
-                    indent++;
-                    wrklog->indent(indent);
+            if (m_split_obs) {
+                while (tmax - tmin > g_max_interval) {
+                    tmins.push_back(tmin);
+                    tmaxs.push_back(tmin + g_max_interval);
+                    tmin += g_max_interval;
                 }
-                *wrklog << gammalib::parformat("Time interval", indent);
-                *wrklog << tmin.convert(m_cta_ref);
-                *wrklog << " - ";
-                *wrklog << tmax.convert(m_cta_ref);
-                *wrklog << " s" << std::endl;
             }
+            tmins.push_back(tmin);
+            tmaxs.push_back(tmax);
+        }
 
-            // Loop over all energy boundaries
-            for (int ie = 0; ie <  ebounds.size(); ++ie) {
-
-                // Set reconstructed energy interval
-                GEnergy ereco_min = ebounds.emin(ie);
-                GEnergy ereco_max = ebounds.emax(ie);
+        // Determine number of time and energy intervals. Each interval is
+        // defined by a time interval index it and an energy boundary
+        // index ie, with index = it * ebounds.size() + ie.
+        int ntimes     = tmins.size();
+        int nebounds   = ebounds.size();
+        int nintervals = ntimes * nebounds;
 
-                // Set true photon energy limits for simulation. If the
-                // observation has energy dispersion then add a margin.
-                GEnergy etrue_min = ereco_min;
-                GEnergy etrue_max = ereco_max;
-                if (rsp->use_edisp()) {
-                    etrue_min = rsp->ebounds(etrue_min).emin();
-                    etrue_max = rsp->ebounds(etrue_max).emax();
-                }
+        // Initialise indentation for logging. Increment indentation if
+        // there are several time intervals.
+        int indent = (ntimes > 1) ? 1 : 0;
 
-                // Determine simulation area
-                double area = get_area(obs, etrue_min, etrue_max);
+        // Save state of event counter before doing the simulation
+        int events_before = events->size();
 
-                // Log energy range and simulation area
-                if (logNormal()) {
-                    *wrklog << gammalib::parformat("Photon energy range", indent);
-                    *wrklog << etrue_min << " - " << etrue_max << std::endl;
-                    *wrklog << gammalib::parformat("Event energy range", indent);
-                    *wrklog << ereco_min << " - " << ereco_max << std::endl;
-                }
+        // Initialise photon and event counters
+        std::vector<int> nphotons(models.size(),0);
+        std::vector<int> nevents(models.size(),0);
 
-                // Increment indentation if there are several energy
-                // boundaries
-                if (logNormal()) {
-                    if (ebounds.size() > 1) {
-                        indent++;
-                        wrklog->indent(indent);
-                    }
-                }
+        // Case A: simulate all intervals sequentially using the random
+        // number generator of the observation
+        if (!m_split_obs) {
+
+            // Loop over all intervals
+            for (int index = 0; index < nintervals; ++index) {
+                int it = index / nebounds;
+                int ie = index % nebounds;
+                simulate_interval(obs, rsp, events, models,
+                                  tmins[it], tmaxs[it], ebounds, ie,
+                                  dir, rad, ran, wrklog, indent,
+                                  nphotons, nevents, stream);
+            }
 
-                // Log simulation area
-                if (logNormal()) {
-                    *wrklog << gammalib::parformat("Simulation area", indent);
-                    *wrklog << area << " cm2" << std::endl;
-                }
+        } // endif: sequential simulation
 
-                // Save state of event counter before doing the simulation
-                int nevents_before = events->size();
+        // Case B: distribute the intervals over several threads
+        else {
 
-                // Simulate events for this time and energy interval
-                simulate_interval(obs, rsp, events, models, tmin, tmax,
-                                  etrue_min, etrue_max, ereco_min, ereco_max,
-                                  dir, rad, area,
-                                  ran, wrklog, indent, nphotons, nevents);
+            // Derive one random number generator per interval from the
+            // random number generator of the observation. The seeds are
+            // drawn sequentially so that they only depend on the seed of
+            // the observation.
+            std::vector<GRan> rans;
+            for (int index = 0; index < nintervals; ++index) {
+                unsigned long long int seed =
+                    (unsigned long long int)(ran.uniform() * 1.0e10) +
+                    ran.seed();
+                rans.push_back(GRan(seed));
+            }
 
-                // Log simulation results
-                if (logNormal()) {
-                    *wrklog << gammalib::parformat("MC source events", indent);
-                    *wrklog << events->size() - nevents_before;
-                    *wrklog << " (all source models)";
-                    *wrklog << std::endl;
-                }
+            // Allocate one event list, logger and set of counters per
+            // interval
+            std::vector<int>               zeros(models.size(),0);
+            std::vector<GCTAEventList>     lists(nintervals);
+            std::vector<GLog>              logs(nintervals);
+            std::vector<std::vector<int> > photons(nintervals, zeros);
+            std::vector<std::vector<int> > counts(nintervals, zeros);
+            for (int index = 0; index < nintervals; ++index) {
+                lists[index].roi(events->roi());
+                logs[index].date(wrklog->date());
+                logs[index].name(wrklog->name());
+                logs[index].buffer_size(10000000);
+            }
 
-                // Reset indentation if there were several energy boundaries
-                if (logNormal()) {
-                    if (ebounds.size() > 1) {
-                        indent--;
-                        wrklog->indent(indent);
+            // Initialise error message. Exceptions can not be thrown out
+            // of a parallel region, hence we keep the first error message
+            // and throw an exception after the parallel region.
+            std::string error;
+
+            // Initialise merging of intervals. Each interval is merged into
+            // the event list as soon as it and all preceding intervals are
+            // finished, hence the events are merged in the order of the
+            // intervals while only the intervals that are not yet merged
+            // are held in memory. The merging is protected by a lock.
+            std::vector<bool> finished(nintervals, false);
+            int               next = 0;
+            #ifdef _OPENMP
+            omp_lock_t merge_lock;
+            omp_init_lock(&merge_lock);
+            #endif
+
+            // Simulate intervals in parallel
+            #pragma omp parallel num_threads(number_of_threads())
+            {
+                // Each thread works on its own copy of the observation
+                // and the models since the response and the models
+                // hold internal caches that are not thread safe
+                GCTAObservation thread_obs(*obs);
+                GModels         thread_models(models);
+                const GCTAResponseIrf* thread_rsp =
+                   static_cast<const GCTAResponseIrf*>(thread_obs.response());
+
+                // Loop over intervals
+                #pragma omp for schedule(dynamic)
+                for (int index = 0; index < nintervals; ++index) {
+                    int it            = index / nebounds;
+                    int ie            = index % nebounds;
+                    int thread_indent = indent;
+                    std::string msg;
+                    try {
+                        simulate_interval(&thread_obs, thread_rsp,
+                                          &(lists[index]), thread_models,
+                                          tmins[it], tmaxs[it], ebounds, ie,
+                                          dir, rad, rans[index],
+                                          &(logs[index]), thread_indent,
+                                          photons[index], counts[index]);
+                    }
+                    catch (std::exception& e) {
+                        msg = e.what();
+                    }
 
+                    // Merge all finished intervals that follow the last
+                    // merged interval, and stream the events if the chunk
+                    // size is reached
+                    #ifdef _OPENMP
+                    omp_set_lock(&merge_lock);
+                    #endif
+                    finished[index] = true;
+                    while (next < nintervals && finished[next]) {
+                        try {
+                            for (int k = 0; k < lists[next].size(); ++k) {
+                                events->append(*(lists[next][k]));
+                                if (stream != NULL) {
+                                    stream_chunk(events, stream);
+                                }
+                            }
+                        }
+                        catch (std::exception& e) {
+                            if (msg.empty()) {
+                                msg = e.what();
+                            }
+                        }
+                        lists[next] = GCTAEventList();
+                        *wrklog << logs[next];
+                        logs[next].clear();
+                        for (int i = 0; i < models.size(); ++i) {
+                            nphotons[i] += photons[next][i];
+                            nevents[i]  += counts[next][i];
+                        }
+                        next++;
                     }
-                }
+                    if (!msg.empty() && error.empty()) {
+                        error = msg;
+                    }
+                    #ifdef _OPENMP
+                    omp_unset_lock(&merge_lock);
+                    #endif
 
-            } // endfor: looped over all energy boundaries
+                } // endfor: looped over intervals
 
-            // Reset indentation if there were several Good Time Intervals
-            if (logNormal()) {
-                if (events->gti().size() > 1) {
-                    indent--;
-                    wrklog->indent(indent);
-                }
+            } // end pragma omp parallel
+
+            // Destroy merge lock
+            #ifdef _OPENMP
+            omp_destroy_lock(&merge_lock);
+            #endif
+
+            // Throw exception if the simulation failed in one of the threads
+            if (!error.empty()) {
+                throw GException::invalid_value(G_SIMULATE_SOURCE, error);
+            }
+
+            // If events are streamed then all events in the event list are
+            // new events
+            if (stream != NULL) {
+                events_before = 0;
             }
 
-        } // endfor: looped over all time intervals
+            // Signal that event list contains Monte Carlo identifiers
+            events->has_mc_id(true);
+
+        } // endelse: parallel simulation
+
+        // Set event identifiers
+        set_event_ids(events, events_before);
 
         // Reset indentation
         wrklog->indent(0);
@@ -925,20 +1172,25 @@ void ctobssim::simulate_source(GCTAObservation* obs,
  * @param[in] models Model list.
  * @param[in] tmin Start time.
  * @param[in] tmax Stop time.
- * @param[in] etrue_min Minimum true energy.
- * @param[in] etrue_max Maximum true energy.
- * @param[in] ereco_min Minimum reconstructed energy.
- * @param[in] ereco_max Maximum reconstructed energy.
+ * @param[in] ebounds Energy boundaries for simulation.
+ * @param[in] ie Energy boundary index.
  * @param[in] dir Simulation cone centre.
  * @param[in] rad Simulation cone radius (degrees).
- * @param[in] area Simulation area (cm^2).
  * @param[in,out] ran Random number generator.
  * @param[in] wrklog Pointer to logger.
  * @param[in,out] indent Logger indent.
  * @param[in,out] nphotons Number of photons for all models.
  * @param[in,out] nevents Number of events for all models.
+ * @param[in,out] stream Pointer to output file for event streaming.
+ *
+ * @exception GException::invalid_value
+ *            Photon rate of a model exceeds the maximum photon rate.
  *
- * Simulate source events for a time and energy interval.
+ * Simulate source events for a time interval and the energy boundary
+ * @p ie. Simulated events are appended to the event list but no event
+ * identifiers are set. If a @p stream output file is specified, the events
+ * are streamed into the output file as soon as the chunk size is
+ * reached.
  ***************************************************************************/
 void ctobssim::simulate_interval(GCTAObservation*       obs,
                                  const GCTAResponseIrf* rsp,
@@ -946,19 +1198,30 @@ void ctobssim::simulate_interval(GCTAObservation*       obs,
                                  const GModels&         models,
                                  const GTime&           tmin,
                                  const GTime&           tmax,
-                                 const GEnergy&         etrue_min,
-                                 const GEnergy&         etrue_max,
-                                 const GEnergy&         ereco_min,
-                                 const GEnergy&         ereco_max,
+                                 const GEbounds&        ebounds,
+                                 const int&             ie,
                                  const GSkyDir&         dir,
                                  const double&          rad,
-                                 const double&          area,
                                  GRan&                  ran,
                                  GLog*                  wrklog,
                                  int&                   indent,
                                  std::vector<int>&      nphotons,
-                                 std::vector<int>&      nevents)
+                                 std::vector<int>&      nevents,
+                                 void*                  stream)
 {
+    // Set reconstructed energy interval
+    GEnergy ereco_min = ebounds.emin(ie);
+    GEnergy ereco_max = ebounds.emax(ie);
+
+    // Set true photon energy limits for simulation. If the observation has
+    // energy dispersion then add a margin.
+    GEnergy etrue_min = ereco_min;
+    GEnergy etrue_max = ereco_max;
+    if (rsp->use_edisp()) {
+        etrue_min = rsp->ebounds(etrue_min).emin();
+        etrue_max = rsp->ebounds(etrue_max).emax();
+    }
+
     // Debug code: signal that we step into the simulate_interval method
     #if defined(G_SOURCE_DEBUG)
     std::cout << "ctobssim::simulate_interval: in";
@@ -967,6 +1230,50 @@ void ctobssim::simulate_interval(GCTAObservation*       obs,
     std::cout << std::endl;
     #endif
 
+    // Determine simulation area
+    double area = get_area(obs, etrue_min, etrue_max);
+
+    // Set indentation for logging
+    wrklog->indent(indent);
+
+    // Log time interval for the first energy boundary
+    if (logNormal() && ie == 0) {
+        *wrklog << gammalib::parformat("Time interval", indent);
+        *wrklog << tmin.convert(m_cta_ref);
+        *wrklog << " - ";
+        *wrklog << tmax.convert(m_cta_ref);
+        *wrklog << " s" << std::endl;
+    }
+
+    // Log energy range
+    if (logNormal()) {
+        *wrklog << gammalib::parformat("Photon energy range", indent);
+        *wrklog << etrue_min << " - " << etrue_max << std::endl;
+        *wrklog << gammalib::parformat("Event energy range", indent);
+        *wrklog << ereco_min << " - " << ereco_max << std::endl;
+    }
+
+    // Increment indentation if there are several energy boundaries
+    if (logNormal()) {
+        if (ebounds.size() > 1) {
+            indent++;
+            wrklog->indent(indent);
+        }
+    }
+
+    // Log simulation area
+    if (logNormal()) {
+        *wrklog << gammalib::parformat("Simulation area", indent);
+        *wrklog << area << " cm2" << std::endl;
+    }
+
+    // Save state of event counter before doing the simulation. Since events
+    // may be streamed, the events are counted using the event counters.
+    int nevents_interval = 0;
+    for (int i = 0; i < nevents.size(); ++i) {
+        nevents_interval += nevents[i];
+    }
+
     // Loop over all models
     for (int i = 0; i < models.size(); ++i) {
 
@@ -1070,7 +1377,7 @@ void ctobssim::simulate_interval(GCTAObservation*       obs,
                                 etrue_min, etrue_max, ereco_min, ereco_max,
                                 dir, rad, area,
                                 ran, wrklog, indent,
-                                nphotons[i], nevents[i]);
+                                nphotons[i], nevents[i], stream);
 
             // Go to next time slice
             tstart = tstop;
@@ -1105,6 +1412,26 @@ void ctobssim::simulate_interval(GCTAObservation*       obs,
 
     } // endfor: looped over models
 
+    // Log simulation results
+    if (logNormal()) {
+        int nevents_all = -nevents_interval;
+        for (int i = 0; i < nevents.size(); ++i) {
+            nevents_all += nevents[i];
+        }
+        *wrklog << gammalib::parformat("MC source events", indent);
+        *wrklog << nevents_all;
+        *wrklog << " (all source models)";
+        *wrklog << std::endl;
+    }
+
+    // Reset indentation if there were several energy boundaries
+    if (logNormal()) {
+        if (ebounds.size() > 1) {
+            indent--;
+            wrklog->indent(indent);
+        }
+    }
+
     // Debug code: signal that we are down with the simulate_interval method
     #if defined(G_SOURCE_DEBUG)
     std::cout << "ctobssim::simulate_interval: out" << std::endl;
@@ -1137,8 +1464,12 @@ void ctobssim::simulate_interval(GCTAObservation*       obs,
  * @param[in,out] indent Logger indent.
  * @param[in,out] nphotons Number of photons.
  * @param[in,out] nevents Number of events.
+ * @param[in,out] stream Pointer to output file for event streaming.
  *
- * Simulate source events for a time slice.
+ * Simulate source events for a time slice. If a @p stream output file is
+ * specified, the events are streamed into the output file as soon as the
+ * chunk size is reached, hence at most one chunk of events is held in
+ * memory.
  ***************************************************************************/
 void ctobssim::simulate_time_slice(GCTAObservation*       obs,
                                    const GCTAResponseIrf* rsp,
@@ -1158,7 +1489,8 @@ void ctobssim::simulate_time_slice(GCTAObservation*       obs,
                                    GLog*                  wrklog,
                                    int&                   indent,
                                    int&                   nphotons,
-                                   int&                   nevents)
+                                   int&                   nevents,
+                                   void*                  stream)
 {
     // Debug code: signal that we step into the model MC method
     #if defined(G_SOURCE_DEBUG)
@@ -1213,22 +1545,23 @@ void ctobssim::simulate_time_slice(GCTAObservation*       obs,
                 event->time() >= tstart &&
                 event->time() <= tstop) {
 
-                // Set event identifier
-                event->event_id(m_event_id);
-
                 // Set Monte Carlo identifier
                 event->mc_id(mc_id);
 
                 // Append event
                 events->append(*event);
 
-                // Increment counters
-                m_event_id++;
+                // Increment counter
                 nevents++;
             }
             delete event;
         }
 
+        // Stream events if chunk size is reached
+        if (stream != NULL) {
+            stream_chunk(events, stream);
+        }
+
     } // endfor: looped over events
 
     // Signal that event list contains Monte Carlo identifiers
@@ -1451,16 +1784,22 @@ double ctobssim::get_model_flux(const GModelSky* model,
  * @param[in] models Models.
  * @param[in] ran Random number generator.
  * @param[in] wrklog Pointer to logger.
+ * @param[in,out] stream Pointer to output file for event streaming.
  *
  * Simulate background events from models. The events are stored as event
  * list in the observation.
  *
+ * If a @p stream output file is specified, the events are appended to the
+ * events table of this FITS file and removed from the event list as soon
+ * as the number of events reaches the chunk size.
+ *
  * This method does nothing if the observation pointer is NULL.
  ***************************************************************************/
 void ctobssim::simulate_background(GCTAObservation* obs,
                                    const GModels&   models,
                                    GRan&            ran,
-                                   GLog*            wrklog)
+                                   GLog*            wrklog,
+                                   void*            stream)
 {
     // Continue only if observation pointer is valid
     if (obs != NULL) {
@@ -1474,6 +1813,32 @@ void ctobssim::simulate_background(GCTAObservation* obs,
         GCTAEventList* events =
             static_cast<GCTAEventList*>(const_cast<GEvents*>(obs->events()));
 
+        // Set Good Time Intervals for the simulation. If events are
+        // streamed, the Good Time Intervals are split into slices of at
+        // most g_max_interval seconds so that the event list that is
+        // returned by the background model stays small.
+        GGti              gti = events->gti();
+        std::vector<GGti> slices;
+        if (stream == NULL) {
+            slices.push_back(gti);
+        }
+        else {
+            for (int it = 0; it < gti.size(); ++it) {
+                GTime tstart = gti.tstart(it);
+                GTime tstop  = gti.tstop(it);
+                while (tstart < tstop) {
+                    GTime tend = tstart + g_max_interval;
+                    if (tend > tstop) {
+                        tend = tstop;
+                    }
+                    GGti slice(gti.reference());
+                    slice.append(tstart, tend);
+                    slices.push_back(slice);
+                    tstart = tend;
+                }
+            }
+        }
+
         // Loop over all models
         for (int i = 0; i < models.size(); ++i) {
 
@@ -1486,76 +1851,98 @@ void ctobssim::simulate_background(GCTAObservation* obs,
             if (model != NULL &&
                 model->is_valid(obs->instrument(), obs->id())) {
 
-                // Debug code: signal that we step into the response MC method
-                #if defined(G_BACKGROUND_DEBUG)
-                std::cout << "ctobssim::simulate_background: model->mc in"
-                          << std::endl;
-                #endif
+                // Initialise statistics
+                int n_appended    = 0;
+                int n_outside_roi = 0;
+
+                // Loop over Good Time Interval slices
+                for (int is = 0; is < slices.size(); ++is) {
+
+                    // Debug code: signal that we step into the response MC
+                    // method
+                    #if defined(G_BACKGROUND_DEBUG)
+                    std::cout << "ctobssim::simulate_background: model->mc in"
+                              << std::endl;
+                    #endif
+
+                    // Get simulated CTA event list. Note that this method
+                    // includes the deadtime correction. If events are
+                    // streamed the Good Time Intervals of the event list
+                    // are temporarily replaced by the slice.
+                    if (stream != NULL) {
+                        events->gti(slices[is]);
+                    }
+                    GCTAEventList* list =
+                         dynamic_cast<GCTAEventList*>(model->mc(*obs, ran));
+                    if (stream != NULL) {
+                        events->gti(gti);
+                    }
 
-                // Get simulated CTA event list. Note that this method
-                // includes the deadtime correction.
-                GCTAEventList* list =
-                     dynamic_cast<GCTAEventList*>(model->mc(*obs, ran));
+                    // Debug code: signal that we came back
+                    #if defined(G_BACKGROUND_DEBUG)
+                    std::cout << "ctobssim::simulate_background: model->mc out"
+                              << std::endl;
+                    #endif
 
-                // Debug code: signal that we came back
-                #if defined(G_BACKGROUND_DEBUG)
-                std::cout << "ctobssim::simulate_background: model->mc out"
-                          << std::endl;
-                #endif
+                    // Continue only if we got a CTA event list
+                    if (list != NULL) {
 
-                // Continue only if we got a CTA event list
-                if (list != NULL) {
+                        // Reserves space for events
+                        if (stream == NULL) {
+                            events->reserve(list->size()+events->size());
+                        }
 
-                    // Reserves space for events
-                    events->reserve(list->size()+events->size());
+                        // Append events
+                        for (int k = 0; k < list->size(); k++) {
 
-                    // Initialise statistics
-                    int n_appended    = 0;
-                    int n_outside_roi = 0;
+                            // Get event pointer
+                            GCTAEventAtom* event = (*list)[k];
 
-                    // Append events
-                    for (int k = 0; k < list->size(); k++) {
+                            // Use event only if it falls within ROI
+                            if (events->roi().contains(*event)) {
 
-                        // Get event pointer
-                        GCTAEventAtom* event = (*list)[k];
+                                // Set event identifier
+                                event->event_id(m_event_id);
+                                m_event_id++;
 
-                        // Use event only if it falls within ROI
-                        if (events->roi().contains(*event)) {
+                                // Set Monte Carlo identifier
+                                event->mc_id(i+1);
 
-                            // Set event identifier
-                            event->event_id(m_event_id);
-                            m_event_id++;
+                                // Append event
+                                events->append(*event);
 
-                            // Set Monte Carlo identifier
-                            event->mc_id(i+1);
+                                // Increment number of appended events
+                                n_appended++;
 
-                            // Append event
-                            events->append(*event);
+                                // Stream events if chunk size is reached
+                                if (stream != NULL &&
+                                    events->size() >= m_chunk_size) {
+                                    stream_events(events, stream);
+                                }
 
-                            // Increment number of appended events
-                            n_appended++;
+                            } // endif: event was within ROI
 
-                        } // endif: event was within ROI
+                            // ... otherwise increment outside ROI counter
+                            else {
+                                n_outside_roi++;
+                            }
 
-                        // ... otherwise increment outside ROI counter
-                        else {
-                            n_outside_roi++;
-                        }
+                        } // endfor: looped over all events
 
-                    } // endfor: looped over all events
+                        // Free event list
+                        delete list;
 
-                    // Dump simulation results
-                    if (logNormal()) {
-                        *wrklog << gammalib::parformat("MC events outside ROI");
-                        *wrklog << n_outside_roi << std::endl;
-                        *wrklog << gammalib::parformat("MC background events");
-                        *wrklog << n_appended << std::endl;
-                    }
+                    } // endif: we had a CTA event list
 
-                    // Free event list
-                    delete list;
+                } // endfor: looped over Good Time Interval slices
 
-                } // endif: we had a CTA event list
+                // Dump simulation results
+                if (logNormal()) {
+                    *wrklog << gammalib::parformat("MC events outside ROI");
+                    *wrklog << n_outside_roi << std::endl;
+                    *wrklog << gammalib::parformat("MC background events");
+                    *wrklog << n_appended << std::endl;
+                }
 
             } // endif: model was valid
 
@@ -1571,6 +1958,93 @@ void ctobssim::simulate_background(GCTAObservation* obs,
 }
 
 
+/***********************************************************************//**
+ * @brief Simulate counts cube from model
+ *
+ * @param[in] obs Pointer on binned CTA observation.
+ * @param[in] models Models.
+ * @param[in] ran Random number generator.
+ * @param[in] wrklog Pointer to logger.
+ *
+ * Simulates the counts cube of a binned observation by drawing for each
+ * bin a Poisson random number from the number of predicted counts. The
+ * number of predicted counts is computed from all models that apply to
+ * the observation, using the response of the observation. This is
+ * statistically equivalent to simulating an event list and binning the
+ * events into the counts cube, but avoids the creation of events.
+ *
+ * Bins with zero weight, for example bins outside the RoI or energy range
+ * of the observations that were used for filling the cube, are set to
+ * zero counts.
+ *
+ * This method does nothing if the observation pointer is NULL.
+ ***************************************************************************/
+void ctobssim::simulate_cube(GCTAObservation* obs,
+                             const GModels&   models,
+                             GRan&            ran,
+                             GLog*            wrklog)
+{
+    // Continue only if observation pointer is valid
+    if (obs != NULL) {
+
+        // If no logger is specified then use the default logger
+        if (wrklog == NULL) {
+            wrklog = &log;
+        }
+
+        // Get pointer on event cube
+        GCTAEventCube* cube = static_cast<GCTAEventCube*>(obs->events());
+
+        // Initialise statistics
+        double npred   = 0.0;
+        double nevents = 0.0;
+
+        // Loop over all bins of the cube
+        for (int i = 0; i < cube->size(); ++i) {
+
+            // Get pointer on event bin
+            GCTAEventBin* bin = (*cube)[i];
+
+            // Initialise counts
+            double counts = 0.0;
+
+            // Draw counts only for bins with a positive size
+            if (bin->size() > 0.0) {
+
+                // Compute number of predicted counts in bin
+                double model = models.eval(*bin, *obs) * bin->size();
+
+                // Draw Poisson random number
+                if (model > 0.0) {
+                    counts  = ran.poisson(model);
+                    npred  += model;
+                }
+
+            } // endif: bin had a positive size
+
+            // Set counts
+            bin->counts(counts);
+
+            // Update number of simulated events
+            nevents += counts;
+
+        } // endfor: looped over all bins
+
+        // Dump simulation results
+        if (logTerse()) {
+            *wrklog << gammalib::parformat("Predicted events");
+            *wrklog << npred << std::endl;
+            *wrklog << gammalib::parformat("MC events");
+            *wrklog << nevents << " (all models)" << std::endl;
+        }
+
+    } // endif: observation pointer was valid
+
+    // Return
+    return;
+}
+
+
 /***********************************************************************//**
  * @brief Set correspondance between Monte Carlo identifier and model names
  *
@@ -1658,6 +2132,526 @@ void ctobssim::set_mc_id_names(GCTAObservation* obs,
 }
 
 
+/***********************************************************************//**
+ * @brief Return number of threads
+ *
+ * @return Number of threads.
+ *
+ * Returns the number of threads that is specified by the hidden "nthreads"
+ * parameter. If the parameter is zero, all available threads are used. If
+ * OpenMP support is not enabled, the method returns one.
+ ***************************************************************************/
+int ctobssim::number_of_threads(void) const
+{
+    // Initialise number of threads
+    int nthreads = 1;
+
+    // Set number of threads
+    #ifdef _OPENMP
+    nthreads = (m_nthreads > 0) ? m_nthreads : omp_get_max_threads();
+    #endif
+
+    // Return number of threads
+    return nthreads;
+}
+
+
+/***********************************************************************//**
+ * @brief Merge simulated events into observations
+ *
+ * @param[in,out] obs Observations with simulated events.
+ * @param[in] merge Observations with simulated events to merge.
+ *
+ * @exception GException::invalid_value
+ *            Observation containers are not compatible.
+ *
+ * Appends the events of each observation in @p merge to the events of the
+ * corresponding observation in @p obs. Both observation containers need to
+ * have the same number of observations with event lists and need to hold
+ * the models that were used for the simulation of their events.
+ *
+ * The Monte Carlo identifiers of the appended events are shifted by the
+ * number of models in @p obs, and the models of @p merge are appended to
+ * the models of @p obs so that the Monte Carlo identifiers are again
+ * consistent with the models. All events are then given consecutive event
+ * identifiers.
+ *
+ * The method is used by scripts that simulate part of the events only once
+ * and merge them with events that are simulated repeatedly.
+ ***************************************************************************/
+void ctobssim::merge_events(GObservations& obs, const GObservations& merge)
+{
+    // Throw an exception if the number of observations differ
+    if (obs.size() != merge.size()) {
+        std::string msg = "Number of observations to merge ("+
+                          gammalib::str(merge.size())+") differs from the "
+                          "number of observations ("+
+                          gammalib::str(obs.size())+"). Please specify "
+                          "observation containers with the same number of "
+                          "observations.";
+        throw GException::invalid_value(G_MERGE_EVENTS, msg);
+    }
+
+    // Set Monte Carlo identifier offset for the events to merge
+    int offset = obs.models().size();
+
+    // Append models of observations to merge
+    GModels models = obs.models();
+    for (int i = 0; i < merge.models().size(); ++i) {
+        models.append(*(merge.models()[i]));
+    }
+    obs.models(models);
+
+    // Initialise event identifier
+    int event_id = 1;
+
+    // Loop over all observations
+    for (int i = 0; i < obs.size(); ++i) {
+
+        // Get event lists
+        GCTAObservation*       cta = dynamic_cast<GCTAObservation*>(obs[i]);
+        const GCTAObservation* src =
+                               dynamic_cast<const GCTAObservation*>(merge[i]);
+        GCTAEventList*         events     = NULL;
+        const GCTAEventList*   src_events = NULL;
+        if (cta != NULL && src != NULL) {
+            events     = dynamic_cast<GCTAEventList*>(cta->events());
+            src_events = dynamic_cast<const GCTAEventList*>(src->events());
+        }
+
+        // Throw an exception if one of the observations has no event list
+        if (events == NULL || src_events == NULL) {
+            std::string msg = "Observation "+gammalib::str(i)+" has no CTA "
+                              "event list. Please specify observations with "
+                              "event lists for merging.";
+            throw GException::invalid_value(G_MERGE_EVENTS, msg);
+        }
+
+        // Append events with shifted Monte Carlo identifiers
+        int nevents = events->size();
+        events->reserve(nevents + src_events->size());
+        for (int k = 0; k < src_events->size(); ++k) {
+            GCTAEventAtom event = *((*src_events)[k]);
+            event.mc_id(event.mc_id() + offset);
+            events->append(event);
+        }
+
+        // Set consecutive event identifiers
+        for (int k = 0; k < events->size(); ++k) {
+            (*events)[k]->event_id(event_id);
+            event_id++;
+        }
+
+        // Set Monte Carlo identifier and name correspondance
+        set_mc_id_names(cta, models, &log);
+
+    } // endfor: looped over observations
+
+    // Return
+    return;
+}
+
+
+/***********************************************************************//**
+ * @brief Set event identifiers
+ *
+ * @param[in,out] events Pointer on CTA event list.
+ * @param[in] first Index of first event.
+ *
+ * Sets consecutive event identifiers for all events starting from the
+ * event with index @p first.
+ ***************************************************************************/
+void ctobssim::set_event_ids(GCTAEventList* events, const int& first)
+{
+    // Loop over events
+    for (int k = first; k < events->size(); ++k) {
+        (*events)[k]->event_id(m_event_id);
+        m_event_id++;
+    }
+
+    // Return
+    return;
+}
+
+
+/***********************************************************************//**
+ * @brief Open FITS file for event streaming
+ *
+ * @param[in,out] obs Pointer on CTA observation.
+ * @param[in] models Models.
+ * @param[in] outfile Output file name.
+ * @param[in] wrklog Pointer to logger.
+ * @return Pointer to output file for event streaming.
+ *
+ * @exception GException::invalid_value
+ *            Unable to open output file for event streaming.
+ *
+ * Sets the correspondance between Monte Carlo identifiers and model names
+ * for all models that apply to the observation, writes the observation
+ * without any events into the output file and opens the events table of
+ * the output file for appending events. Since the events are not known at
+ * this point, all models that apply to the observation are written into
+ * the header.
+ *
+ * The returned output file holds its own lock, hence events can be
+ * streamed simultaneously into the output files of different observations.
+ * The output file needs to be closed using close_stream().
+ ***************************************************************************/
+void* ctobssim::open_stream(GCTAObservation*   obs,
+                            const GModels&     models,
+                            const std::string& outfile,
+                            GLog*              wrklog)
+{
+    // Initialise output file pointer
+    void* stream = NULL;
+
+    // Get pointer on event list
+    GCTAEventList* events = static_cast<GCTAEventList*>(obs->events());
+
+    // Signal that event list contains Monte Carlo identifiers
+    events->has_mc_id(true);
+
+    // Collect Monte Carlo identifiers of all models that apply to the
+    // observation
+    std::vector<int>         ids;
+    std::vector<std::string> names;
+    for (int i = 0; i < models.size(); ++i) {
+        if (models[i]->is_valid(obs->instrument(), obs->id())) {
+            ids.push_back(i+1);
+            names.push_back(models[i]->name());
+        }
+    }
+
+    // Set Monte Carlo identifiers
+    if (ids.size() > 0) {
+
+        // Set Monte Carlo identifiers for the (empty) event list
+        events->set_mc_id_names(ids, names);
+
+        // Log Monte Carlo identifiers into log file
+        if (logNormal()) {
+            for (int k = 0; k < ids.size(); ++k) {
+                *wrklog << gammalib::parformat("MC identifier " +
+                                               gammalib::str(ids[k]));
+                *wrklog << names[k] << std::endl;
+            }
+        }
+
+    } // endif: there were Monte Carlo identifiers
+
+    // Write observation without events into FITS object
+    GFits fits;
+    obs->write(fits);
+
+    // Save FITS object into output file. This is the same critical zone
+    // that is used for saving all other output files.
+    #if defined(G_STREAM_EVENTS)
+    #pragma omp critical(ctobssim_run)
+    {
+        fits.saveto(outfile, clobber());
+    }
+
+    // Open the events table of the output file
+    int       status = 0;
+    fitsfile* fptr   = NULL;
+    fits_open_file(&fptr, outfile.c_str(), READWRITE, &status);
+    fits_movnam_hdu(fptr, BINARY_TBL,
+                    const_cast<char*>(gammalib::extname_cta_events.c_str()),
+                    0, &status);
+    if (status != 0 && fptr != NULL) {
+        int dummy = 0;
+        fits_close_file(fptr, &dummy);
+        fptr = NULL;
+    }
+
+    // Allocate output file with its own lock
+    if (status == 0) {
+        ctobssim_stream* file = new ctobssim_stream;
+        file->fptr = fptr;
+        #ifdef _OPENMP
+        omp_init_lock(&(file->lock));
+        #endif
+        stream = file;
+    }
+
+    // Throw an exception if the output file could not be opened
+    if (status != 0) {
+        std::string msg = "Unable to open events table of file \""+outfile+
+                          "\" for event streaming (cfitsio status "+
+                          gammalib::str(status)+").";
+        throw GException::invalid_value(G_OPEN_STREAM, msg);
+    }
+    #else
+    std::string msg = "Event streaming requires the cfitsio library. Please "
+                      "set the \"chunksize\" parameter to 0.";
+    throw GException::invalid_value(G_OPEN_STREAM, msg);
+    #endif
+
+    // Return output file pointer
+    return stream;
+}
+
+
+/***********************************************************************//**
+ * @brief Stream events into FITS file
+ *
+ * @param[in,out] events Pointer on CTA event list.
+ * @param[in,out] stream Pointer to output file for event streaming.
+ *
+ * Appends all events of the event list as rows to the events table of the
+ * @p stream output file and removes the events from the event list, hence
+ * only the events of one chunk are held in memory.
+ ***************************************************************************/
+void ctobssim::stream_events(GCTAEventList* events, void* stream)
+{
+    // Continue only if there are events
+    if (events->size() > 0) {
+
+        // Write events into FITS object
+        GFits chunk;
+        events->write(chunk);
+
+        // Append rows to events table of FITS file
+        stream_rows(stream, *(chunk.table(gammalib::extname_cta_events)));
+
+        // Remove events from event list
+        events->remove(0, events->size());
+
+    } // endif: there were events
+
+    // Return
+    return;
+}
+
+
+/***********************************************************************//**
+ * @brief Stream source events into output file if chunk size is reached
+ *
+ * @param[in,out] events Pointer on CTA event list.
+ * @param[in,out] stream Pointer to output file for event streaming.
+ *
+ * If the number of events in the event list reaches the chunk size, event
+ * identifiers are set for all events of the event list and the events are
+ * streamed into the @p stream output file. The method is used for source
+ * events, which are streamed before their event identifiers are set.
+ ***************************************************************************/
+void ctobssim::stream_chunk(GCTAEventList* events, void* stream)
+{
+    // Stream events if the chunk size is reached
+    if (events->size() >= m_chunk_size) {
+        set_event_ids(events, 0);
+        stream_events(events, stream);
+    }
+
+    // Return
+    return;
+}
+
+
+/***********************************************************************//**
+ * @brief Append rows of a FITS table to the events table of a FITS file
+ *
+ * @param[in,out] stream Pointer to output file for event streaming.
+ * @param[in] chunk FITS table with rows to append.
+ *
+ * @exception GException::invalid_value
+ *            Column type is not supported or rows could not be written.
+ *
+ * Writes all rows of @p chunk after the last row of the events table of
+ * the @p stream output file. Only columns that exist in both tables are
+ * filled. The rows are written directly into the FITS file, hence the
+ * events table of the FITS file is never held in memory. The access to
+ * the FITS file is serialised by the lock of the output file.
+ ***************************************************************************/
+void ctobssim::stream_rows(void* stream, const GFitsTable& chunk)
+{
+    #if defined(G_STREAM_EVENTS)
+    // Get output file, FITS file pointer and number of rows to append
+    ctobssim_stream* file  = static_cast<ctobssim_stream*>(stream);
+    fitsfile*        fptr  = file->fptr;
+    int              nrows = chunk.nrows();
+
+    // Initialise cfitsio status and name of unsupported column
+    int         status = 0;
+    std::string unsupported;
+
+    // Lock output file
+    #ifdef _OPENMP
+    omp_set_lock(&(file->lock));
+    #endif
+
+    // Write rows
+    {
+        // Get row offset
+        long offset = 0;
+        fits_get_num_rows(fptr, &offset, &status);
+
+        // Loop over all columns of the chunk
+        for (int icol = 0; icol < chunk.ncols() && status == 0; ++icol) {
+
+            // Get source column and skip it if it does not exist in the
+            // events table of the FITS file
+            const GFitsTableCol* src    = chunk[icol];
+            int                  colnum = 0;
+            fits_get_colnum(fptr, CASEINSEN,
+                            const_cast<char*>(src->name().c_str()),
+                            &colnum, &status);
+            if (status == COL_NOT_FOUND) {
+                status = 0;
+                continue;
+            }
+
+            // Get number of elements to write
+            int  number    = src->number();
+            long nelements = long(nrows) * long(number);
+
+            // Write column according to column type
+            if (dynamic_cast<const GFitsTableDoubleCol*>(src) != NULL) {
+                const GFitsTableDoubleCol* s =
+                      static_cast<const GFitsTableDoubleCol*>(src);
+                std::vector<double> data(nelements);
+                for (int row = 0, i = 0; row < nrows; ++row) {
+                    for (int inx = 0; inx < number; ++inx, ++i) {
+                        data[i] = (*s)(row, inx);
+                    }
+                }
+                fits_write_col(fptr, TDOUBLE, colnum, offset+1, 1, nelements,
+                               &(data[0]), &status);
+            }
+            else if (dynamic_cast<const GFitsTableFloatCol*>(src) != NULL) {
+                const GFitsTableFloatCol* s =
+                      static_cast<const GFitsTableFloatCol*>(src);
+                std::vector<float> data(nelements);
+                for (int row = 0, i = 0; row < nrows; ++row) {
+                    for (int inx = 0; inx < number; ++inx, ++i) {
+                        data[i] = (*s)(row, inx);
+                    }
+                }
+                fits_write_col(fptr, TFLOAT, colnum, offset+1, 1, nelements,
+                               &(data[0]), &status);
+            }
+            else if (dynamic_cast<const GFitsTableULongCol*>(src) != NULL) {
+                const GFitsTableULongCol* s =
+                      static_cast<const GFitsTableULongCol*>(src);
+                std::vector<unsigned long> data(nelements);
+                for (int row = 0, i = 0; row < nrows; ++row) {
+                    for (int inx = 0; inx < number; ++inx, ++i) {
+                        data[i] = (*s)(row, inx);
+                    }
+                }
+                fits_write_col(fptr, TULONG, colnum, offset+1, 1, nelements,
+                               &(data[0]), &status);
+            }
+            else if (dynamic_cast<const GFitsTableLongCol*>(src) != NULL) {
+                const GFitsTableLongCol* s =
+                      static_cast<const GFitsTableLongCol*>(src);
+                std::vector<long> data(nelements);
+                for (int row = 0, i = 0; row < nrows; ++row) {
+                    for (int inx = 0; inx < number; ++inx, ++i) {
+                        data[i] = (*s)(row, inx);
+                    }
+                }
+                fits_write_col(fptr, TLONG, colnum, offset+1, 1, nelements,
+                               &(data[0]), &status);
+            }
+            else if (dynamic_cast<const GFitsTableShortCol*>(src) != NULL) {
+                const GFitsTableShortCol* s =
+                      static_cast<const GFitsTableShortCol*>(src);
+                std::vector<short> data(nelements);
+                for (int row = 0, i = 0; row < nrows; ++row) {
+                    for (int inx = 0; inx < number; ++inx, ++i) {
+                        data[i] = (*s)(row, inx);
+                    }
+                }
+                fits_write_col(fptr, TSHORT, colnum, offset+1, 1, nelements,
+                               &(data[0]), &status);
+            }
+            else {
+                unsupported = src->name();
+                break;
+            }
+
+        } // endfor: looped over columns
+
+    }
+
+    // Unlock output file
+    #ifdef _OPENMP
+    omp_unset_lock(&(file->lock));
+    #endif
+
+    // Throw an exception if a column type is not supported
+    if (!unsupported.empty()) {
+        std::string msg = "Column \""+unsupported+"\" has an unsupported "
+                          "type for event streaming. Please set the "
+                          "\"chunksize\" parameter to 0.";
+        throw GException::invalid_value(G_STREAM_ROWS, msg);
+    }
+
+    // Throw an exception if the rows could not be written
+    if (status != 0) {
+        std::string msg = "Unable to append "+gammalib::str(nrows)+" events "
+                          "to events table (cfitsio status "+
+                          gammalib::str(status)+").";
+        throw GException::invalid_value(G_STREAM_ROWS, msg);
+    }
+    #endif
+
+    // Return
+    return;
+}
+
+
+/***********************************************************************//**
+ * @brief Close output file for event streaming
+ *
+ * @param[in,out] stream Pointer to output file for event streaming.
+ * @param[out] nrows Number of events in the events table.
+ *
+ * @exception GException::invalid_value
+ *            Unable to close FITS file.
+ *
+ * Closes the FITS file and deallocates the output file.
+ ***************************************************************************/
+void ctobssim::close_stream(void* stream, int& nrows)
+{
+    // Initialise number of events
+    nrows = 0;
+
+    #if defined(G_STREAM_EVENTS)
+    // Get output file
+    ctobssim_stream* file = static_cast<ctobssim_stream*>(stream);
+
+    // Get number of rows and close FITS file
+    int  status = 0;
+    long rows   = 0;
+    #ifdef _OPENMP
+    omp_set_lock(&(file->lock));
+    #endif
+    fits_get_num_rows(file->fptr, &rows, &status);
+    fits_close_file(file->fptr, &status);
+    nrows = int(rows);
+    #ifdef _OPENMP
+    omp_unset_lock(&(file->lock));
+    omp_destroy_lock(&(file->lock));
+    #endif
+
+    // Deallocate output file
+    delete file;
+
+    // Throw an exception if the FITS file could not be closed
+    if (status != 0) {
+        std::string msg = "Unable to close FITS file after event streaming "
+                          "(cfitsio status "+gammalib::str(status)+").";
+        throw GException::invalid_value(G_CLOSE_STREAM, msg);
+    }
+    #endif
+
+    // Return
+    return;
+}
+
+
 /***********************************************************************//**
  * @brief Save event list in FITS format.
  *
@@ -46,6 +46,13 @@
  * multiple CTA observations in one shot. If multiple CTA observations are
  * processed and the save method is called, events FITS files will be written
  * for each observation.
+ *
+ * For binned observations, the counts cube is simulated directly by drawing
+ * Poisson random numbers from the predicted number of counts in each bin.
+ *
+ * By default the observations are distributed over the threads. If the
+ * splitobs parameter is true, the time and energy intervals of each
+ * observation are instead distributed over the threads.
  ***************************************************************************/
 class ctobssim : public ctobservation {
 
@@ -68,6 +75,12 @@ public:
     const double& max_rate(void) const;
     void          max_rate(const double& max_rate);
 
+#ifndef SWIG
+protected:
+#endif
+    // Event merging
+    void merge_events(GObservations& obs, const GObservations& merge);
+
 protected:
     // Protected methods
     void        init_members(void);
@@ -77,25 +90,24 @@ protected:
     void        simulate_source(GCTAObservation* obs,
                                 const GModels&   models,
                                 GRan&            ran,
-                                GLog*            wrklog = NULL);
+                                GLog*            wrklog = NULL,
+                                void*            stream = NULL);
     void        simulate_interval(GCTAObservation*       obs,
                                   const GCTAResponseIrf* rsp,
                                   GCTAEventList*         events,
                                   const GModels&         models,
                                   const GTime&           tmin,
                                   const GTime&           tmax,
-                                  const GEnergy&         etrue_min,
-                                  const GEnergy&         etrue_max,
-                                  const GEnergy&         ereco_min,
-                                  const GEnergy&         ereco_max,
+                                  const GEbounds&        ebounds,
+                                  const int&             ie,
                                   const GSkyDir&         dir,
                                   const double&          rad,
-                                  const double&          area,
                                   GRan&                  ran,
                                   GLog*                  wrklog,
                                   int&                   indent,
                                   std::vector<int>&      nphotons,
-                                  std::vector<int>&      nevents);
+                                  std::vector<int>&      nevents,
+                                  void*                  stream = NULL);
     void        simulate_time_slice(GCTAObservation*       obs,
                                     const GCTAResponseIrf* rsp,
                                     GCTAEventList*         events,
@@ -114,7 +126,8 @@ protected:
                                     GLog*                  wrklog,
                                     int&                   indent,
                                     int&                   nphotons,
-                                    int&                   nevents);
+                                    int&                   nevents,
+                                    void*                  stream = NULL);
     GEbounds    get_ebounds(const GEbounds& ebounds) const;
     double      get_area(GCTAObservation* obs,
                          const GEnergy&   emin,
@@ -129,10 +142,25 @@ protected:
     void        simulate_background(GCTAObservation* obs,
                                     const GModels&   models,
                                     GRan&            ran,
-                                    GLog*            wrklog = NULL);
+                                    GLog*            wrklog = NULL,
+                                    void*            stream = NULL);
+    void        simulate_cube(GCTAObservation* obs,
+                              const GModels&   models,
+                              GRan&            ran,
+                              GLog*            wrklog = NULL);
     void        set_mc_id_names(GCTAObservation* obs,
                                 const GModels&   models,
                                 GLog*            wrklog = NULL);
+    void        set_event_ids(GCTAEventList* events, const int& first);
+    int         number_of_threads(void) const;
+    void*       open_stream(GCTAObservation*   obs,
+                            const GModels&     models,
+                            const std::string& outfile,
+                            GLog*              wrklog);
+    void        stream_events(GCTAEventList* events, void* stream);
+    void        stream_chunk(GCTAEventList* events, void* stream);
+    void        stream_rows(void* stream, const GFitsTable& chunk);
+    void        close_stream(void* stream, int& nrows);
     void        save_fits(void);
     void        save_xml(void);
     std::string outfile(const int& index);
@@ -144,6 +172,9 @@ protected:
     int         m_seed;        //!< Random number generator seed
     int         m_eslices;     //!< Number of energy slices
     bool        m_apply_edisp; //!< Apply energy dispersion?
+    int         m_nthreads;    //!< Number of threads
+    bool        m_split_obs;   //!< Parallelise within observations?
+    int         m_chunk_size;  //!< Number of events per streamed chunk
 
     // Protected members
     mutable bool          m_save_and_dispose; //!< Save and dispose immediately
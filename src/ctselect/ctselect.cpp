@@ -29,6 +29,9 @@
 #include <config.h>
 #endif
 #include <cstdlib>
+#include <cmath>
+#include <algorithm>
+#include <utility>
 #include "ctselect.hpp"
 #include "GTools.hpp"
 
@@ -38,6 +41,9 @@
 #define G_SELECT_EVENTS          "ctselect::select_events(GCTAObservation*, "\
                                   "std::string&, std::string&, std::string&)"
 #define G_SET_EBOUNDS    "ctselect::set_ebounds(GCTAObservation*, GEbounds&)"
+#define G_TIME_BINS                          "ctselect::time_bins(GGti&)"
+#define G_ENERGY_BINS                    "ctselect::energy_bins(GEbounds&)"
+#define G_BIN_OBS                                "ctselect::bin_obs(int&)"
 
 /* __ Debug definitions __________________________________________________ */
 
@@ -207,11 +213,12 @@ void ctselect::clear(void)
  * @brief Select event data
  *
  * This method reads in the application parameters and loops over all
- * observations that were found to perform an event selection. Event
- * selection is done by writing each observation to a temporary file and
- * re-opening the temporary file using the cfitsio event filter syntax.
- * The temporary file is deleted after this action so that no disk overflow
- * will occur.
+ * observations that were found to perform an event selection. If no
+ * selection expression is given, the events are selected in memory.
+ * Otherwise, event selection is done by writing each observation to a
+ * temporary file and re-opening the temporary file using the cfitsio event
+ * filter syntax. The temporary file is deleted after this action so that no
+ * disk overflow will occur.
  ***************************************************************************/
 void ctselect::run(void)
 {
@@ -232,6 +239,14 @@ void ctselect::run(void)
     // Initialise counters
     int n_observations = 0;
 
+    // Initialise observation containers for selection bins
+    int nbins = (!m_time_bins.is_empty()) ? m_time_bins.size()
+                                          : m_energy_bins.size();
+    m_bin_obs.assign(nbins, GObservations());
+    for (int k = 0; k < nbins; ++k) {
+        m_bin_obs[k].models(m_obs.models());
+    }
+
     // Loop over all observation in the container
     for (int i = 0; i < m_obs.size(); ++i) {
 
@@ -296,47 +311,71 @@ void ctselect::run(void)
             }
         }
 
-        // Get temporary file name
-        #if G_USE_MKSTEMP
-        char tpl[]  = "ctselectXXXXXX";
-        int  fileid = mkstemp(tpl);
-        std::string filename(tpl);
-        #else
-        std::string filename = std::tmpnam(NULL);
-        #endif
-
-        // Save observation in temporary file. We add here the events and
-        // GTI extension name so that the GCTAObservation::save method can
-        // use this information for writing the proper extension names into
-        // the temporary file
-        obs->save(filename+"["+m_evtname[i]+";"+ m_gtiname[i]+"]", true);
-
-        // Log saved FITS file.
-        if (logExplicit()) {
-            GFits tmpfile(filename);
-            log.header3("FITS file content of temporary file");
-            log << tmpfile << std::endl;
-            tmpfile.close();
+        // If a time selection was requested then make sure that the events
+        // are sorted in time and extract the events within the time interval
+        // so that the remaining selection only handles these events
+        if (!m_gti.is_empty()) {
+            sort_events(obs, m_infiles[i]);
+            slice_events(obs);
         }
 
-        // If we have a temporary file then check it
-        if (!filename.empty()) {
-            std::string message = check_infile(filename, m_evtname[i]);
-            if (!message.empty()) {
-                throw GException::invalid_value(G_RUN, message);
-            }
+        // If no selection expression is given then select the events in
+        // memory
+        if (gammalib::strip_whitespace(m_expr).length() == 0) {
+            select_events(obs, "", m_evtname[i], m_gtiname[i]);
         }
 
-        // Load observation from temporary file, including event selection
-        select_events(obs, filename, m_evtname[i], m_gtiname[i]);
+        // ... otherwise select the events using cfitsio
+        else {
+
+            // Get temporary file name
+            #if G_USE_MKSTEMP
+            char tpl[]  = "ctselectXXXXXX";
+            int  fileid = mkstemp(tpl);
+            std::string filename(tpl);
+            #else
+            std::string filename = std::tmpnam(NULL);
+            #endif
+
+            // Save observation in temporary file. We add here the events and
+            // GTI extension name so that the GCTAObservation::save method can
+            // use this information for writing the proper extension names into
+            // the temporary file
+            obs->save(filename+"["+m_evtname[i]+";"+ m_gtiname[i]+"]", true);
+
+            // Log saved FITS file.
+            if (logExplicit()) {
+                GFits tmpfile(filename);
+                log.header3("FITS file content of temporary file");
+                log << tmpfile << std::endl;
+                tmpfile.close();
+            }
 
-        // Close temporary file
-        #if G_USE_MKSTEMP
-        close(fileid);
-        #endif
+            // If we have a temporary file then check it
+            if (!filename.empty()) {
+                std::string message = check_infile(filename, m_evtname[i]);
+                if (!message.empty()) {
+                    throw GException::invalid_value(G_RUN, message);
+                }
+            }
 
-        // Remove temporary file
-        std::remove(filename.c_str());
+            // Load observation from temporary file, including event selection
+            select_events(obs, filename, m_evtname[i], m_gtiname[i]);
+
+            // Close temporary file
+            #if G_USE_MKSTEMP
+            close(fileid);
+            #endif
+
+            // Remove temporary file
+            std::remove(filename.c_str());
+
+        } // endelse: selected events using cfitsio
+
+        // Distribute selected events into selection bins
+        if (nbins > 0) {
+            bin_events(obs);
+        }
 
     } // endfor: looped over all observations
 
@@ -452,6 +491,100 @@ void ctselect::publish(const std::string& name)
 }
 
 
+/***********************************************************************//**
+ * @brief Set time bins for binned selection
+ *
+ * @param[in] bins Time bins.
+ *
+ * @exception GException::invalid_value
+ *            Time bins are not ordered or overlapping.
+ *
+ * Sets time bins into which the selected events are distributed by the
+ * run() method. The time bins need to be ordered and non-overlapping.
+ * Setting time bins removes any energy bins.
+ ***************************************************************************/
+void ctselect::time_bins(const GGti& bins)
+{
+    // Check that time bins are ordered and non-overlapping
+    for (int i = 1; i < bins.size(); ++i) {
+        if (bins.tstart(i) < bins.tstop(i-1)) {
+            std::string msg = "Time bin "+gammalib::str(i)+" starts before "
+                              "the end of the preceding time bin. Please "
+                              "specify ordered and non-overlapping time "
+                              "bins.";
+            throw GException::invalid_value(G_TIME_BINS, msg);
+        }
+    }
+
+    // Set time bins and clear energy bins
+    m_time_bins = bins;
+    m_energy_bins.clear();
+    m_bin_obs.clear();
+
+    // Return
+    return;
+}
+
+
+/***********************************************************************//**
+ * @brief Set energy bins for binned selection
+ *
+ * @param[in] bins Energy bins.
+ *
+ * @exception GException::invalid_value
+ *            Energy bins are not ordered or overlapping.
+ *
+ * Sets energy bins into which the selected events are distributed by the
+ * run() method. The energy bins need to be ordered and non-overlapping.
+ * Setting energy bins removes any time bins.
+ ***************************************************************************/
+void ctselect::energy_bins(const GEbounds& bins)
+{
+    // Check that energy bins are ordered and non-overlapping
+    for (int i = 1; i < bins.size(); ++i) {
+        if (bins.emin(i) < bins.emax(i-1)) {
+            std::string msg = "Energy bin "+gammalib::str(i)+" starts below "
+                              "the end of the preceding energy bin. Please "
+                              "specify ordered and non-overlapping energy "
+                              "bins.";
+            throw GException::invalid_value(G_ENERGY_BINS, msg);
+        }
+    }
+
+    // Set energy bins and clear time bins
+    m_energy_bins = bins;
+    m_time_bins.clear();
+    m_bin_obs.clear();
+
+    // Return
+    return;
+}
+
+
+/***********************************************************************//**
+ * @brief Return observation container for selection bin
+ *
+ * @param[in] index Bin index [0,...,nbins()-1].
+ * @return Observation container for selection bin.
+ *
+ * @exception GException::out_of_range
+ *            Bin index is out of range.
+ *
+ * Returns the observation container holding the events that were selected
+ * for a given time or energy bin by the run() method.
+ ***************************************************************************/
+const GObservations& ctselect::bin_obs(const int& index) const
+{
+    // Throw an exception if index is out of range
+    if (index < 0 || index >= nbins()) {
+        throw GException::out_of_range(G_BIN_OBS, "Bin index", index, nbins());
+    }
+
+    // Return observation container
+    return (m_bin_obs[index]);
+}
+
+
 /*==========================================================================
  =                                                                         =
  =                             Private methods                             =
@@ -471,7 +604,8 @@ void ctselect::init_members(void)
     m_emax   = 0.0;
     m_expr.clear();
     m_usethres.clear();
-    m_chatter = static_cast<GChatter>(2);
+    m_use_tindex = false;
+    m_chatter    = static_cast<GChatter>(2);
 
     // Initialise protected members
     m_infiles.clear();
@@ -482,6 +616,9 @@ void ctselect::init_members(void)
     m_phases.clear();
     m_select_energy = false;
     m_select_phase  = false;
+    m_time_bins.clear();
+    m_energy_bins.clear();
+    m_bin_obs.clear();
 
     // Return
     return;
@@ -502,8 +639,9 @@ void ctselect::copy_members(const ctselect& app)
     m_emin     = app.m_emin;
     m_emax     = app.m_emax;
     m_expr     = app.m_expr;
-    m_usethres = app.m_usethres;
-    m_chatter  = app.m_chatter;
+    m_usethres   = app.m_usethres;
+    m_use_tindex = app.m_use_tindex;
+    m_chatter    = app.m_chatter;
 
     // Copy protected members
     m_infiles       = app.m_infiles;
@@ -514,6 +652,9 @@ void ctselect::copy_members(const ctselect& app)
     m_phases        = app.m_phases;
     m_select_energy = app.m_select_energy;
     m_select_phase  = app.m_select_phase;
+    m_time_bins     = app.m_time_bins;
+    m_energy_bins   = app.m_energy_bins;
+    m_bin_obs       = app.m_bin_obs;
 
     // Return
     return;
@@ -645,9 +786,10 @@ void ctselect::get_parameters(void)
     } // endif: phase selection parameters were valid
 
     // Get other User parameters
-    m_expr     = (*this)["expr"].string();
-    m_usethres = (*this)["usethres"].string();
-    m_chatter  = static_cast<GChatter>((*this)["chatter"].integer());
+    m_expr       = (*this)["expr"].string();
+    m_usethres   = (*this)["usethres"].string();
+    m_use_tindex = (*this)["tindex"].boolean();
+    m_chatter    = static_cast<GChatter>((*this)["chatter"].integer());
 
     // Optionally read ahead parameters so that they get correctly
     // dumped into the log file
@@ -687,6 +829,10 @@ void ctselect::get_parameters(void)
  * is then applied when opening the FITS file. The event list in the current
  * observation is replaced by selected event list read from the FITS file.
  *
+ * If the file name is empty, the time, phase, energy and RoI selections are
+ * instead applied in a single pass over the events of the observation (see
+ * select_events_in_memory()).
+ *
  * Good Time Intervals of the observation will be limited to the time
  * interval [m_timemin, m_timemax].
  ***************************************************************************/
@@ -950,60 +1096,78 @@ void ctselect::select_events(GCTAObservation*   obs,
 
     } // endif: made expression selection
 
-    // Dump cfitsio selection string
-    log_value(NORMAL, "cfitsio selection", selection);
+    // If no file name is given then select the events in memory
+    if (filename.empty()) {
 
-    // Build input filename including selection expression
-    std::string expression = filename + "[" + evtname + "]";
-    if (selection.length() > 0) {
-        expression += "["+selection+"]";
-    }
+        // Set RoI centre
+        GSkyDir centre;
+        centre.radec_deg(ra, dec);
 
-    // Dump FITS filename including selection expression
-    log_value(NORMAL, "FITS filename", expression);
+        // Select events
+        select_events_in_memory(list, gti, emin, emax, centre, rad,
+                                select_roi, remove_all);
 
-    // Open FITS file
-    GFits file(expression);
-
-    // Log selected FITS file
-    log_header3(EXPLICIT, "FITS file content after selection");
-    log_string(EXPLICIT, file.print(m_chatter));
-
-    // Check if we have an events HDU
-    if (!file.contains(evtname)) {
-        std::string msg = "No events extension \""+evtname+"\" found in "
-                          "FITS file. The expression \""+expression+"\" "
-                          "was used to open the FITS file.";
-        throw GException::invalid_value(G_SELECT_EVENTS, msg);
-    }
+    } // endif: selected events in memory
 
-    // Determine number of events in the events HDU. If removal of all events
-    // has been requested then set the number of events to zero.
-    int nevents = (remove_all) ? 0 : file.table(evtname)->nrows();
+    // ... otherwise select the events using cfitsio
+    else {
 
-    // If the selected event list is empty then append an empty event list
-    // to the observation
-    if (nevents < 1) {
+        // Dump cfitsio selection string
+        log_value(NORMAL, "cfitsio selection", selection);
 
-        // Create empty event list
-        GCTAEventList eventlist;
+        // Build input filename including selection expression
+        std::string expression = filename + "[" + evtname + "]";
+        if (selection.length() > 0) {
+            expression += "["+selection+"]";
+        }
 
-        // Append list to observation
-        obs->events(eventlist);
+        // Dump FITS filename including selection expression
+        log_value(NORMAL, "FITS filename", expression);
 
-    }
+        // Open FITS file
+        GFits file(expression);
 
-    // ... otherwise load the data from the temporary file
-    else {
-        obs->read(file);
-    }
+        // Log selected FITS file
+        log_header3(EXPLICIT, "FITS file content after selection");
+        log_string(EXPLICIT, file.print(m_chatter));
 
-    // Get CTA event list pointer
-    list = static_cast<GCTAEventList*>(const_cast<GEvents*>(obs->events()));
+        // Check if we have an events HDU
+        if (!file.contains(evtname)) {
+            std::string msg = "No events extension \""+evtname+"\" found in "
+                              "FITS file. The expression \""+expression+"\" "
+                              "was used to open the FITS file.";
+            throw GException::invalid_value(G_SELECT_EVENTS, msg);
+        }
+
+        // Determine number of events in the events HDU. If removal of all
+        // events has been requested then set the number of events to zero.
+        int nevents = (remove_all) ? 0 : file.table(evtname)->nrows();
 
-    // Make sure that events are fetched since the temporary file will be
-    // closed later
-    list->fetch();
+        // If the selected event list is empty then append an empty event
+        // list to the observation
+        if (nevents < 1) {
+
+            // Create empty event list
+            GCTAEventList eventlist;
+
+            // Append list to observation
+            obs->events(eventlist);
+
+        }
+
+        // ... otherwise load the data from the temporary file
+        else {
+            obs->read(file);
+        }
+
+        // Get CTA event list pointer
+        list = static_cast<GCTAEventList*>(const_cast<GEvents*>(obs->events()));
+
+        // Make sure that events are fetched since the temporary file will be
+        // closed later
+        list->fetch();
+
+    } // endelse: selected events using cfitsio
 
     // If RoI selection has been applied then set the event list RoI
     if (select_roi) {
@@ -1046,6 +1210,618 @@ void ctselect::select_events(GCTAObservation*   obs,
 }
 
 
+/***********************************************************************//**
+ * @brief Distribute selected events into selection bins
+ *
+ * @param[in,out] obs CTA observation.
+ *
+ * Distributes the selected events of an observation in a single pass into
+ * the time or energy bins, where the bin of each event is determined using
+ * a binary search. For each bin, a copy of the observation is appended to
+ * the observation container of the bin. The Good Time Intervals of the copy
+ * are reduced to the time bin, or the energy boundaries of the copy are
+ * restricted to the energy bin. Since all bin boundaries are inclusive, an
+ * event that falls on the boundary of two adjacent bins is assigned to the
+ * later bin. Events outside all bins are dropped.
+ ***************************************************************************/
+void ctselect::bin_events(GCTAObservation* obs)
+{
+    // Get CTA event list pointer
+    GCTAEventList* list =
+        static_cast<GCTAEventList*>(const_cast<GEvents*>(obs->events()));
+
+    // Get number of events and bins
+    int  nevents    = list->size();
+    int  nbins      = m_bin_obs.size();
+    bool time_bins  = !m_time_bins.is_empty();
+
+    // Keep a copy of the events and remove the events from the observation
+    // so that the observation can be copied without the events
+    GCTAEventList events(*list);
+    list->remove(0, nevents);
+
+    // Set up one empty observation per bin
+    std::vector<GCTAEventList*> lists(nbins, (GCTAEventList*)NULL);
+    for (int k = 0; k < nbins; ++k) {
+
+        // Append copy of observation without events to bin container
+        m_bin_obs[k].append(*obs);
+
+        // Get pointer to observation in bin container and its event list
+        GCTAObservation* binobs =
+            static_cast<GCTAObservation*>(m_bin_obs[k][m_bin_obs[k].size()-1]);
+        lists[k] = static_cast<GCTAEventList*>
+                   (const_cast<GEvents*>(binobs->events()));
+
+        // Restrict observation to time bin
+        if (time_bins) {
+            GGti gti = lists[k]->gti();
+            gti.reduce(m_time_bins.tstart(k), m_time_bins.tstop(k));
+            lists[k]->gti(gti);
+            binobs->ontime(gti.ontime());
+            binobs->livetime(gti.ontime() * binobs->deadc());
+        }
+
+        // ... or restrict observation to energy bin
+        else {
+            GEnergy emin = m_energy_bins.emin(k);
+            GEnergy emax = m_energy_bins.emax(k);
+            if (lists[k]->ebounds().size() > 0) {
+                if (lists[k]->ebounds().emin() > emin) {
+                    emin = lists[k]->ebounds().emin();
+                }
+                if (lists[k]->ebounds().emax() < emax) {
+                    emax = lists[k]->ebounds().emax();
+                }
+            }
+            GEbounds ebounds;
+            if (emax > emin) {
+                ebounds.append(emin, emax);
+            }
+            lists[k]->ebounds(ebounds);
+        }
+
+    } // endfor: looped over bins
+
+    // Loop over events
+    for (int i = 0; i < nevents; ++i) {
+
+        // Get pointer to event
+        const GCTAEventAtom* atom = events[i];
+
+        // Search last bin that starts at or before the event
+        int low  = 0;
+        int high = nbins;
+        if (time_bins) {
+            const GTime& time = atom->time();
+            while (low < high) {
+                int mid = (low + high) / 2;
+                if (m_time_bins.tstart(mid) <= time) {
+                    low = mid + 1;
+                }
+                else {
+                    high = mid;
+                }
+            }
+            int k = low - 1;
+            if (k >= 0 && time <= m_time_bins.tstop(k)) {
+                lists[k]->append(*atom);
+            }
+        }
+        else {
+            const GEnergy& energy = atom->energy();
+            while (low < high) {
+                int mid = (low + high) / 2;
+                if (m_energy_bins.emin(mid) <= energy) {
+                    low = mid + 1;
+                }
+                else {
+                    high = mid;
+                }
+            }
+            int k = low - 1;
+            if (k >= 0 && energy <= m_energy_bins.emax(k)) {
+                lists[k]->append(*atom);
+            }
+        }
+
+    } // endfor: looped over events
+
+    // Restore events of observation
+    *list = events;
+
+    // Log number of events per bin
+    for (int k = 0; k < nbins; ++k) {
+        log_value(EXPLICIT, "Events in bin "+gammalib::str(k),
+                  lists[k]->size());
+    }
+
+    // Return
+    return;
+}
+
+
+/***********************************************************************//**
+ * @brief Select events in memory
+ *
+ * @param[in,out] list CTA event list.
+ * @param[in] gti Good Time Intervals of selection.
+ * @param[in] emin Minimum energy (TeV).
+ * @param[in] emax Maximum energy (TeV).
+ * @param[in] centre RoI centre.
+ * @param[in] rad RoI radius (degrees).
+ * @param[in] select_roi Perform RoI selection?
+ * @param[in] remove_all Remove all events?
+ *
+ * Applies the time, phase, energy and RoI selections in a single pass over
+ * the events of the event list. Selected events are moved to the front of
+ * the event list and all remaining events are removed at the end, hence the
+ * event list is compacted in place without building any selection
+ * expression or copying the event list.
+ *
+ * The selection criteria are identical to those that are used for cfitsio
+ * filtering, i.e. all interval boundaries are inclusive and an energy
+ * boundary of zero means that no selection is applied on this boundary.
+ ***************************************************************************/
+void ctselect::select_events_in_memory(GCTAEventList*  list,
+                                       const GGti&     gti,
+                                       const double&   emin,
+                                       const double&   emax,
+                                       const GSkyDir&  centre,
+                                       const double&   rad,
+                                       const bool&     select_roi,
+                                       const bool&     remove_all)
+{
+    // Get number of events
+    int nevents = list->size();
+
+    // Set selection flags
+    bool select_time  = !m_gti.is_empty();
+    bool select_phase = m_select_phase && list->has_phase();
+    bool select_emin  = m_select_energy && (emin > 0.0);
+    bool select_emax  = m_select_energy && (emax > 0.0);
+
+    // Set selection boundaries
+    GTime  tmin     = gti.tstart();
+    GTime  tmax     = gti.tstop();
+    double emin_mev = emin * 1.0e6;
+    double emax_mev = emax * 1.0e6;
+    double cosrad   = std::cos(rad * gammalib::deg2rad);
+    int    nphases  = m_phases.size();
+
+    // Initialise number of selected events
+    int nselected = 0;
+
+    // Loop over all events if not all events should be removed
+    for (int i = 0; (i < nevents) && !remove_all; ++i) {
+
+        // Get pointer to event
+        const GCTAEventAtom* atom = (*list)[i];
+
+        // Apply time selection
+        if (select_time && (atom->time() < tmin || atom->time() > tmax)) {
+            continue;
+        }
+
+        // Apply phase selection
+        if (select_phase) {
+            double phase = atom->phase();
+            bool   found = false;
+            for (int k = 0; k < nphases; ++k) {
+                if (phase >= m_phases.pmin(k) && phase <= m_phases.pmax(k)) {
+                    found = true;
+                    break;
+                }
+            }
+            if (!found) {
+                continue;
+            }
+        }
+
+        // Apply energy selection
+        double energy = atom->energy().MeV();
+        if ((select_emin && energy < emin_mev) ||
+            (select_emax && energy > emax_mev)) {
+            continue;
+        }
+
+        // Apply RoI selection
+        if (select_roi) {
+            const GCTAInstDir& instdir = atom->dir();
+            if (centre.cos_dist(instdir.dir()) < cosrad) {
+                continue;
+            }
+        }
+
+        // Move selected event to the front of the list
+        if (nselected != i) {
+            *((*list)[nselected]) = *atom;
+        }
+        nselected++;
+
+    } // endfor: looped over all events
+
+    // Remove all events that were not selected
+    if (nselected < nevents) {
+        list->remove(nselected, nevents - nselected);
+    }
+
+    // Log selection
+    log_value(NORMAL, "In-memory selection", gammalib::str(nselected)+
+              " of "+gammalib::str(nevents)+" events selected");
+
+    // Return
+    return;
+}
+
+
+/***********************************************************************//**
+ * @brief Sort events in time
+ *
+ * @param[in,out] obs CTA observation.
+ * @param[in] filename Event file name.
+ *
+ * Makes sure that the events of an observation are sorted in time. If the
+ * events are already sorted, which is checked in a single pass over the
+ * events, nothing is done. Otherwise the events are reordered in place
+ * following the permutation that sorts the events in time.
+ *
+ * If the tindex parameter is set and an event file name is available, the
+ * permutation is persisted in a sidecar file (see time_index_name()) and
+ * read back on subsequent calls, which avoids sorting the events again.
+ * A sidecar file is only used if it provides a valid permutation that
+ * sorts the events in time. A sidecar file is only written if the events
+ * in memory match the events in the event file (see events_match_file()),
+ * and a failure to write the sidecar file is logged as a warning.
+ ***************************************************************************/
+void ctselect::sort_events(GCTAObservation* obs, const std::string& filename)
+{
+    // Get CTA event list pointer
+    GCTAEventList* list =
+        static_cast<GCTAEventList*>(const_cast<GEvents*>(obs->events()));
+
+    // Get number of events
+    int nevents = list->size();
+
+    // Check whether the events are already sorted in time
+    bool sorted = true;
+    for (int i = 1; i < nevents; ++i) {
+        if ((*list)[i]->time() < (*list)[i-1]->time()) {
+            sorted = false;
+            break;
+        }
+    }
+
+    // If events are sorted then signal this and return
+    if (sorted) {
+        log_value(NORMAL, "Time ordering", "Events are sorted in time");
+        return;
+    }
+
+    // Set index file name if a persistent index is requested
+    std::string indexname = (m_use_tindex && !filename.empty())
+                            ? time_index_name(filename) : "";
+
+    // Read index from index file if it exists
+    std::vector<int> index;
+    if (!indexname.empty()) {
+        index = read_time_index(indexname, nevents);
+    }
+
+    // Check that index is a permutation that sorts the events in time.
+    // Otherwise discard the index.
+    if (index.size() == nevents) {
+        std::vector<bool> used(nevents, false);
+        for (int i = 0; i < nevents; ++i) {
+            int k = index[i];
+            if ((k < 0) || (k >= nevents) || used[k] ||
+                ((i > 0) && ((*list)[k]->time() < (*list)[index[i-1]]->time()))) {
+                index.clear();
+                break;
+            }
+            used[k] = true;
+        }
+    }
+
+    // If no valid index was read then compute the index by sorting the
+    // event times and optionally persist the index
+    bool from_file = (index.size() == nevents);
+    if (!from_file) {
+
+        // Sort event times together with event indices. Events with
+        // identical times keep their original order.
+        std::vector<std::pair<double,int> > keys;
+        keys.reserve(nevents);
+        for (int i = 0; i < nevents; ++i) {
+            keys.push_back(std::make_pair((*list)[i]->time().secs(), i));
+        }
+        std::sort(keys.begin(), keys.end());
+
+        // Set index
+        index.resize(nevents);
+        for (int i = 0; i < nevents; ++i) {
+            index[i] = keys[i].second;
+        }
+
+        // Optionally persist index if the events in memory match the
+        // events in the event file. A failure to write the index file does
+        // not prevent the event selection.
+        if (!indexname.empty()) {
+            if (!events_match_file(list, filename)) {
+                log_value(NORMAL, "Time index file", "Not written since "
+                          "events differ from event file");
+            }
+            else {
+                try {
+                    write_time_index(indexname, index);
+                    log_value(NORMAL, "Time index file", indexname);
+                }
+                catch (std::exception& e) {
+                    log_string(NORMAL, " Warning: Unable to write time "
+                               "index file \""+indexname+"\": "+e.what());
+                }
+            }
+        }
+
+    } // endif: computed index
+
+    // Reorder events in place by following the cycles of the permutation.
+    // After reordering, the event at position i is the event that was
+    // before at position index[i].
+    std::vector<bool> done(nevents, false);
+    for (int i = 0; i < nevents; ++i) {
+        if (done[i] || index[i] == i) {
+            done[i] = true;
+            continue;
+        }
+        GCTAEventAtom atom = *((*list)[i]);
+        int           j    = i;
+        while (index[j] != i) {
+            *((*list)[j]) = *((*list)[index[j]]);
+            done[j]       = true;
+            j             = index[j];
+        }
+        *((*list)[j]) = atom;
+        done[j]       = true;
+    }
+
+    // Log sorting
+    if (from_file) {
+        log_value(NORMAL, "Time ordering", "Events sorted using index file \""+
+                  indexname+"\"");
+    }
+    else {
+        log_value(NORMAL, "Time ordering", "Events sorted in time");
+    }
+
+    // Return
+    return;
+}
+
+
+/***********************************************************************//**
+ * @brief Extract events within the time selection interval
+ *
+ * @param[in,out] obs CTA observation.
+ *
+ * Extracts the events within the time interval [m_timemin, m_timemax] from
+ * an event list that is sorted in time. The first and last events of the
+ * interval are found by binary search and all events outside the interval
+ * are removed, leaving a contiguous slice of events.
+ ***************************************************************************/
+void ctselect::slice_events(GCTAObservation* obs)
+{
+    // Get CTA event list pointer
+    GCTAEventList* list =
+        static_cast<GCTAEventList*>(const_cast<GEvents*>(obs->events()));
+
+    // Get number of events
+    int nevents = list->size();
+
+    // Search first event with time >= m_timemin
+    int low  = 0;
+    int high = nevents;
+    while (low < high) {
+        int mid = (low + high) / 2;
+        if ((*list)[mid]->time() < m_timemin) {
+            low = mid + 1;
+        }
+        else {
+            high = mid;
+        }
+    }
+    int first = low;
+
+    // Search first event with time > m_timemax
+    high = nevents;
+    while (low < high) {
+        int mid = (low + high) / 2;
+        if ((*list)[mid]->time() > m_timemax) {
+            high = mid;
+        }
+        else {
+            low = mid + 1;
+        }
+    }
+    int last = low;
+
+    // Remove events after and before the time interval
+    if (last < nevents) {
+        list->remove(last, nevents - last);
+    }
+    if (first > 0) {
+        list->remove(0, first);
+    }
+
+    // Log number of events in time interval
+    log_value(NORMAL, "Events in time interval", last - first);
+
+    // Return
+    return;
+}
+
+
+/***********************************************************************//**
+ * @brief Return name of time index file
+ *
+ * @param[in] filename Event file name.
+ * @return Time index file name.
+ *
+ * Returns the name of the sidecar file that holds the time-sorted event
+ * index, which is the event file name with a ".tindex" suffix.
+ ***************************************************************************/
+std::string ctselect::time_index_name(const std::string& filename) const
+{
+    // Return time index file name
+    return (GFilename(filename).url() + ".tindex");
+}
+
+
+/***********************************************************************//**
+ * @brief Read time index from file
+ *
+ * @param[in] filename Time index file name.
+ * @param[in] nevents Number of events.
+ * @return Time index (empty if no valid index was found).
+ *
+ * Reads the time-sorted event index from the "INDEX" column of the "TINDEX"
+ * extension of the time index file. An empty index is returned if the file
+ * does not exist or if the number of rows differs from the number of
+ * events.
+ ***************************************************************************/
+std::vector<int> ctselect::read_time_index(const std::string& filename,
+                                           const int&         nevents) const
+{
+    // Initialise index
+    std::vector<int> index;
+
+    // Continue only if file exists
+    if (gammalib::file_exists(filename)) {
+
+        // Open FITS file
+        GFits fits(filename);
+
+        // Continue only if the index extension exists
+        if (fits.contains("TINDEX")) {
+
+            // Get index table
+            const GFitsTable* table = fits.table("TINDEX");
+
+            // Read index if the number of rows is correct
+            if (table->contains("INDEX") && (table->nrows() == nevents)) {
+                const GFitsTableCol* column = (*table)["INDEX"];
+                index.reserve(nevents);
+                for (int i = 0; i < nevents; ++i) {
+                    index.push_back(column->integer(i));
+                }
+            }
+
+        } // endif: index extension existed
+
+        // Close FITS file
+        fits.close();
+
+    } // endif: file existed
+
+    // Return index
+    return index;
+}
+
+
+/***********************************************************************//**
+ * @brief Write time index into file
+ *
+ * @param[in] filename Time index file name.
+ * @param[in] index Time index.
+ *
+ * Writes the time-sorted event index into the "INDEX" column of the
+ * "TINDEX" extension of the time index file.
+ ***************************************************************************/
+void ctselect::write_time_index(const std::string&      filename,
+                                const std::vector<int>& index) const
+{
+    // Get number of events
+    int nevents = index.size();
+
+    // Create index column
+    GFitsTableLongCol column("INDEX", nevents);
+    for (int i = 0; i < nevents; ++i) {
+        column(i) = index[i];
+    }
+
+    // Create index table
+    GFitsBinTable table(nevents);
+    table.extname("TINDEX");
+    table.append(column);
+    table.card("NEVENTS", nevents, "Number of events");
+
+    // Save index file
+    GFits fits;
+    fits.append(table);
+    fits.saveto(filename, true);
+
+    // Return
+    return;
+}
+
+
+/***********************************************************************//**
+ * @brief Check whether events in memory match the events in the event file
+ *
+ * @param[in] list CTA event list.
+ * @param[in] filename Event file name.
+ * @return True if the events in memory match the events in the file.
+ *
+ * Checks whether the event list in memory holds the same events in the
+ * same order as the events extension of the event file, by comparing the
+ * number of events and the event times. This makes sure that a time index
+ * that was computed for the events in memory also applies to the event
+ * file. False is returned if the event file can not be read.
+ ***************************************************************************/
+bool ctselect::events_match_file(const GCTAEventList* list,
+                                 const std::string&   filename) const
+{
+    // Initialise result
+    bool match = false;
+
+    // Compare events with events in file. Any exception that occurs when
+    // reading the file signals that the events do not match.
+    try {
+
+        // Open events extension of event file
+        GFilename         fname(filename);
+        GFits             fits(fname.url());
+        const GFitsTable* table =
+                    fits.table(fname.extname(gammalib::extname_cta_events));
+
+        // Compare number of events and event times
+        int nevents = list->size();
+        if (table->contains("TIME") && (table->nrows() == nevents)) {
+            GTimeReference       ref(*table);
+            const GFitsTableCol* column = (*table)["TIME"];
+            match = true;
+            for (int i = 0; i < nevents; ++i) {
+                double time = (*list)[i]->time().convert(ref);
+                if (std::abs(time - column->real(i)) > 1.0e-6) {
+                    match = false;
+                    break;
+                }
+            }
+        }
+
+        // Close FITS file
+        fits.close();
+
+    }
+    catch (std::exception& e) {
+        match = false;
+    }
+
+    // Return result
+    return match;
+}
+
+
 /***********************************************************************//**
  * @brief Return energy boundaries for a given observation
  *
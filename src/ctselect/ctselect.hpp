@@ -42,6 +42,11 @@
  * @class ctselect
  *
  * @brief Data selection tool
+ *
+ * If time bins or energy bins are specified using the time_bins() or
+ * energy_bins() methods, the selected events are in addition distributed
+ * in a single pass into one observation container per bin, which can be
+ * retrieved using the bin_obs() method.
  ***************************************************************************/
 class ctselect : public ctobservation {
 
@@ -57,10 +62,14 @@ public:
     ctselect& operator=(const ctselect& app);
 
     // Methods
-    void clear(void);
-    void run(void);
-    void save(void);
-    void publish(const std::string& name = "");
+    void                 clear(void);
+    void                 run(void);
+    void                 save(void);
+    void                 publish(const std::string& name = "");
+    void                 time_bins(const GGti& bins);
+    void                 energy_bins(const GEbounds& bins);
+    int                  nbins(void) const;
+    const GObservations& bin_obs(const int& index) const;
 
 protected:
     // Protected methods
@@ -72,6 +81,24 @@ protected:
                               const std::string& filename,
                               const std::string& evtname,
                               const std::string& gtiname);
+    void        select_events_in_memory(GCTAEventList* list,
+                                        const GGti&    gti,
+                                        const double&  emin,
+                                        const double&  emax,
+                                        const GSkyDir& centre,
+                                        const double&  rad,
+                                        const bool&    select_roi,
+                                        const bool&    remove_all);
+    void        bin_events(GCTAObservation* obs);
+    void        sort_events(GCTAObservation* obs, const std::string& filename);
+    void        slice_events(GCTAObservation* obs);
+    std::string time_index_name(const std::string& filename) const;
+    std::vector<int> read_time_index(const std::string& filename,
+                                     const int&         nevents) const;
+    void        write_time_index(const std::string&      filename,
+                                 const std::vector<int>& index) const;
+    bool        events_match_file(const GCTAEventList* list,
+                                  const std::string&   filename) const;
     GEbounds    set_ebounds(GCTAObservation* obs,
                             const GEbounds& ebounds) const;
     std::string check_infile(const std::string& filename,
@@ -88,6 +115,7 @@ protected:
     double      m_emax;       //!< Upper energy
     std::string m_expr;       //!< Selection expression
     std::string m_usethres;   //!< Energy threshold type
+    bool        m_use_tindex; //!< Persist time-sorted event index
     GChatter    m_chatter;    //!< Chattiness
 
     // Protected members
@@ -99,6 +127,21 @@ protected:
     GPhases                  m_phases;        //!< Phase intervals
     bool                     m_select_energy; //!< Perform energy selection
     bool                     m_select_phase;  //!< Perform phase selection
+    GGti                     m_time_bins;     //!< Time bins for binned selection
+    GEbounds                 m_energy_bins;   //!< Energy bins for binned selection
+    std::vector<GObservations> m_bin_obs;     //!< Observations for each bin
 };
 
+
+/***********************************************************************//**
+ * @brief Return number of selection bins
+ *
+ * @return Number of time or energy bins.
+ ***************************************************************************/
+inline
+int ctselect::nbins(void) const
+{
+    return (int)m_bin_obs.size();
+}
+
 #endif /* CTSELECT_HPP */
@@ -29,15 +29,22 @@
 #include <config.h>
 #endif
 #include <cstdio>
+#include <cmath>
+#ifdef _OPENMP
+#include <omp.h>
+#endif
 #include "cttsmap.hpp"
 #include "GTools.hpp"
 
 /* __ Method name definitions ____________________________________________ */
 #define G_GET_PARAMETERS                          "cttsmap::get_parameters()"
+#define G_COMPUTE_FAST        "cttsmap::compute_fast(int&, int&, GModels&, "\
+                                                                      "int&)"
 
 /* __ Debug definitions __________________________________________________ */
 
 /* __ Coding definitions _________________________________________________ */
+#define G_STATUS_INTERPOLATED    100  //!< Status of interpolated map bins
 
 
 /*==========================================================================
@@ -248,8 +255,15 @@ void cttsmap::run(void)
     // Remove test source
     models.remove(m_srcname);
 
-    // Get likelihood of null hypothesis if not given before
-    if (m_logL0 == 0.0) {
+    // Initialise null hypothesis models
+    GModels null_models = models;
+
+    // Fit the null hypothesis if its likelihood was not given before. The
+    // fast method computes the expected number of counts from the fitted
+    // null hypothesis models, hence the null hypothesis is always fitted
+    // for the fast method. A given likelihood of the null hypothesis is
+    // kept.
+    if (m_logL0 == 0.0 || m_method == "FAST") {
 
         // Write header
         log_header1(TERSE, "Compute NULL Hypothesis for TS computation");
@@ -257,92 +271,74 @@ void cttsmap::run(void)
         // Compute likelihood without the test source
         m_obs.models(models);
         m_obs.optimize(m_opt);
-        m_logL0 = -(m_opt.value());
+        if (m_logL0 == 0.0) {
+            m_logL0 = -(m_opt.value());
+        }
+
+        // Store fitted null hypothesis models
+        null_models = m_obs.models();
 
 	}
 
     // Write header
     log_header1(TERSE, "Generate TS map");
 
-    // Loop over grid positions
-    for (int i = binmin; i < binmax; ++i) {
-
-    	// Get the coordinate of current bin
-    	GSkyDir bincentre = m_tsmap.inx2dir(i);
-
-    	// Header for verbose logging
-        log_header2(EXPLICIT, "Computing TS for bin number "+gammalib::str(i)+
-                    " at "+bincentre.print());
-
-    	// Add test source at current bin position
-        (*m_testsource)["RA"].value(bincentre.ra_deg());
-        (*m_testsource)["DEC"].value(bincentre.dec_deg());
-        models.append(*m_testsource);
+    // Determine number of threads
+    int nthreads = 1;
+    #ifdef _OPENMP
+    nthreads = (m_nthreads > 0) ? m_nthreads : omp_get_max_threads();
+    #endif
+    log_value(NORMAL, "Number of threads", nthreads);
+    log_value(NORMAL, "Method", m_method);
+
+    // Compute TS map using the fast method
+    if (m_method == "FAST") {
+
+        // Compute TS map by fitting the test source amplitude
+        compute_fast(binmin, binmax, null_models, nthreads);
+
+        // Optionally re-fit all bins with a TS value above the threshold
+        if (m_refit >= 0.0) {
+
+            // Collect bins above the threshold
+            std::vector<int> bins;
+            for (int i = binmin; i < binmax; ++i) {
+                if (m_tsmap(i) >= m_refit) {
+                    bins.push_back(i);
+                }
+            }
 
-    	// Assign models to observations
-    	m_obs.models(models);
+            // Write header
+            log_header1(TERSE, "Re-fit TS map bins");
+            log_value(NORMAL, "TS threshold", m_refit);
+            log_value(NORMAL, "Number of bins", (int)bins.size());
 
-    	// Optimize observation container
-    	m_obs.optimize(m_opt);
+            // Re-fit bins
+            compute_bins(bins, models, nthreads);
 
-    	// Compute errors if necessary
-    	if (m_errors) {
-    		m_obs.errors(m_opt);
-    	}
+        } // endif: re-fit requested
 
-    	// Get status of optimization
-    	int status = m_opt.status();
+    } // endif: fast method
 
-    	// Retrieve the Likelihood value
-    	double logL1 = -(m_opt.value());
+    // ... otherwise if the adaptive method is requested then fit the bins
+    // of a coarse grid and refine the grid where needed
+    else if (m_method == "ADAPTIVE") {
+        compute_adaptive(models, nthreads);
+    }
 
-    	// Compute TS value
-    	double ts = 2.0 * (logL1 - m_logL0);
+    // ... otherwise fit all free parameters in each bin
+    else {
 
-    	// Log information
-    	if (logExplicit()) {
-            log_value(EXPLICIT, "TS value", ts);
-    	}
-        else if (logNormal()) {
-            log_value(NORMAL, "TS value (bin "+gammalib::str(i)+")",
-                      gammalib::str(ts)+" ("+bincentre.print()+")");
+        // Set bins
+        std::vector<int> bins;
+        for (int i = binmin; i < binmax; ++i) {
+            bins.push_back(i);
         }
 
-    	// Get test source model instance
-    	GModels best_fit_model = m_obs.models();
-    	GModel* testsource     = best_fit_model[m_srcname];
-
-    	// Assign values to the maps
-    	m_tsmap(i) = ts;
-
-    	// Extract fitted test source parameters
-        for (int j = 0; j < m_mapnames.size(); ++j) {
-
-            // If map name start with "e_" then set the parameter error ...
-            if (m_mapnames[j].substr(0,2) == "e_") {
-
-                // Get parameter name by removing the error prefix
-            	std::string parname = m_mapnames[j].substr(2, m_mapnames[j].size());
-
-                // Get parameter error
-           		m_maps[j](i) = (*testsource)[parname].error();
-
-            }
-
-            // ... otherwise set the parameter value
-            else {
-                m_maps[j](i) = (*testsource)[m_mapnames[j]].value();
-            }
-
-        } // endfor: looped over all maps
-
-        // Set Fit status of the bin
-        m_statusmap(i) = status;
-
-    	// Remove model from container
-    	models.remove(m_srcname);
+        // Compute bins
+        compute_bins(bins, models, nthreads);
 
-    } // endfor: looped over grid positions
+    }
 
     // Bring models to initial state
     m_obs.models(models_orig);
@@ -394,6 +390,13 @@ void cttsmap::save(void)
         m_statusmap.write(fits);
         fits[fits.size()-1]->extname("STATUS MAP");
 
+        // Write range of computed map bins into status map header so that
+        // cstsmapmerge only needs to consider these map bins
+        int binmin = (m_binmin == -1) ? 0 : m_binmin;
+        int binmax = (m_binmax == -1) ? m_tsmap.npix() : m_binmax;
+        fits[fits.size()-1]->card("BINMIN", binmin, "First computed map bin");
+        fits[fits.size()-1]->card("BINMAX", binmax, "Last computed map bin + 1");
+
         // Save FITS file
         fits.saveto(m_outmap, clobber());
 
@@ -460,6 +463,11 @@ void cttsmap::init_members(void)
     m_binmin     = -1;
     m_binmax     = -1;
     m_logL0      = 0.0;
+    m_nthreads   = 0;
+    m_method     = "FULL";
+    m_refit      = -1.0;
+    m_coarse     = 4;
+    m_tsrefine   = 9.0;
     m_tsmap.clear();
     m_statusmap.clear();
     m_mapnames.clear();
@@ -489,6 +497,11 @@ void cttsmap::copy_members(const cttsmap& app)
     m_binmin    = app.m_binmin;
     m_binmax    = app.m_binmax;
     m_logL0     = app.m_logL0;
+    m_nthreads  = app.m_nthreads;
+    m_method    = app.m_method;
+    m_refit     = app.m_refit;
+    m_coarse    = app.m_coarse;
+    m_tsrefine  = app.m_tsrefine;
     m_tsmap     = app.m_tsmap;
     m_statusmap = app.m_statusmap;
     m_mapnames  = app.m_mapnames;
@@ -523,7 +536,8 @@ void cttsmap::free_members(void)
  * @brief Get application parameters
  *
  * @exception GException::invalid_value
- *            Test source has no RA/DEC parameters.
+ *            Test source has no RA/DEC parameters or map bin range
+ *            specified for adaptive method.
  *
  * Get all task parameters from parameter file or (if required) by querying
  * the user. Most parameters are only required if no observation exists so
@@ -574,10 +588,25 @@ void cttsmap::get_parameters(void)
     m_apply_edisp = (*this)["edisp"].boolean();
 
     // Get optional splitting parameters
-    m_binmin  = (*this)["binmin"].integer();
-    m_binmax  = (*this)["binmax"].integer();
-    m_logL0   = (*this)["logL0"].real();
-    m_publish = (*this)["publish"].boolean();
+    m_binmin   = (*this)["binmin"].integer();
+    m_binmax   = (*this)["binmax"].integer();
+    m_logL0    = (*this)["logL0"].real();
+    m_nthreads = (*this)["nthreads"].integer();
+    m_method   = gammalib::toupper((*this)["method"].string());
+    m_refit    = (*this)["refit"].real();
+    m_coarse   = (*this)["coarse"].integer();
+    m_tsrefine = (*this)["tsrefine"].real();
+    m_publish  = (*this)["publish"].boolean();
+
+    // Check that no map bin range was specified for the adaptive method
+    if (m_method == "ADAPTIVE" && (m_binmin != -1 || m_binmax != -1)) {
+        std::string msg = "Map bin range ["+gammalib::str(m_binmin)+","+
+                          gammalib::str(m_binmax)+"] specified for "
+                          "method=ADAPTIVE. The adaptive method always "
+                          "computes the full map, hence please do not "
+                          "specify \"binmin\" and \"binmax\".";
+        throw GException::invalid_value(G_GET_PARAMETERS, msg);
+    }
 
     // Optionally read ahead parameters so that they get correctly
     // dumped into the log file
@@ -593,6 +622,717 @@ void cttsmap::get_parameters(void)
 }
 
 
+/***********************************************************************//**
+ * @brief Compute TS for map bins
+ *
+ * @param[in] bins Map bin indices.
+ * @param[in] models Models without test source.
+ * @param[in] nthreads Number of threads.
+ * @param[in] seeds Map bin indices of warm start values (optional).
+ *
+ * Computes the TS values for a list of map bins by fitting all free
+ * parameters. The map bins are distributed dynamically over the threads,
+ * where each thread owns a copy of the observation container, the
+ * optimizer, the models and the test source. Each map bin is written
+ * exactly once into the maps.
+ *
+ * If @p seeds is not empty it needs to have the same size as @p bins. For
+ * each map bin with a non-negative seed the fit of the free test source
+ * parameters starts from the values fitted for the seed map bin. Seed map
+ * bins need to be computed before.
+ ***************************************************************************/
+void cttsmap::compute_bins(const std::vector<int>& bins,
+                           const GModels&          models,
+                           const int&              nthreads,
+                           const std::vector<int>& seeds)
+{
+    // Get number of bins
+    int nbins = bins.size();
+
+    // Loop over map bins
+    #pragma omp parallel num_threads(nthreads)
+    {
+        // Get thread copies
+        GObservations obs(m_obs);
+        GOptimizerLM  opt(m_opt);
+        GModels       bin_models(models);
+        GModel*       testsource = m_testsource->clone();
+
+        // Disable optimizer logging if several threads are used
+        if (nthreads > 1) {
+            opt.logger(NULL);
+        }
+
+        // Loop over map bins
+        #pragma omp for schedule(dynamic)
+        for (int i = 0; i < nbins; ++i) {
+
+            // Optionally start from the parameters of the seed map bin
+            if (!seeds.empty() && seeds[i] >= 0) {
+                for (int j = 0; j < m_mapnames.size(); ++j) {
+                    if (m_mapnames[j].substr(0,2) != "e_") {
+                        (*testsource)[m_mapnames[j]].value(m_maps[j](seeds[i]));
+                    }
+                }
+            }
+
+            // Compute map bin
+            compute_bin(bins[i], obs, opt, bin_models, testsource);
+
+        } // endfor: looped over map bins
+
+        // Free test source copy
+        delete testsource;
+
+    } // end pragma omp parallel
+
+    // Return
+    return;
+}
+
+
+/***********************************************************************//**
+ * @brief Compute TS map adaptively
+ *
+ * @param[in] models Models without test source.
+ * @param[in] nthreads Number of threads.
+ *
+ * Computes the TS map by first fitting the map bins on a coarse grid with
+ * a spacing of m_coarse pixels. The grid defines rectangular cells with
+ * fitted map bins at the corners. A cell is split into up to four
+ * sub-cells if the maximum TS value of its corners or the difference
+ * between the maximum and minimum TS value of its corners is equal to or
+ * larger than m_tsrefine. The new corner bins of the sub-cells are fitted
+ * starting from the parameters of the nearest corner bin of the parent
+ * cell. The refinement continues until no cell needs to be split or all
+ * cells have a size of one pixel.
+ *
+ * The map bins of cells that are not split are set to the values of the
+ * nearest fitted corner bin, hence the number of fits scales with the
+ * number of cells that need refinement rather than the number of map
+ * bins. The map bins of each refinement level are fitted in parallel.
+ ***************************************************************************/
+void cttsmap::compute_adaptive(const GModels& models, const int& nthreads)
+{
+    // Get map dimensions
+    int nx   = m_tsmap.nx();
+    int ny   = m_tsmap.ny();
+    int step = (m_coarse > 1) ? m_coarse : 1;
+
+    // Set coarse grid coordinates, including the last pixel in each
+    // dimension
+    std::vector<int> xs;
+    std::vector<int> ys;
+    for (int ix = 0; ix < nx; ix += step) {
+        xs.push_back(ix);
+    }
+    if (xs.back() != nx-1) {
+        xs.push_back(nx-1);
+    }
+    for (int iy = 0; iy < ny; iy += step) {
+        ys.push_back(iy);
+    }
+    if (ys.back() != ny-1) {
+        ys.push_back(ny-1);
+    }
+
+    // Initialise flags of computed map bins
+    std::vector<bool> computed(m_tsmap.npix(), false);
+
+    // Collect map bins of coarse grid
+    std::vector<int> bins;
+    for (int iy = 0; iy < ys.size(); ++iy) {
+        for (int ix = 0; ix < xs.size(); ++ix) {
+            int inx = xs[ix] + ys[iy] * nx;
+            bins.push_back(inx);
+            computed[inx] = true;
+        }
+    }
+
+    // Collect cells of coarse grid. Each cell is stored as four successive
+    // elements x0, y0, x1 and y1.
+    std::vector<int> cells;
+    int ncx = (xs.size() > 1) ? xs.size()-1 : 1;
+    int ncy = (ys.size() > 1) ? ys.size()-1 : 1;
+    for (int iy = 0; iy < ncy; ++iy) {
+        for (int ix = 0; ix < ncx; ++ix) {
+            cells.push_back(xs[ix]);
+            cells.push_back(ys[iy]);
+            cells.push_back(xs[(ix+1 < xs.size()) ? ix+1 : ix]);
+            cells.push_back(ys[(iy+1 < ys.size()) ? iy+1 : iy]);
+        }
+    }
+
+    // Write header
+    log_header3(NORMAL, "Fit coarse grid");
+    log_value(NORMAL, "Grid spacing", gammalib::str(step)+" pixels");
+    log_value(NORMAL, "Number of bins", (int)bins.size());
+
+    // Compute map bins of coarse grid
+    compute_bins(bins, models, nthreads);
+
+    // Initialise number of fitted bins
+    int nfitted = bins.size();
+
+    // Refine grid until no cell needs further refinement
+    for (int level = 1; !cells.empty(); ++level) {
+
+        // Initialise bins, seeds and cells of next level
+        std::vector<int> next_bins;
+        std::vector<int> next_seeds;
+        std::vector<int> next_cells;
+
+        // Loop over cells
+        for (int k = 0; k < cells.size(); k += 4) {
+
+            // Get cell boundaries
+            int x0 = cells[k];
+            int y0 = cells[k+1];
+            int x1 = cells[k+2];
+            int y1 = cells[k+3];
+
+            // Get corner map bins
+            int corners[4] = {x0 + y0 * nx, x1 + y0 * nx,
+                              x0 + y1 * nx, x1 + y1 * nx};
+
+            // Determine minimum and maximum TS value of the corners
+            double tsmin = m_tsmap(corners[0]);
+            double tsmax = m_tsmap(corners[0]);
+            for (int c = 1; c < 4; ++c) {
+                double ts = m_tsmap(corners[c]);
+                if (ts < tsmin) {
+                    tsmin = ts;
+                }
+                if (ts > tsmax) {
+                    tsmax = ts;
+                }
+            }
+
+            // Determine whether the cell needs to be split
+            bool split = ((x1 - x0 > 1) || (y1 - y0 > 1)) &&
+                         ((tsmax >= m_tsrefine) || (tsmax - tsmin >= m_tsrefine));
+
+            // If the cell is not split then set all map bins that were not
+            // computed to the values of the nearest corner and skip the cell
+            if (!split) {
+                for (int iy = y0; iy <= y1; ++iy) {
+                    for (int ix = x0; ix <= x1; ++ix) {
+                        int inx = ix + iy * nx;
+                        if (!computed[inx]) {
+                            int src = (2 * ix <= x0 + x1) ?
+                                      ((2 * iy <= y0 + y1) ? corners[0] : corners[2]) :
+                                      ((2 * iy <= y0 + y1) ? corners[1] : corners[3]);
+                            copy_bin(src, inx);
+                        }
+                    }
+                }
+                continue;
+            }
+
+            // Set split coordinates
+            int xm = (x0 + x1) / 2;
+            int ym = (y0 + y1) / 2;
+            int xsplit[3] = {x0, xm, x1};
+            int ysplit[3] = {y0, ym, y1};
+
+            // Collect sub-cells. Dimensions with a size of one pixel are
+            // not split.
+            std::vector<int> xcells;
+            std::vector<int> ycells;
+            if (x1 - x0 > 1) {
+                xcells.push_back(x0);
+                xcells.push_back(xm);
+                xcells.push_back(xm);
+                xcells.push_back(x1);
+            }
+            else {
+                xcells.push_back(x0);
+                xcells.push_back(x1);
+            }
+            if (y1 - y0 > 1) {
+                ycells.push_back(y0);
+                ycells.push_back(ym);
+                ycells.push_back(ym);
+                ycells.push_back(y1);
+            }
+            else {
+                ycells.push_back(y0);
+                ycells.push_back(y1);
+            }
+            for (int sy = 0; sy < ycells.size(); sy += 2) {
+                for (int sx = 0; sx < xcells.size(); sx += 2) {
+                    next_cells.push_back(xcells[sx]);
+                    next_cells.push_back(ycells[sy]);
+                    next_cells.push_back(xcells[sx+1]);
+                    next_cells.push_back(ycells[sy+1]);
+                }
+            }
+
+            // Collect map bins that were not yet computed, using the
+            // nearest corner map bin as seed
+            for (int sy = 0; sy < 3; ++sy) {
+                for (int sx = 0; sx < 3; ++sx) {
+                    int inx = xsplit[sx] + ysplit[sy] * nx;
+                    if (!computed[inx]) {
+                        int seed = (2 * xsplit[sx] <= x0 + x1) ?
+                                   ((2 * ysplit[sy] <= y0 + y1) ? corners[0] : corners[2]) :
+                                   ((2 * ysplit[sy] <= y0 + y1) ? corners[1] : corners[3]);
+                        next_bins.push_back(inx);
+                        next_seeds.push_back(seed);
+                        computed[inx] = true;
+                    }
+                }
+            }
+
+        } // endfor: looped over cells
+
+        // Compute map bins of next level
+        if (!next_bins.empty()) {
+
+            // Write header
+            log_header3(NORMAL, "Refine grid (level "+gammalib::str(level)+")");
+            log_value(NORMAL, "Number of cells", (int)next_cells.size()/4);
+            log_value(NORMAL, "Number of bins", (int)next_bins.size());
+
+            // Compute map bins
+            compute_bins(next_bins, models, nthreads, next_seeds);
+
+            // Update number of fitted bins
+            nfitted += next_bins.size();
+
+        }
+
+        // Set cells of next level
+        cells = next_cells;
+
+    } // endfor: looped over refinement levels
+
+    // Log number of fitted bins
+    log_value(NORMAL, "Number of fitted bins", gammalib::str(nfitted)+" of "+
+              gammalib::str(m_tsmap.npix()));
+
+    // Return
+    return;
+}
+
+
+/***********************************************************************//**
+ * @brief Copy map bin
+ *
+ * @param[in] src Source map bin index.
+ * @param[in] dst Destination map bin index.
+ *
+ * Copies the TS value and the test source parameters and errors of a map
+ * bin into another map bin. The status of the destination map bin is set
+ * to 100, which signals that the map bin was not fitted but interpolated
+ * from a fitted map bin.
+ ***************************************************************************/
+void cttsmap::copy_bin(const int& src, const int& dst)
+{
+    // Copy TS value and set interpolation status
+    m_tsmap(dst)     = m_tsmap(src);
+    m_statusmap(dst) = G_STATUS_INTERPOLATED;
+
+    // Copy parameters and errors
+    for (int j = 0; j < m_maps.size(); ++j) {
+        m_maps[j](dst) = m_maps[j](src);
+    }
+
+    // Return
+    return;
+}
+
+
+/***********************************************************************//**
+ * @brief Compute TS map by fitting the test source amplitude
+ *
+ * @param[in] binmin First map bin.
+ * @param[in] binmax Map bin after the last map bin.
+ * @param[in] null_models Models of the null hypothesis.
+ * @param[in] nthreads Number of threads.
+ *
+ * @exception GException::invalid_value
+ *            Test source has no normalisation parameter.
+ *
+ * Computes the TS map by fitting only the amplitude of the test source on
+ * top of the fixed null hypothesis models. The expected number of counts
+ * of the null hypothesis is computed once for all events or bins of all
+ * observations. For each map bin the expected number of counts of the test
+ * source is then computed once, and the amplitude @f$a@f$ that maximises
+ *
+ * @f[
+ *    \ln L(a) = \sum_i n_i \ln \left( 1 + a \frac{s_i}{m_i} \right) - a S
+ * @f]
+ *
+ * is determined using Newton steps, where @f$n_i@f$ is the number of
+ * counts in event or bin @f$i@f$, @f$m_i@f$ and @f$s_i@f$ are the expected
+ * number of counts of the null hypothesis and the test source, and
+ * @f$S@f$ is the total number of counts expected from the test source. The
+ * TS value is given by @f$2 \ln L(a)@f$. The amplitude is constrained to
+ * be non-negative.
+ *
+ * The normalisation parameter of the test source is set to the fitted
+ * amplitude, while all other free parameters of the test source are kept
+ * at their initial values.
+ ***************************************************************************/
+void cttsmap::compute_fast(const int&     binmin,
+                           const int&     binmax,
+                           const GModels& null_models,
+                           const int&     nthreads)
+{
+    // Get index of test source normalisation parameter
+    int inorm = -1;
+    for (int i = 0; i < m_testsource->size(); ++i) {
+        if ((*m_testsource)[i].name() == "Prefactor" ||
+            (*m_testsource)[i].name() == "Normalization") {
+            inorm = i;
+            break;
+        }
+    }
+    if (inorm == -1) {
+        std::string msg = "Source \""+m_srcname+"\" has no \"Prefactor\" "
+                          "or \"Normalization\" parameter. Only sources "
+                          "with a normalisation parameter can be used as "
+                          "test sources for method=FAST.";
+        throw GException::invalid_value(G_COMPUTE_FAST, msg);
+    }
+
+    // Get normalisation parameter name and value
+    std::string normname = (*m_testsource)[inorm].name();
+    double      norm     = (*m_testsource)[inorm].value();
+
+    // Compute number of counts and expected number of counts of the null
+    // hypothesis for all events or bins of all observations
+    int                               nobs = m_obs.size();
+    std::vector<bool>                 unbinned(nobs, false);
+    std::vector<std::vector<double> > counts(nobs);
+    std::vector<std::vector<double> > nulls(nobs);
+    for (int iobs = 0; iobs < nobs; ++iobs) {
+
+        // Get observation and events
+        const GObservation* obs    = m_obs[iobs];
+        const GEvents*      events = obs->events();
+
+        // Signal unbinned observation
+        unbinned[iobs] = (dynamic_cast<const GEventList*>(events) != NULL);
+
+        // Loop over events or bins
+        int nevents = events->size();
+        counts[iobs].assign(nevents, 0.0);
+        nulls[iobs].assign(nevents, 0.0);
+        for (int k = 0; k < nevents; ++k) {
+            const GEvent* event = (*events)[k];
+            counts[iobs][k]     = event->counts();
+            nulls[iobs][k]      = null_models.eval(*event, *obs) * event->size();
+        }
+
+    } // endfor: looped over observations
+
+    // Loop over map bins. The map bins are distributed dynamically over
+    // the threads, where each thread owns a copy of the observation
+    // container and the test source.
+    #pragma omp parallel num_threads(nthreads)
+    {
+        // Get thread copies
+        GObservations obs(m_obs);
+        GModel*       testsource = m_testsource->clone();
+
+        // Loop over map bins
+        #pragma omp for schedule(dynamic)
+        for (int i = binmin; i < binmax; ++i) {
+
+            // Get the coordinate of current bin
+            GSkyDir bincentre = m_tsmap.inx2dir(i);
+
+            // Set test source at current bin position
+            (*testsource)["RA"].value(bincentre.ra_deg());
+            (*testsource)["DEC"].value(bincentre.dec_deg());
+
+            // Collect the number of counts and the expected number of counts
+            // of the null hypothesis and the test source for all events or
+            // bins to which the test source contributes
+            std::vector<double> n;
+            std::vector<double> m;
+            std::vector<double> t;
+            double              stot = 0.0;
+            for (int iobs = 0; iobs < nobs; ++iobs) {
+
+                // Get events
+                const GEvents* events = obs[iobs]->events();
+
+                // Loop over events or bins
+                for (int k = 0; k < events->size(); ++k) {
+
+                    // Compute expected number of counts of test source
+                    const GEvent* event = (*events)[k];
+                    double        value = testsource->eval(*event, *obs[iobs]) *
+                                          event->size();
+
+                    // For binned observations sum expected number of counts
+                    if (!unbinned[iobs]) {
+                        stot += value;
+                    }
+
+                    // Collect event or bin
+                    if (value > 0.0 && counts[iobs][k] > 0.0 &&
+                        nulls[iobs][k] > 0.0) {
+                        n.push_back(counts[iobs][k]);
+                        m.push_back(nulls[iobs][k]);
+                        t.push_back(value);
+                    }
+
+                } // endfor: looped over events or bins
+
+                // For unbinned observations compute total expected number
+                // of counts
+                if (unbinned[iobs]) {
+                    stot += obs[iobs]->npred(*testsource);
+                }
+
+            } // endfor: looped over observations
+
+            // Fit amplitude
+            double amplitude = 0.0;
+            double error     = 0.0;
+            double ts        = 0.0;
+            int    status    = fit_amplitude(n, m, t, stot, amplitude, error, ts);
+
+            // Assign values to the maps
+            m_tsmap(i)     = ts;
+            m_statusmap(i) = status;
+            for (int j = 0; j < m_mapnames.size(); ++j) {
+                if (m_mapnames[j] == normname) {
+                    m_maps[j](i) = amplitude * norm;
+                }
+                else if (m_mapnames[j] == "e_"+normname) {
+                    m_maps[j](i) = error * norm;
+                }
+                else if (m_mapnames[j].substr(0,2) == "e_") {
+                    m_maps[j](i) = 0.0;
+                }
+                else {
+                    m_maps[j](i) = (*testsource)[m_mapnames[j]].value();
+                }
+            }
+
+            // Log information
+            #pragma omp critical(cttsmap_compute_bin)
+            {
+                log_value(NORMAL, "TS value (bin "+gammalib::str(i)+")",
+                          gammalib::str(ts)+" ("+bincentre.print()+")");
+            }
+
+        } // endfor: looped over map bins
+
+        // Free test source copy
+        delete testsource;
+
+    } // end pragma omp parallel
+
+    // Return
+    return;
+}
+
+
+/***********************************************************************//**
+ * @brief Fit test source amplitude
+ *
+ * @param[in] n Number of counts.
+ * @param[in] m Expected number of counts of null hypothesis.
+ * @param[in] t Expected number of counts of test source.
+ * @param[in] stot Total expected number of counts of test source.
+ * @param[out] amplitude Fitted amplitude.
+ * @param[out] error Statistical error of amplitude.
+ * @param[out] ts Test Statistic.
+ * @return Fit status (0=converged, 1=not converged).
+ *
+ * Determines the non-negative amplitude that maximises the Poisson
+ * log-likelihood of the null hypothesis plus the amplitude times the test
+ * source using Newton steps. Since the derivative of the log-likelihood
+ * is a convex and decreasing function of the amplitude, Newton steps that
+ * start from zero amplitude converge monotonically.
+ ***************************************************************************/
+int cttsmap::fit_amplitude(const std::vector<double>& n,
+                           const std::vector<double>& m,
+                           const std::vector<double>& t,
+                           const double&              stot,
+                           double&                    amplitude,
+                           double&                    error,
+                           double&                    ts) const
+{
+    // Set constants
+    const int    max_iter  = 100;
+    const double tolerance = 1.0e-6;
+
+    // Initialise results
+    int status = 0;
+    amplitude  = 0.0;
+    error      = 0.0;
+    ts         = 0.0;
+
+    // Newton iterations
+    for (int iter = 0; iter <= max_iter; ++iter) {
+
+        // Signal non-convergence if the maximum number of iterations is
+        // reached
+        if (iter == max_iter) {
+            status = 1;
+            break;
+        }
+
+        // Compute first and second derivative of log-likelihood
+        double grad = -stot;
+        double curv = 0.0;
+        for (int i = 0; i < n.size(); ++i) {
+            double ratio = t[i] / (m[i] + amplitude * t[i]);
+            grad        += n[i] * ratio;
+            curv        -= n[i] * ratio * ratio;
+        }
+
+        // Store amplitude error
+        error = (curv < 0.0) ? 1.0 / std::sqrt(-curv) : 0.0;
+
+        // Stop at zero amplitude if the log-likelihood decreases
+        if (amplitude == 0.0 && grad <= 0.0) {
+            break;
+        }
+
+        // Stop if curvature is not negative
+        if (curv >= 0.0) {
+            status = 1;
+            break;
+        }
+
+        // Do Newton step
+        double step = -grad / curv;
+        amplitude  += step;
+
+        // Check for convergence
+        if (std::abs(step) <= tolerance * amplitude) {
+            break;
+        }
+
+    } // endfor: Newton iterations
+
+    // Compute Test Statistic
+    if (amplitude > 0.0) {
+        double logL = -amplitude * stot;
+        for (int i = 0; i < n.size(); ++i) {
+            logL += n[i] * std::log(1.0 + amplitude * t[i] / m[i]);
+        }
+        ts = 2.0 * logL;
+        if (ts < 0.0) {
+            ts = 0.0;
+        }
+    }
+
+    // Return status
+    return status;
+}
+
+
+/***********************************************************************//**
+ * @brief Compute TS for a map bin
+ *
+ * @param[in] ibin Map bin index.
+ * @param[in,out] obs Observation container.
+ * @param[in,out] opt Optimizer.
+ * @param[in,out] models Models without test source.
+ * @param[in,out] testsource Test source.
+ *
+ * Computes the TS value and the fitted test source parameters for a map
+ * bin by placing the test source at the bin centre and optimizing the
+ * observation container. The results are stored in the map bin. The
+ * method may be called in parallel for distinct map bins provided that
+ * each thread passes its own observation container, optimizer, models
+ * and test source.
+ ***************************************************************************/
+void cttsmap::compute_bin(const int&     ibin,
+                          GObservations& obs,
+                          GOptimizerLM&  opt,
+                          GModels&       models,
+                          GModel*        testsource)
+{
+    // Get the coordinate of current bin
+    GSkyDir bincentre = m_tsmap.inx2dir(ibin);
+
+    // Add test source at current bin position
+    (*testsource)["RA"].value(bincentre.ra_deg());
+    (*testsource)["DEC"].value(bincentre.dec_deg());
+    models.append(*testsource);
+
+    // Assign models to observations
+    obs.models(models);
+
+    // Optimize observation container
+    obs.optimize(opt);
+
+    // Compute errors if necessary
+    if (m_errors) {
+        obs.errors(opt);
+    }
+
+    // Get status of optimization
+    int status = opt.status();
+
+    // Retrieve the Likelihood value
+    double logL1 = -(opt.value());
+
+    // Compute TS value
+    double ts = 2.0 * (logL1 - m_logL0);
+
+    // Log information
+    #pragma omp critical(cttsmap_compute_bin)
+    {
+        if (logExplicit()) {
+            log_header2(EXPLICIT, "Computing TS for bin number "+
+                        gammalib::str(ibin)+" at "+bincentre.print());
+            log_value(EXPLICIT, "TS value", ts);
+        }
+        else if (logNormal()) {
+            log_value(NORMAL, "TS value (bin "+gammalib::str(ibin)+")",
+                      gammalib::str(ts)+" ("+bincentre.print()+")");
+        }
+    }
+
+    // Get fitted test source
+    const GModel* fitted = obs.models()[m_srcname];
+
+    // Assign values to the maps
+    m_tsmap(ibin) = ts;
+
+    // Extract fitted test source parameters
+    for (int j = 0; j < m_mapnames.size(); ++j) {
+
+        // If map name start with "e_" then set the parameter error ...
+        if (m_mapnames[j].substr(0,2) == "e_") {
+
+            // Get parameter name by removing the error prefix
+            std::string parname = m_mapnames[j].substr(2, m_mapnames[j].size());
+
+            // Get parameter error
+            m_maps[j](ibin) = (*fitted)[parname].error();
+
+        }
+
+        // ... otherwise set the parameter value
+        else {
+            m_maps[j](ibin) = (*fitted)[m_mapnames[j]].value();
+        }
+
+    } // endfor: looped over all maps
+
+    // Set Fit status of the bin
+    m_statusmap(ibin) = status;
+
+    // Remove test source from models
+    models.remove(m_srcname);
+
+    // Return
+    return;
+}
+
+
 /***********************************************************************//**
  * @brief Initialise skymaps
  *
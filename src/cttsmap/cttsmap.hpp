@@ -51,6 +51,10 @@
  * During the computation a putative point-like source is moved along a
  * grid of coordinates. The best fit results (TS, flux, index) are stored in
  * maps which are saved in the output FITS files.
+ *
+ * The grid positions are distributed dynamically over the available
+ * threads, where each thread owns a copy of the observation container and
+ * the optimizer.
  ***************************************************************************/
 class cttsmap : public ctlikelihood {
 
@@ -79,6 +83,28 @@ protected:
     void free_members(void);
     void get_parameters(void);
     void init_maps(const GSkyMap& map);
+    void compute_bin(const int&     ibin,
+                     GObservations& obs,
+                     GOptimizerLM&  opt,
+                     GModels&       models,
+                     GModel*        testsource);
+    void compute_bins(const std::vector<int>& bins,
+                      const GModels&          models,
+                      const int&              nthreads,
+                      const std::vector<int>& seeds = std::vector<int>());
+    void compute_adaptive(const GModels& models, const int& nthreads);
+    void copy_bin(const int& src, const int& dst);
+    void compute_fast(const int&     binmin,
+                      const int&     binmax,
+                      const GModels& null_models,
+                      const int&     nthreads);
+    int  fit_amplitude(const std::vector<double>& n,
+                       const std::vector<double>& m,
+                       const std::vector<double>& t,
+                       const double&              stot,
+                       double&                    amplitude,
+                       double&                    error,
+                       double&                    ts) const;
 
     // User parameters
     std::string m_srcname;     //!< Name of source which is moved around
@@ -91,6 +117,11 @@ protected:
     int         m_binmin;      //!< Map bin number from which computation should start
     int         m_binmax;      //!< Map bin number where map computation should end
     double      m_logL0;       //!< Likelihood value of null hypothesis
+    int         m_nthreads;    //!< Number of threads (0=all available)
+    std::string m_method;      //!< TS map computation method
+    double      m_refit;       //!< TS threshold for re-fitting FAST bins
+    int         m_coarse;      //!< Coarse grid spacing for ADAPTIVE method
+    double      m_tsrefine;    //!< TS threshold for ADAPTIVE grid refinement
 
     // Protected members
     GSkyMap                  m_tsmap;       //!< TS map
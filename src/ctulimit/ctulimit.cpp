@@ -29,13 +29,14 @@
 #include <config.h>
 #endif
 #include <cstdio>
+#include <cmath>
 #include "ctulimit.hpp"
 #include "GTools.hpp"
 #include "GOptimizer.hpp"
 
 /* __ Method name definitions ____________________________________________ */
 #define G_GET_MODEL_PARAMETER               "ctulimit::get_model_parameter()"
-#define G_UL_BISECTION             "ctulimit::ul_bisection(double&, double&)"
+#define G_ULIMIT_ROOT     "ctulimit::ulimit_root(double&, double&, double&)"
 
 /* __ Debug definitions __________________________________________________ */
 
@@ -297,7 +298,7 @@ void ctulimit::run(void)
               "["+gammalib::str(parmin)+", "+gammalib::str(parmax)+"]");
 
     // Compute upper limit
-    ulimit_bisection(parmin, parmax);
+    ulimit_root(value, error, parmax);
 
     // Write final parameter into logger
     log_value(NORMAL, "Final parameter", m_model_par->value());
@@ -488,7 +489,8 @@ void ctulimit::get_parameters(void)
     m_max_iter = (*this)["max_iter"].integer();
 
     // Get remaining parameters
-    m_chatter = static_cast<GChatter>((*this)["chatter"].integer());
+    m_use_cache = (*this)["profcache"].boolean();
+    m_chatter   = static_cast<GChatter>((*this)["chatter"].integer());
 
     // Write parameters into logger
     log_parameters(TERSE);
@@ -576,65 +578,52 @@ void ctulimit::get_model_parameter(void)
 
 
 /***********************************************************************//**
- * @brief Calculate upper limit using a bisection method
+ * @brief Calculate upper limit using a bracketed root finder
  *
- * @param[in] min Minimum parameter value
- * @param[in] max Maximum parameter value
+ * @param[in] value Best fitting parameter factor value.
+ * @param[in] error Parameter factor error.
+ * @param[in] limit Parameter factor limit of the search.
  *
- * Calculates the upper limit using a bisection method.
+ * @exception GException::invalid_value
+ *            Maximum number of iterations reached.
+ *
+ * Calculates the upper limit by finding the parameter factor value above
+ * the best fitting value where the log-likelihood increased by the
+ * log-likelihood difference that corresponds to the requested confidence
+ * level. The search starts from the estimate of the parabolic approximation
+ * of the log-likelihood using the parameter error, and the root is then
+ * determined using the Illinois variant of the regula falsi method (see
+ * ctlikelihood::profile_root). On return the model parameter is set to the
+ * upper limit.
  ***************************************************************************/
-void ctulimit::ulimit_bisection(const double& min, const double& max)
+void ctulimit::ulimit_root(const double& value,
+                           const double& error,
+                           const double& limit)
 {
-    // Copy values to working values
-    double wrk_min = min;
-    double wrk_max = max;
-
-    // Initialise iteration counter
-    int iter = 0;
-
-    // Loop until breaking condition is reached
-    while (true) {
-
-        // Log information
-        log_value(EXPLICIT, "Iteration "+gammalib::str(iter),
-                  "["+gammalib::str(wrk_min)+", "+gammalib::str(wrk_max)+"]");
-
-        // Throw exception if maximum iterations are reached
-        if (iter > m_max_iter) {
-            std::string msg = "The maximum number of "+gammalib::str(m_max_iter)+
-                              " has been reached. You may consider to increase"
-                              " the \"max_iter\" parameter and re-run ctulimit.";
-            throw GException::invalid_value(G_UL_BISECTION, msg);
-        }
-
-        // Compute center of boundary
-        double mid = (wrk_min + wrk_max) / 2.0;
-
-        // Calculate function value
-        double eval_mid = evaluate(*m_model_par, mid) - (m_best_logL + m_dlogL);
-
-        // Check for convergence inside tolerance
-        if (std::abs(eval_mid) < m_tol) {
-            break;
-        }
-        if (std::abs(wrk_max-wrk_min) < m_tol) {
-            break;
-        }
-
-        // Change boundaries for further iteration
-        if (eval_mid > 0.0) {
-            wrk_max = mid;     // logL too large, new range = [wrk_min, mid]
-        }
-        else {
-            wrk_min = mid;     // logL too small, new range = [mid, wrk_max]
-        }
-
-        // Increment counter
-        iter++;
+    // Compute parabolic estimate of upper limit
+    double guess = value + std::sqrt(2.0 * m_dlogL) * error;
+
+    // Find upper limit
+    int status = 0;
+    profile_root(m_obs, m_opt, *m_model_par, m_best_logL + m_dlogL, value,
+                 -m_dlogL, guess, limit, m_tol, m_tol, m_max_iter, status);
+
+    // Signal if the parameter limit has been reached
+    if (status == 1) {
+        std::string msg = "The upper limit of the parameter search range has "
+                          "been reached. You may consider to increase the "
+                          "\"sigma_max\" parameter and re-run ctulimit.";
+        log_string(TERSE, msg);
+    }
 
-    } // endwhile
+    // Throw an exception if the maximum number of iterations was reached
+    else if (status == 2) {
+        std::string msg = "The maximum number of "+gammalib::str(m_max_iter)+
+                          " has been reached. You may consider to increase"
+                          " the \"max_iter\" parameter and re-run ctulimit.";
+        throw GException::invalid_value(G_ULIMIT_ROOT, msg);
+    }
 
     // Return
     return;
-
 }
@@ -75,7 +75,9 @@ protected:
     void   free_members(void);
     void   get_parameters(void);
     void   get_model_parameter(void);
-    void   ulimit_bisection(const double& parmin, const double& parmax);
+    void   ulimit_root(const double& value,
+                       const double& error,
+                       const double& limit);
 
     // User parameters
     std::string   m_srcname;      //!< Name of source which is moved around
@@ -28,14 +28,27 @@
 #ifdef HAVE_CONFIG_H
 #include <config.h>
 #endif
+#include <cmath>
+#include <algorithm>
+#include <sstream>
+#include <iomanip>
 #include "ctlikelihood.hpp"
 
 /* __ Method name definitions ____________________________________________ */
-#define G_EVALUATE              "ctlikelihood::evaluate(GModelPar&, double&)"
+#define G_EVALUATE                 "ctlikelihood::evaluate(GObservations&, "\
+                                       "GOptimizerLM&, GModelPar&, double&)"
 
 /* __ Debug definitions __________________________________________________ */
 
 /* __ Coding definitions _________________________________________________ */
+#define G_PROFILE_CACHE_SIZE   1000  //!< Maximum number of cached profile points
+
+
+/* __ Static members _____________________________________________________ */
+std::vector<std::string>          ctlikelihood::m_profile_keys;
+std::vector<double>               ctlikelihood::m_profile_values;
+std::vector<double>               ctlikelihood::m_profile_logL;
+std::vector<std::vector<double> > ctlikelihood::m_profile_pars;
 
 
 /*==========================================================================
@@ -193,6 +206,47 @@ ctlikelihood& ctlikelihood::operator=(const ctlikelihood& app)
  =                                                                         =
  ==========================================================================*/
 
+/***********************************************************************//**
+ * @brief Clear likelihood profile cache
+ *
+ * Removes all points from the likelihood profile cache that is shared by
+ * all likelihood tools.
+ ***************************************************************************/
+void ctlikelihood::clear_profile_cache(void)
+{
+    // Clear cache
+    #pragma omp critical(ctlikelihood_profile_cache)
+    {
+        m_profile_keys.clear();
+        m_profile_values.clear();
+        m_profile_logL.clear();
+        m_profile_pars.clear();
+    }
+
+    // Return
+    return;
+}
+
+
+/***********************************************************************//**
+ * @brief Return number of points in likelihood profile cache
+ *
+ * @return Number of points in likelihood profile cache.
+ ***************************************************************************/
+int ctlikelihood::profile_cache_size(void)
+{
+    // Get cache size
+    int size = 0;
+    #pragma omp critical(ctlikelihood_profile_cache)
+    {
+        size = m_profile_keys.size();
+    }
+
+    // Return cache size
+    return size;
+}
+
+
 
 /*==========================================================================
  =                                                                         =
@@ -207,6 +261,7 @@ void ctlikelihood::init_members(void)
 {
     // Initialise members
     m_opt.clear();
+    m_use_cache = false;
 
     // Return
     return;
@@ -221,7 +276,8 @@ void ctlikelihood::init_members(void)
 void ctlikelihood::copy_members(const ctlikelihood& app)
 {
     // Copy members
-    m_opt = app.m_opt;
+    m_opt       = app.m_opt;
+    m_use_cache = app.m_use_cache;
 
     // Return
     return;
@@ -248,6 +304,44 @@ void ctlikelihood::free_members(void)
  * Evaluates the log-likelihood function at a given @p value.
  ***************************************************************************/
 double ctlikelihood::evaluate(GModelPar& par, const double& value)
+{
+    // Evaluate log-likelihood function using the observations and the
+    // optimizer of the tool
+    return (evaluate(m_obs, m_opt, par, value));
+}
+
+
+/***********************************************************************//**
+ * @brief Evaluates the log-likelihood function for observations
+ *
+ * @param[in,out] obs Observation container.
+ * @param[in,out] opt Optimizer.
+ * @param[in] par Model parameter of a model in @p obs
+ * @param[in] value Model parameter factor value
+ * @return Log-likelihood function
+ *
+ * @exception GException::invalid_value
+ *            Parameter value outside boundaries.
+ *
+ * Evaluates the log-likelihood function of the observation container
+ * @p obs at a given @p value by re-optimizing all other free parameters
+ * using the optimizer @p opt. Since the method only changes @p obs and
+ * @p opt it may be called in parallel for distinct observation containers
+ * and optimizers.
+ *
+ * If the likelihood profile cache is enabled (see m_use_cache), the
+ * log-likelihood values and the optimized model parameters are stored in a
+ * likelihood profile cache that is shared by all likelihood tools. If the
+ * log-likelihood was already evaluated for the same dataset, model
+ * parameter and @p value, the model parameters are set to the cached
+ * values and the cached log-likelihood is returned without optimization.
+ * Otherwise the optimization starts from the cached model parameters of
+ * the closest value, if available.
+ ***************************************************************************/
+double ctlikelihood::evaluate(GObservations& obs,
+                              GOptimizerLM&  opt,
+                              GModelPar&     par,
+                              const double&  value)
 {
     // Initialise log-likelihood value
     double logL = 0.0;
@@ -270,21 +364,491 @@ double ctlikelihood::evaluate(GModelPar& par, const double& value)
         throw GException::invalid_value(G_EVALUATE, msg);
     }
 
+    // Initialise cache search results
+    bool                hit = false;
+    std::string         key;
+    std::vector<double> pars;
+
+    // If the likelihood profile cache is enabled then search the cache for
+    // the closest value of the same dataset and parameter
+    if (m_use_cache) {
+
+        // Get likelihood profile cache key
+        key = profile_key(obs, par);
+
+        // Search cache
+        #pragma omp critical(ctlikelihood_profile_cache)
+        {
+            int    closest = -1;
+            double dist    = 0.0;
+            for (int i = 0; i < m_profile_keys.size(); ++i) {
+                if (m_profile_keys[i] == key) {
+                    double d = std::abs(m_profile_values[i] - value);
+                    if (closest == -1 || d < dist) {
+                        closest = i;
+                        dist    = d;
+                    }
+                }
+            }
+            if (closest != -1) {
+                pars = m_profile_pars[closest];
+                if (dist <= 1.0e-12 * std::max(1.0, std::abs(value))) {
+                    hit  = true;
+                    logL = m_profile_logL[closest];
+                }
+            }
+        }
+
+    } // endif: cache was enabled
+
+    // Start from cached model parameters
+    if (!pars.empty()) {
+        set_profile_pars(obs, pars);
+    }
+
     // Change parameter factor
     par.factor_value(value);
 
-    // Fix parameter
-    par.fix();
+    // If the value is not in the cache then compute the log-likelihood
+    if (!hit) {
+
+        // Fix parameter
+        par.fix();
+
+        // Re-optimize log-likelihood
+        obs.optimize(opt);
+
+        // Free parameter
+        par.free();
+
+        // Retrieve log-likelihood
+        logL = obs.logL();
+
+        // If the cache is enabled then store log-likelihood and model
+        // parameters in cache
+        if (m_use_cache) {
+            std::vector<double> fitted = profile_pars(obs);
+            #pragma omp critical(ctlikelihood_profile_cache)
+            {
+                if (m_profile_keys.size() >= G_PROFILE_CACHE_SIZE) {
+                    m_profile_keys.erase(m_profile_keys.begin());
+                    m_profile_values.erase(m_profile_values.begin());
+                    m_profile_logL.erase(m_profile_logL.begin());
+                    m_profile_pars.erase(m_profile_pars.begin());
+                }
+                m_profile_keys.push_back(key);
+                m_profile_values.push_back(value);
+                m_profile_logL.push_back(logL);
+                m_profile_pars.push_back(fitted);
+            }
+        }
+
+    } // endif: value was not in cache
+
+    // Return log-likelihood
+    return logL;
+}
+
+
+/***********************************************************************//**
+ * @brief Return likelihood profile cache key
+ *
+ * @param[in] obs Observation container.
+ * @param[in] par Model parameter of a model in @p obs.
+ * @return Likelihood profile cache key.
+ *
+ * Returns a key that identifies the dataset and the model parameter of a
+ * likelihood profile. The dataset is identified by the instrument,
+ * identifier, name, statistics, ontime, livetime, number of events, energy
+ * boundaries, Good Time Intervals, region of interest, event file, response
+ * and energy dispersion flag of all observations, by a hash of the content
+ * of the events or counts of all observations, and by the names, free
+ * parameters and fixed parameter values of all models. The model parameter
+ * is identified by its model name and parameter name.
+ *
+ * The content hash makes sure that datasets that agree in all their
+ * metadata, such as simulations with different seeds or event lists that
+ * were modified in memory, do not share likelihood profile points.
+ ***************************************************************************/
+std::string ctlikelihood::profile_key(const GObservations& obs,
+                                      const GModelPar&     par) const
+{
+    // Initialise key stream
+    std::ostringstream key;
+    key << std::setprecision(17);
+
+    // Add observations to key
+    for (int i = 0; i < obs.size(); ++i) {
+        const GObservation* o = obs[i];
+        key << "|" << o->instrument() << ":" << o->id() << ":" << o->name()
+            << ":" << o->statistics()
+            << "|" << o->ontime() << "|" << o->livetime();
+
+        // Add events, energy boundaries, Good Time Intervals and region of
+        // interest to key
+        if (o->events() != NULL) {
+            const GGti& gti = o->events()->gti();
+            key << "|" << o->events()->number() << "|" << o->events()->size()
+                << "|" << events_hash(o->events())
+                << "|" << o->events()->ebounds().print();
+            for (int k = 0; k < gti.size(); ++k) {
+                key << "|" << gti.tstart(k).secs() << "-" << gti.tstop(k).secs();
+            }
+            const GCTAEventList* list =
+                  dynamic_cast<const GCTAEventList*>(o->events());
+            if (list != NULL) {
+                key << "|" << list->roi().print();
+            }
+        }
+
+        // Add event file, response and energy dispersion flag of CTA
+        // observations to key
+        const GCTAObservation* cta = dynamic_cast<const GCTAObservation*>(o);
+        if (cta != NULL) {
+            key << "|" << cta->eventfile().url();
+            if (cta->response() != NULL) {
+                key << "|" << cta->response()->print()
+                    << "|" << cta->response()->apply_edisp();
+            }
+        }
+        else if (o->response() != NULL) {
+            key << "|" << o->response()->print();
+        }
+    }
 
-    // Re-optimize log-likelihood
-    m_obs.optimize(m_opt);
+    // Add models and profile parameter to key
+    const GModels& models = obs.models();
+    for (int i = 0; i < models.size(); ++i) {
+        const GModel* model = models[i];
+        key << "|" << model->classname() << ":" << model->name();
+        for (int k = 0; k < model->size(); ++k) {
+            const GModelPar& p = (*model)[k];
+            if (&p == &par) {
+                key << "|*" << p.name();
+            }
+            else if (p.is_free()) {
+                key << "|" << p.name();
+            }
+            else {
+                key << "|" << p.name() << "=" << p.factor_value();
+            }
+        }
+    }
 
-    // Free parameter
-    par.free();
+    // Return key
+    return (key.str());
+}
 
-    // Retrieve log-likelihood
-    logL = m_obs.logL();
 
-    // Return log-likelihood
-    return logL;
+/***********************************************************************//**
+ * @brief Return hash of events
+ *
+ * @param[in] events Events.
+ * @return Hexadecimal hash of the content of the events.
+ *
+ * Returns a 64-bit FNV-1a hash of the content of the events. For a CTA
+ * event list the hash covers the time, energy and sky direction of all
+ * events, for a CTA counts cube it covers the counts and weights of all
+ * bins, and for any other events it covers the time, energy and counts of
+ * all events.
+ ***************************************************************************/
+std::string ctlikelihood::events_hash(const GEvents* events) const
+{
+    // Initialise hash with FNV-1a offset basis
+    unsigned long long hash = 14695981039346656037ULL;
+
+    // Add content of CTA event list to hash
+    const GCTAEventList* list = dynamic_cast<const GCTAEventList*>(events);
+    const GCTAEventCube* cube = dynamic_cast<const GCTAEventCube*>(events);
+    if (list != NULL) {
+        for (int i = 0; i < list->size(); ++i) {
+            const GCTAEventAtom* event = (*list)[i];
+            const GSkyDir&       dir   = event->dir().dir();
+            add_to_hash(hash, event->time().secs());
+            add_to_hash(hash, event->energy().MeV());
+            add_to_hash(hash, dir.ra());
+            add_to_hash(hash, dir.dec());
+        }
+    }
+
+    // ... otherwise add content of CTA counts cube to hash
+    else if (cube != NULL) {
+        const GSkyMap& counts  = cube->counts();
+        const GSkyMap& weights = cube->weights();
+        for (int i = 0; i < counts.npix() * counts.nmaps(); ++i) {
+            add_to_hash(hash, counts.pixels()[i]);
+            add_to_hash(hash, weights.pixels()[i]);
+        }
+    }
+
+    // ... otherwise add generic content of events to hash
+    else if (events != NULL) {
+        for (int i = 0; i < events->size(); ++i) {
+            const GEvent* event = (*events)[i];
+            add_to_hash(hash, event->time().secs());
+            add_to_hash(hash, event->energy().MeV());
+            add_to_hash(hash, event->counts());
+        }
+    }
+
+    // Convert hash into hexadecimal string
+    std::ostringstream result;
+    result << std::hex << hash;
+
+    // Return hash
+    return (result.str());
+}
+
+
+/***********************************************************************//**
+ * @brief Add value to hash
+ *
+ * @param[in,out] hash 64-bit FNV-1a hash.
+ * @param[in] value Value.
+ *
+ * Adds all bytes of @p value to the 64-bit FNV-1a @p hash.
+ ***************************************************************************/
+void ctlikelihood::add_to_hash(unsigned long long& hash,
+                               const double&       value) const
+{
+    // Add bytes of value to hash
+    const unsigned char* bytes = reinterpret_cast<const unsigned char*>(&value);
+    for (int i = 0; i < sizeof(double); ++i) {
+        hash ^= bytes[i];
+        hash *= 1099511628211ULL;
+    }
+
+    // Return
+    return;
+}
+
+
+/***********************************************************************//**
+ * @brief Return model parameter factor values
+ *
+ * @param[in] obs Observation container.
+ * @return Factor values of all parameters of all models.
+ ***************************************************************************/
+std::vector<double> ctlikelihood::profile_pars(const GObservations& obs) const
+{
+    // Initialise factor values
+    std::vector<double> pars;
+
+    // Collect factor values
+    const GModels& models = obs.models();
+    for (int i = 0; i < models.size(); ++i) {
+        const GModel* model = models[i];
+        for (int k = 0; k < model->size(); ++k) {
+            pars.push_back((*model)[k].factor_value());
+        }
+    }
+
+    // Return factor values
+    return pars;
+}
+
+
+/***********************************************************************//**
+ * @brief Set model parameter factor values
+ *
+ * @param[in,out] obs Observation container.
+ * @param[in] pars Factor values of all parameters of all models.
+ *
+ * Sets the factor values of all parameters of all models in the
+ * observation container. The models are not replaced, hence references to
+ * model parameters stay valid.
+ ***************************************************************************/
+void ctlikelihood::set_profile_pars(GObservations&             obs,
+                                    const std::vector<double>& pars) const
+{
+    // Get models in observation container
+    GModels& models = const_cast<GModels&>(obs.models());
+
+    // Set factor values
+    int index = 0;
+    for (int i = 0; i < models.size(); ++i) {
+        GModel* model = models[i];
+        for (int k = 0; k < model->size() && index < pars.size(); ++k, ++index) {
+            (*model)[k].factor_value(pars[index]);
+        }
+    }
+
+    // Return
+    return;
+}
+
+
+/***********************************************************************//**
+ * @brief Find parameter value where the log-likelihood reaches a target
+ *
+ * @param[in,out] obs Observation container.
+ * @param[in,out] opt Optimizer.
+ * @param[in,out] par Model parameter of a model in @p obs.
+ * @param[in] target Target log-likelihood value.
+ * @param[in] x0 Parameter factor value where the log-likelihood is known.
+ * @param[in] f0 Log-likelihood minus target at @p x0 (must be negative).
+ * @param[in] guess Initial guess of the parameter factor value.
+ * @param[in] limit Parameter factor limit of the search.
+ * @param[in] tol Log-likelihood tolerance.
+ * @param[in] xtol Parameter factor tolerance.
+ * @param[in] max_iter Maximum number of log-likelihood evaluations.
+ * @param[out] status Status (0=converged, 1=limit reached, 2=maximum
+ *                    number of evaluations reached).
+ * @return Parameter factor value.
+ *
+ * Finds the parameter factor value between @p x0 and @p limit where the
+ * log-likelihood, re-optimised with respect to all other free parameters,
+ * reaches @p target. The log-likelihood minus @p target is assumed to be
+ * negative at @p x0 and to increase towards @p limit.
+ *
+ * The root is first bracketed by evaluating the log-likelihood at @p guess,
+ * which usually is the estimate from the parabolic approximation of the
+ * log-likelihood using the parameter error from the covariance matrix. If
+ * the log-likelihood at @p guess is still below the target, the distance
+ * to @p x0 is doubled until the root is bracketed or @p limit is reached.
+ * The root is then determined using the Illinois variant of the regula
+ * falsi method, which converges superlinearly while keeping the root
+ * bracketed.
+ *
+ * Since each evaluation leaves the other free parameters at their fitted
+ * values, each re-fit starts from the parameters of the previous
+ * evaluation. On return the parameter is set to the returned value. The
+ * method may be called in parallel for distinct observation containers
+ * and optimizers.
+ ***************************************************************************/
+double ctlikelihood::profile_root(GObservations& obs,
+                                  GOptimizerLM&  opt,
+                                  GModelPar&     par,
+                                  const double&  target,
+                                  const double&  x0,
+                                  const double&  f0,
+                                  const double&  guess,
+                                  const double&  limit,
+                                  const double&  tol,
+                                  const double&  xtol,
+                                  const int&     max_iter,
+                                  int&           status)
+{
+    // Initialise status and number of evaluations
+    status    = 0;
+    int neval = 0;
+
+    // Set initial bracket end from the guess. If the guess is not between
+    // x0 and the limit, use the limit or the middle of the search interval.
+    double b = guess;
+    if ((limit - x0) * (b - limit) > 0.0) {
+        b = limit;
+    }
+    if ((limit - x0) * (b - x0) <= 0.0) {
+        b = 0.5 * (x0 + limit);
+    }
+
+    // Evaluate function at initial bracket end
+    double a  = x0;
+    double fa = f0;
+    double fb = evaluate(obs, opt, par, b) - target;
+    neval++;
+
+    // Log evaluation
+    #pragma omp critical(ctlikelihood_profile_root)
+    log_value(EXPLICIT, "  Evaluation "+gammalib::str(neval),
+              gammalib::str(b)+" ("+gammalib::str(fb)+")");
+
+    // Expand bracket until the function becomes positive
+    while (fb < 0.0) {
+
+        // If the limit is reached then return the limit
+        if (b == limit) {
+            status = 1;
+            return b;
+        }
+
+        // If the maximum number of evaluations is reached then return
+        if (neval >= max_iter) {
+            status = 2;
+            return b;
+        }
+
+        // Move bracket and double its distance to x0
+        a  = b;
+        fa = fb;
+        b  = x0 + 2.0 * (b - x0);
+        if ((limit - x0) * (b - limit) > 0.0) {
+            b = limit;
+        }
+
+        // Evaluate function at new bracket end
+        fb = evaluate(obs, opt, par, b) - target;
+        neval++;
+
+        // Log evaluation
+        #pragma omp critical(ctlikelihood_profile_root)
+        log_value(EXPLICIT, "  Evaluation "+gammalib::str(neval),
+                  gammalib::str(b)+" ("+gammalib::str(fb)+")");
+
+    } // endwhile: expanded bracket
+
+    // Return if the bracket end is already within tolerance
+    if (std::abs(fb) < tol) {
+        return b;
+    }
+
+    // Initialise root and side of last bracket update
+    double x    = b;
+    int    side = 0;
+
+    // Illinois iterations
+    while (true) {
+
+        // Signal if the maximum number of evaluations is reached
+        if (neval >= max_iter) {
+            status = 2;
+            break;
+        }
+
+        // Compute regula falsi estimate
+        x = (a * fb - b * fa) / (fb - fa);
+
+        // Evaluate function
+        double fx = evaluate(obs, opt, par, x) - target;
+        neval++;
+
+        // Log evaluation
+        #pragma omp critical(ctlikelihood_profile_root)
+        log_value(EXPLICIT, "  Evaluation "+gammalib::str(neval),
+                  gammalib::str(x)+" ("+gammalib::str(fx)+")");
+
+        // Check for convergence
+        if (std::abs(fx) < tol) {
+            break;
+        }
+
+        // Update bracket. If the same bracket end is retained twice then
+        // halve its function value (Illinois modification).
+        if (fx > 0.0) {
+            b  = x;
+            fb = fx;
+            if (side == 1) {
+                fa *= 0.5;
+            }
+            side = 1;
+        }
+        else {
+            a  = x;
+            fa = fx;
+            if (side == -1) {
+                fb *= 0.5;
+            }
+            side = -1;
+        }
+
+        // Check for bracket convergence
+        if (std::abs(b - a) < xtol) {
+            break;
+        }
+
+    } // endwhile: Illinois iterations
+
+    // Return root
+    return x;
 }
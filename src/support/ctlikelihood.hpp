@@ -61,6 +61,10 @@ public:
     // Methods
     const GOptimizer* opt(void) const;
 
+    // Static methods
+    static void clear_profile_cache(void);
+    static int  profile_cache_size(void);
+
 #ifndef SWIG
 protected:
 #endif
@@ -72,9 +76,40 @@ protected:
     void   init_members(void);
     void   copy_members(const ctlikelihood& app);
     void   free_members(void);
+    double evaluate(GObservations& obs,
+                    GOptimizerLM&  opt,
+                    GModelPar&     par,
+                    const double&  value);
+    double profile_root(GObservations& obs,
+                        GOptimizerLM&  opt,
+                        GModelPar&     par,
+                        const double&  target,
+                        const double&  x0,
+                        const double&  f0,
+                        const double&  guess,
+                        const double&  limit,
+                        const double&  tol,
+                        const double&  xtol,
+                        const int&     max_iter,
+                        int&           status);
+    std::string         profile_key(const GObservations& obs,
+                                    const GModelPar&     par) const;
+    std::string         events_hash(const GEvents* events) const;
+    void                add_to_hash(unsigned long long& hash,
+                                    const double&       value) const;
+    std::vector<double> profile_pars(const GObservations& obs) const;
+    void                set_profile_pars(GObservations&             obs,
+                                         const std::vector<double>& pars) const;
 
     // Protected members
-    GOptimizerLM m_opt;   //!< Optimizer
+    GOptimizerLM m_opt;       //!< Optimizer
+    bool         m_use_cache; //!< Use likelihood profile cache
+
+    // Likelihood profile cache shared by all likelihood tools
+    static std::vector<std::string>          m_profile_keys;   //!< Dataset and parameter keys
+    static std::vector<double>               m_profile_values; //!< Parameter factor values
+    static std::vector<double>               m_profile_logL;   //!< Log-likelihood values
+    static std::vector<std::vector<double> > m_profile_pars;   //!< Model parameter factor values
 };
 
 
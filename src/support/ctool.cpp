@@ -31,6 +31,7 @@
 #include <cstdlib>         // std::getenv() function
 #include <cstdio>          // std::fopen(), etc. functions
 #include <clocale>         // std::setlocale function
+#include <algorithm>       // std::sort function
 #include "ctool.hpp"
 #include "GTools.hpp"
 
@@ -63,6 +64,11 @@
 
 /* __ Coding definitions _________________________________________________ */
 
+/* __ Constants __________________________________________________________ */
+const int    G_ROI_BLOCK_SIZE = 16;     //!< Pixel block size in x and y
+const int    G_ROI_CACHE_SIZE = 100;    //!< Maximum number of cached RoIs
+const double G_ROI_MARGIN     = 1.0e-6; //!< Block distance margin (deg)
+
 
 /*==========================================================================
  =                                                                         =
@@ -250,6 +256,14 @@ void ctool::init_members(void)
     m_read_ahead = false;
     m_use_xml    = false;
 
+    // Initialise RoI pixel cache members
+    m_roi_dirs.clear();
+    m_roi_bdirs.clear();
+    m_roi_bradii.clear();
+    m_roi_bpixels.clear();
+    m_roi_keys.clear();
+    m_roi_pixels.clear();
+
     // Set CTA time reference. G_CTA_MJDREF is the CTA reference MJD,
     // which is defined in GCTALib.hpp. This is somehow a kluge. We need
     // a better mechanism to implement the CTA reference MJD.
@@ -278,6 +292,14 @@ void ctool::copy_members(const ctool& app)
     m_use_xml    = app.m_use_xml;
     m_cta_ref    = app.m_cta_ref;
 
+    // Copy RoI pixel cache members
+    m_roi_dirs    = app.m_roi_dirs;
+    m_roi_bdirs   = app.m_roi_bdirs;
+    m_roi_bradii  = app.m_roi_bradii;
+    m_roi_bpixels = app.m_roi_bpixels;
+    m_roi_keys    = app.m_roi_keys;
+    m_roi_pixels  = app.m_roi_pixels;
+
     // Return
     return;
 }
@@ -1896,6 +1918,166 @@ std::vector<bool> ctool::cube_layer_usage(const GEbounds& cube_ebounds,
 }
 
 
+/***********************************************************************//**
+ * @brief Set sky map for RoI pixel determination
+ *
+ * @param[in] map Sky map.
+ *
+ * Sets the sky map for which the pixels within a Region of Interest are
+ * determined by the roi_pixels() method. The sky directions of all map
+ * pixels are cached, and the pixels are grouped into square blocks for
+ * which the block centre and the maximum angular distance of the block
+ * pixels from the block centre are stored. Any RoI pixels that were
+ * cached for a previous sky map are removed.
+ ***************************************************************************/
+void ctool::set_roi_map(const GSkyMap& map)
+{
+    // Clear RoI pixel cache
+    m_roi_dirs.clear();
+    m_roi_bdirs.clear();
+    m_roi_bradii.clear();
+    m_roi_bpixels.clear();
+    m_roi_keys.clear();
+    m_roi_pixels.clear();
+
+    // Get map dimensions
+    int npix = map.npix();
+    int nx   = map.nx();
+    int ny   = map.ny();
+
+    // Cache sky directions of map pixels
+    m_roi_dirs.resize(npix);
+    for (int pix = 0; pix < npix; ++pix) {
+        m_roi_dirs[pix] = map.inx2dir(pix);
+        m_roi_dirs[pix].radec(m_roi_dirs[pix].ra(), m_roi_dirs[pix].dec());
+    }
+
+    // Group pixels into blocks
+    for (int y0 = 0; y0 < ny; y0 += G_ROI_BLOCK_SIZE) {
+        for (int x0 = 0; x0 < nx; x0 += G_ROI_BLOCK_SIZE) {
+
+            // Get block boundaries
+            int x1 = (x0 + G_ROI_BLOCK_SIZE < nx) ? x0 + G_ROI_BLOCK_SIZE : nx;
+            int y1 = (y0 + G_ROI_BLOCK_SIZE < ny) ? y0 + G_ROI_BLOCK_SIZE : ny;
+
+            // Set block centre to the direction of the central block pixel
+            GSkyDir centre = m_roi_dirs[(x0 + x1) / 2 + ((y0 + y1) / 2) * nx];
+
+            // Collect block pixels and determine the block radius
+            std::vector<int> pixels;
+            double           radius = 0.0;
+            for (int y = y0; y < y1; ++y) {
+                for (int x = x0; x < x1; ++x) {
+                    int    pix  = x + y * nx;
+                    double dist = centre.dist_deg(m_roi_dirs[pix]);
+                    if (dist > radius) {
+                        radius = dist;
+                    }
+                    pixels.push_back(pix);
+                }
+            }
+
+            // Append block
+            m_roi_bdirs.push_back(centre);
+            m_roi_bradii.push_back(radius);
+            m_roi_bpixels.push_back(pixels);
+
+        } // endfor: looped over x blocks
+    } // endfor: looped over y blocks
+
+    // Return
+    return;
+}
+
+
+/***********************************************************************//**
+ * @brief Return map pixels within Region of Interest
+ *
+ * @param[in] roi Region of Interest.
+ * @return Vector of pixel indices within Region of Interest.
+ *
+ * Returns the indices of all pixels of the sky map that was set using
+ * set_roi_map() which are within the Region of Interest. Pixel blocks that
+ * are fully outside the Region of Interest are skipped, and pixel blocks
+ * that are fully inside the Region of Interest are taken entirely, so that
+ * only the pixels of blocks on the RoI boundary need to be tested. The
+ * computing time hence scales with the area of the Region of Interest.
+ *
+ * The pixel indices are cached for each RoI centre and radius, so that
+ * observations sharing the same Region of Interest do not need to repeat
+ * the computation. The pixel indices are returned in ascending order.
+ ***************************************************************************/
+std::vector<int> ctool::roi_pixels(const GCTARoi& roi)
+{
+    // Initialise pixel indices
+    std::vector<int> pixels;
+    bool             found = false;
+
+    // Get RoI centre and radius
+    GSkyDir centre = roi.centre().dir();
+    double  radius = roi.radius();
+
+    // Search RoI in cache
+    #pragma omp critical(ctool_roi_pixels)
+    {
+        for (int i = 0; i < m_roi_keys.size(); ++i) {
+            if ((m_roi_keys[i].radius() == radius) &&
+                (m_roi_keys[i].centre().dir() == centre)) {
+                pixels = m_roi_pixels[i];
+                found  = true;
+                break;
+            }
+        }
+    }
+
+    // If RoI was not found then determine pixels within RoI
+    if (!found) {
+
+        // Loop over pixel blocks
+        for (int i = 0; i < m_roi_bdirs.size(); ++i) {
+
+            // Skip block if it is fully outside the RoI
+            double dist = centre.dist_deg(m_roi_bdirs[i]);
+            if (dist > radius + m_roi_bradii[i] + G_ROI_MARGIN) {
+                continue;
+            }
+
+            // Determine whether block is fully inside the RoI
+            bool inside = (dist + m_roi_bradii[i] < radius - G_ROI_MARGIN);
+
+            // Append block pixels that are within the RoI
+            const std::vector<int>& block = m_roi_bpixels[i];
+            for (int k = 0; k < block.size(); ++k) {
+                if (inside ||
+                    centre.dist_deg(m_roi_dirs[block[k]]) <= radius) {
+                    pixels.push_back(block[k]);
+                }
+            }
+
+        } // endfor: looped over pixel blocks
+
+        // Sort pixel indices
+        std::sort(pixels.begin(), pixels.end());
+
+        // Put pixel indices in cache, removing the oldest cache entry if
+        // the cache is full
+        #pragma omp critical(ctool_roi_pixels)
+        {
+            if (m_roi_keys.size() >= G_ROI_CACHE_SIZE) {
+                m_roi_keys.erase(m_roi_keys.begin());
+                m_roi_pixels.erase(m_roi_pixels.begin());
+            }
+            m_roi_keys.push_back(roi);
+            m_roi_pixels.push_back(pixels);
+        }
+
+    } // endif: RoI was not found
+
+    // Return pixel indices
+    return pixels;
+}
+
+
 /***********************************************************************//**
  * @brief Save event list into FITS file
  *
@@ -128,6 +128,8 @@ protected:
                                                const GCTAObservation& obs);
     std::vector<bool> cube_layer_usage(const GEbounds& cube_ebounds,
                                        const GEbounds& list_ebounds) const;
+    void              set_roi_map(const GSkyMap& map);
+    std::vector<int>  roi_pixels(const GCTARoi& roi);
     bool              is_valid_filename(const GFilename& filename) const;
     std::string       get_gtiname(const std::string& filename,
                                   const std::string& evtname) const;
@@ -151,6 +153,14 @@ protected:
     // Protected members
     bool            m_use_xml;  //!< Use XML file instead of FITS file for observations
     GTimeReference  m_cta_ref;  //!< CTA time reference
+
+    // RoI pixel cache members
+    std::vector<GSkyDir>           m_roi_dirs;    //!< Map pixel directions
+    std::vector<GSkyDir>           m_roi_bdirs;   //!< Pixel block centres
+    std::vector<double>            m_roi_bradii;  //!< Pixel block radii (deg)
+    std::vector<std::vector<int> > m_roi_bpixels; //!< Pixel indices of blocks
+    std::vector<GCTARoi>           m_roi_keys;    //!< Cached RoIs
+    std::vector<std::vector<int> > m_roi_pixels;  //!< Pixel indices of RoIs
 };
 
 
@@ -139,6 +139,39 @@ class Test(test):
         # Check light curve
         self._check_light_curve('cslightcrv_py1.fits', 3)
 
+        # Get prefactors of the light curve with a free background model
+        table = lcrv.lightcurve()['LIGHTCURVE']
+        free  = [table['Prefactor'][i] for i in range(table.nrows())]
+
+        # Now fix the background model parameters and check that this changes
+        # the fitted prefactor in each time bin
+        lcrv = cscripts.cslightcrv()
+        lcrv['inobs']    = self._events
+        lcrv['inmodel']  = self._model
+        lcrv['srcname']  = 'Crab'
+        lcrv['caldb']    = self._caldb
+        lcrv['irf']      = self._irf
+        lcrv['tbinalg']  = 'LIN'
+        lcrv['tmin']     = 'MJD 51544.50'
+        lcrv['tmax']     = 'MJD 51544.53'
+        lcrv['tbins']    = 3
+        lcrv['enumbins'] = 0
+        lcrv['emin']     = 0.1
+        lcrv['emax']     = 100.0
+        lcrv['fix_bkg']  = True
+        lcrv['outfile']  = 'cslightcrv_py5.fits'
+        lcrv['logfile']  = 'cslightcrv_py5.log'
+        lcrv['chatter']  = 2
+
+        # Run cslightcrv script and check that the prefactors differ
+        lcrv.logFileOpen()
+        lcrv.run()
+        table = lcrv.lightcurve()['LIGHTCURVE']
+        for i in range(table.nrows()):
+            self.test_assert(table['Prefactor'][i] != free[i],
+                 'Check that fixing the background changes the fit in '
+                 'time bin %d' % i)
+
         # Now use FILE as time bin algorithm. For this we need first to
         # create an ASCII file. We use now 6 time bins. The ASCII file
         # is saved into the file "lightcurve_py2.dat".
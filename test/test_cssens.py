@@ -157,6 +157,84 @@ class Test(test):
         # Check pull distribution file
         self._check_result_file('cssens_py2.dat')
 
+        # Set-up cssens with cached background simulation
+        sens = cscripts.cssens()
+        sens['inobs']    = 'NONE'
+        sens['inmodel']  = self._model
+        sens['srcname']  = 'Crab'
+        sens['caldb']    = self._caldb
+        sens['irf']      = self._irf
+        sens['outfile']  = 'cssens_py3.dat'
+        sens['duration'] = 1800.0
+        sens['rad']      = 3.0
+        sens['emin']     = 1.0
+        sens['emax']     = 10.0
+        sens['bins']     = 1
+        sens['bkgcache'] = True
+        sens['logfile']  = 'cssens_py3.log'
+        sens['chatter']  = 4
+
+        # Execute cssens script
+        sens.execute()
+
+        # Check sensitivity file
+        self._check_result_file('cssens_py3.dat')
+
+        # Set-up cssens without cached background simulation using the same
+        # seeds
+        sens = cscripts.cssens()
+        sens['inobs']    = 'NONE'
+        sens['inmodel']  = self._model
+        sens['srcname']  = 'Crab'
+        sens['caldb']    = self._caldb
+        sens['irf']      = self._irf
+        sens['outfile']  = 'cssens_py5.dat'
+        sens['duration'] = 1800.0
+        sens['rad']      = 3.0
+        sens['emin']     = 1.0
+        sens['emax']     = 10.0
+        sens['bins']     = 1
+        sens['bkgcache'] = False
+        sens['logfile']  = 'cssens_py5.log'
+        sens['chatter']  = 4
+
+        # Execute cssens script
+        sens.execute()
+
+        # Check that the sensitivity with cached background simulation is
+        # consistent with the sensitivity without cached background. Since
+        # the background events are drawn from a different random number
+        # sequence the sensitivities are only equal within statistical
+        # fluctuations.
+        self._check_result_file('cssens_py5.dat')
+        self._check_same_sensitivity('cssens_py3.dat', 'cssens_py5.dat')
+
+        # Set-up cssens for Asimov sensitivity computation
+        sens = cscripts.cssens()
+        sens['inobs']    = 'NONE'
+        sens['inmodel']  = self._model
+        sens['srcname']  = 'Crab'
+        sens['caldb']    = self._caldb
+        sens['irf']      = self._irf
+        sens['outfile']  = 'cssens_py4.dat'
+        sens['duration'] = 1800.0
+        sens['rad']      = 3.0
+        sens['emin']     = 1.0
+        sens['emax']     = 10.0
+        sens['bins']     = 1
+        sens['enumbins'] = 5
+        sens['npix']     = 60
+        sens['binsz']    = 0.1
+        sens['method']   = 'ASIMOV'
+        sens['logfile']  = 'cssens_py4.log'
+        sens['chatter']  = 4
+
+        # Execute cssens script
+        sens.execute()
+
+        # Check sensitivity file
+        self._check_result_file('cssens_py4.dat')
+
         # Return
         return
 
@@ -176,3 +254,23 @@ class Test(test):
 
         # Return
         return
+
+    # Check that two result files have the same sensitivity
+    def _check_same_sensitivity(self, filename1, filename2):
+        """
+        Check that two result files have the same sensitivity within 30%
+        """
+        # Open result files as CSV files
+        results1 = gammalib.GCsv(filename1, ',')
+        results2 = gammalib.GCsv(filename2, ',')
+
+        # Get sensitivities in Crab units
+        crab1 = results1.real(1, 3)
+        crab2 = results2.real(1, 3)
+
+        # Check sensitivities
+        self.test_value(crab1, crab2, 0.3*crab2,
+             'Check that sensitivities are equal within 30%')
+
+        # Return
+        return
@@ -141,11 +141,64 @@ class Test(test):
         # Check pull distribution file
         self._check_result_file('cstsdist_py1.dat')
 
+        # Set-up cstsdist with two processes
+        tsdist = cscripts.cstsdist()
+        tsdist['inmodel']  = self._model
+        tsdist['srcname']  = 'Crab'
+        tsdist['caldb']    = self._caldb
+        tsdist['irf']      = self._irf
+        tsdist['ntrials']  = 2
+        tsdist['ra']       = 83.63
+        tsdist['dec']      = 22.01
+        tsdist['emin']     = 0.1
+        tsdist['emax']     = 100.0
+        tsdist['enumbins'] = 0
+        tsdist['tmin']     = 0.0
+        tsdist['tmax']     = 1800.0
+        tsdist['rad']      = 5.0
+        tsdist['nthreads'] = 2
+        tsdist['outfile']  = 'cstsdist_py2.dat'
+        tsdist['logfile']  = 'cstsdist_py2.log'
+        tsdist['chatter']  = 3
+
+        # Execute cstsdist script
+        tsdist.execute()
+
+        # Check TS distribution file
+        self._check_result_file('cstsdist_py2.dat', nrows=3)
+
+        # Resume cstsdist with one more trial
+        tsdist['ntrials']  = 3
+        tsdist['resume']   = True
+        tsdist['logfile']  = 'cstsdist_py3.log'
+
+        # Execute cstsdist script
+        tsdist.execute()
+
+        # Check TS distribution file
+        self._check_result_file('cstsdist_py2.dat', nrows=4)
+
+        # Write TS distribution into FITS file
+        tsdist['ntrials']  = 2
+        tsdist['resume']   = False
+        tsdist['outfile']  = 'cstsdist_py4.fits'
+        tsdist['logfile']  = 'cstsdist_py4.log'
+
+        # Execute cstsdist script
+        tsdist.execute()
+
+        # Check TS distribution FITS file
+        fits  = gammalib.GFits('cstsdist_py4.fits')
+        table = fits.table('RESULTS')
+        self.test_value(table.nrows(), 2, 'Check rows in TS FITS file')
+        self.test_value(table.ncols(), 11, 'Check columns in TS FITS file')
+        fits.close()
+
         # Return
         return
 
     # Check result file
-    def _check_result_file(self, filename, ncols=11):
+    def _check_result_file(self, filename, ncols=11, nrows=2):
         """
         Check result file
 
@@ -155,12 +208,14 @@ class Test(test):
             Name of result file
         ncols : int, optional
             Required number of columns
+        nrows : int, optional
+            Required number of rows
         """
         # Open result file as CSV file
         results = gammalib.GCsv(filename, ',')
 
         # Check dimensions
-        self.test_value(results.nrows(), 2,     'Check rows in TS file')
+        self.test_value(results.nrows(), nrows, 'Check rows in TS file')
         self.test_value(results.ncols(), ncols, 'Check columns in TS file')
 
         # Return
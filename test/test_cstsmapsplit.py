@@ -19,6 +19,7 @@
 #
 # ==========================================================================
 import gammalib
+import ctools
 import cscripts
 from testing import test
 
@@ -179,6 +180,64 @@ class Test(test):
         # Check command file
         self._check_cmdfile('cstsmapsplit_py3.dat')
 
+        # Execute jobs and merge the TS maps
+        tsmapsplit['nxpix']    = 3
+        tsmapsplit['nypix']    = 3
+        tsmapsplit['outmap']   = 'cstsmapsplit_py4.fits'
+        tsmapsplit['outfile']  = 'cstsmapsplit_py4.dat'
+        tsmapsplit['logfile']  = 'cstsmapsplit_py4.log'
+        tsmapsplit['chatter']  = 2
+        tsmapsplit['run_jobs'] = True
+        tsmapsplit['nthreads'] = 2
+        tsmapsplit.execute()
+
+        # Check command file, merged TS map and job state file
+        self._check_cmdfile('cstsmapsplit_py4.dat')
+        self._check_cmdfile('cstsmapsplit_py4.fits')
+        lines = open('cstsmapsplit_py4_jobs.dat').read().splitlines()
+        self.test_value(len(lines), 2, 'Check number of recorded jobs')
+
+        # Execute jobs again and check that no job was executed again
+        tsmapsplit.execute()
+        lines = open('cstsmapsplit_py4_jobs.dat').read().splitlines()
+        self.test_value(len(lines), 2, 'Check that finished jobs are skipped')
+
+        # Compute the same TS map directly using cttsmap
+        tsmap = ctools.cttsmap()
+        tsmap['inobs']    = self._events
+        tsmap['inmodel']  = self._model
+        tsmap['srcname']  = 'Crab'
+        tsmap['caldb']    = self._caldb
+        tsmap['irf']      = self._irf
+        tsmap['outmap']   = 'cstsmapsplit_py5.fits'
+        tsmap['nxpix']    = 3
+        tsmap['nypix']    = 3
+        tsmap['binsz']    = 0.05
+        tsmap['coordsys'] = 'CEL'
+        tsmap['xref']     = 83.6331
+        tsmap['yref']     = 22.01
+        tsmap['proj']     = 'CAR'
+        tsmap['logfile']  = 'cstsmapsplit_py5.log'
+        tsmap['chatter']  = 2
+        tsmap.execute()
+
+        # Check that the merged TS values are the ones of the direct run
+        merged = gammalib.GSkyMap('cstsmapsplit_py4.fits')
+        direct = gammalib.GSkyMap('cstsmapsplit_py5.fits')
+        self.test_value(merged.npix(), direct.npix(),
+                        'Check number of TS map pixels')
+        for i in range(direct.npix()):
+            self.test_value(merged[i], direct[i], 1.0e-3,
+                            'Check TS value of pixel %d' % i)
+
+        # Change the number of bins per job and check that the jobs with a
+        # different job definition are executed again
+        tsmapsplit['bins_per_job'] = 4
+        tsmapsplit.execute()
+        lines = open('cstsmapsplit_py4_jobs.dat').read().splitlines()
+        self.test_value(len(lines), 5,
+                        'Check that jobs with changed definition are executed')
+
         # Return
         return
 
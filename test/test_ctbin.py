@@ -264,6 +264,22 @@ class Test(test):
         evt = gammalib.GCTAEventCube('ctbin_py4.fits')
         self._check_cube(evt, 5542)
 
+        # Append events to existing counts cube
+        bin = ctools.ctbin()
+        bin['inobs']   = self._events
+        bin['incube']  = 'ctbin_py1.fits'
+        bin['outcube'] = 'ctbin_py5.fits'
+        bin['logfile'] = 'ctbin_py5.log'
+        bin['chatter'] = 2
+        bin.logFileOpen()
+        bin.execute()
+
+        # Check content of observation and cube (need multiplier=2 since
+        # the events were appended to a counts cube holding the same events)
+        self._check_observation(bin, 5542, multiplier=2)
+        evt = gammalib.GCTAEventCube('ctbin_py5.fits')
+        self._check_cube(evt, 5542, multiplier=2)
+
         # Return
         return
 
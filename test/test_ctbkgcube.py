@@ -21,6 +21,7 @@
 import os
 import gammalib
 import ctools
+from cscripts import obsutils
 from testing import test
 
 
@@ -53,6 +54,8 @@ class Test(test):
         # Append tests
         self.append(self._test_cmd, 'Test ctbkgcube on command line')
         self.append(self._test_python, 'Test ctbkgcube from Python')
+        self.append(self._test_stacked_response,
+                    'Test obsutils.get_stacked_response() against ctools')
 
         # Return
         return
@@ -252,6 +255,114 @@ class Test(test):
         # Return
         return
 
+    # Test obsutils.get_stacked_response() against ctools
+    def _test_stacked_response(self):
+        """
+        Test that obsutils.get_stacked_response() reproduces the response
+        cubes and models of ctexpcube, ctpsfcube and ctbkgcube
+        """
+        # Set-up observation container
+        cta = gammalib.GCTAObservation(self._events)
+        cta.response(self._irf, gammalib.GCaldb('cta', self._caldb))
+        obs = gammalib.GObservations()
+        obs.append(cta)
+        obs.models(self._model)
+
+        # Get stacked response using the pointing for the cube centre and
+        # inserting the event list energy boundaries. At least 30 energy
+        # bins per decade are used.
+        response = obsutils.get_stacked_response(obs, None, None, binsz=0.4,
+                                                 nxpix=10, nypix=10,
+                                                 emin=0.1, emax=100.0,
+                                                 enumbins=20, coordsys='CEL',
+                                                 proj='CAR', addbounds=True)
+
+        # Compute response cubes and models using the ctools
+        cubes = {}
+        for name, tool, binsz, npix in \
+            [('expcube', ctools.ctexpcube(obs), 0.4, 10),
+             ('psfcube', ctools.ctpsfcube(obs), 4.0, 2),
+             ('bkgcube', ctools.ctbkgcube(obs), 0.4, 10)]:
+            tool['incube']    = 'NONE'
+            tool['caldb']     = self._caldb
+            tool['irf']       = self._irf
+            tool['ebinalg']   = 'LOG'
+            tool['emin']      = 0.1
+            tool['emax']      = 100.0
+            tool['enumbins']  = 90
+            tool['nxpix']     = npix
+            tool['nypix']     = npix
+            tool['binsz']     = binsz
+            tool['coordsys']  = 'CEL'
+            tool['proj']      = 'CAR'
+            tool['usepnt']    = True
+            tool['addbounds'] = True
+            tool['outcube']   = 'ctbkgcube_py6_%s.fits' % name
+            tool['logfile']   = 'ctbkgcube_py6_%s.log' % name
+            tool['chatter']   = 2
+            if name == 'bkgcube':
+                tool['outmodel'] = 'ctbkgcube_py6.xml'
+            tool.logFileOpen()
+            tool.run()
+            cubes[name] = tool
+
+        # Check response cubes
+        self._check_same_map(response['expcube'].cube(),
+                             cubes['expcube'].expcube().cube(), 'exposure')
+        self._check_same_map(response['psfcube'].cube(),
+                             cubes['psfcube'].psfcube().cube(), 'PSF')
+        self._check_same_map(response['bkgcube'].cube(),
+                             cubes['bkgcube'].bkgcube().cube(), 'background')
+
+        # Check models
+        models = cubes['bkgcube'].models()
+        self.test_value(response['models'].size(), models.size(),
+             'Check number of models')
+        for i in range(models.size()):
+            self.test_value(response['models'][i].name(), models[i].name(),
+                 'Check name of model %d' % i)
+            self.test_value(response['models'][i].classname(),
+                 models[i].classname(), 'Check class of model %d' % i)
+
+        # Return
+        return
+
+    # Check that two sky maps are identical
+    def _check_same_map(self, map, ref, name):
+        """
+        Check that two sky maps are identical
+
+        Parameters
+        ----------
+        map : `~gammalib.GSkyMap`
+            Sky map
+        ref : `~gammalib.GSkyMap`
+            Reference sky map
+        name : str
+            Name of sky map
+        """
+        # Check dimensions
+        self.test_value(map.npix(), ref.npix(),
+             'Check number of pixels of %s cube' % name)
+        self.test_value(map.nmaps(), ref.nmaps(),
+             'Check number of maps of %s cube' % name)
+
+        # Determine maximum relative difference
+        diff = 0.0
+        for k in range(ref.nmaps()):
+            for i in range(ref.npix()):
+                if ref[i,k] != 0.0:
+                    diff = max(diff, abs(map[i,k] / ref[i,k] - 1.0))
+                else:
+                    diff = max(diff, abs(map[i,k]))
+
+        # Check pixel values
+        self.test_value(diff, 0.0, 1.0e-6,
+             'Check pixel values of %s cube' % name)
+
+        # Return
+        return
+
     # Check result files
     def _check_result_files(self, filename, nenergies=21, nmodels=2):
         """
@@ -186,6 +186,16 @@ class Test(test):
         # Check result file
         self._check_result_file('cterror_py3.xml')
 
+        # Execute cterror tool with two threads
+        error['nthreads'] = 2
+        error['outmodel'] = 'cterror_py5.xml'
+        error['logfile']  = 'cterror_py5.log'
+        error.logFileOpen()   # Make sure we get a log file
+        error.execute()
+
+        # Check result file
+        self._check_result_file('cterror_py5.xml')
+
         # And now a run with not enough iterations
         error['max_iter'] = 1
         error['outmodel'] = 'cterror_py4.xml'
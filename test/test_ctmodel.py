@@ -53,6 +53,7 @@ class Test(test):
         # Append tests
         self.append(self._test_cmd, 'Test ctmodel on command line')
         self.append(self._test_python, 'Test ctmodel from Python')
+        self.append(self._test_threads, 'Test ctmodel with multiple threads')
 
         # Return
         return
@@ -219,6 +220,99 @@ class Test(test):
         # Publish with name
         model.publish('My model')
 
+        # Set up binned observation container
+        cta = gammalib.GCTAObservation(self._cntcube)
+        cta.response(self._irf, gammalib.GCaldb('cta', self._caldb))
+        obs = gammalib.GObservations()
+        obs.append(cta)
+        models = gammalib.GModels(self._model)
+        obs.models(models)
+
+        # Run ctmodel tool with model component cache
+        model = ctools.ctmodel(obs)
+        model['cache']   = True
+        model['logfile'] = 'ctmodel_py4.log'
+        model['chatter'] = 3
+        model.logFileOpen()
+        model.run()
+
+        # Double the Crab prefactor and run ctmodel tool again, which now
+        # rescales the cached model components
+        models['Crab']['Prefactor'].value(2.0 *
+                                          models['Crab']['Prefactor'].value())
+        model.models(models)
+        model.run()
+        cached = model.cube().number()
+
+        # Compute the same model cube without cache
+        obs.models(models)
+        model = ctools.ctmodel(obs)
+        model['logfile'] = 'ctmodel_py5.log'
+        model['chatter'] = 3
+        model.logFileOpen()
+        model.run()
+
+        # Check that the cached model cube is the same
+        self.test_value(cached, model.cube().number(), 1.0e-3,
+                        'Check number of events in cached model cube')
+
+        # Return
+        return
+
+    # Test ctmodel with multiple threads
+    def _test_threads(self):
+        """
+        Test ctmodel with multiple threads for an extended source model
+        """
+        # Compute model cubes using one and four threads
+        cubes = []
+        for nthreads in [1, 4]:
+            model = ctools.ctmodel()
+            model['incube']   = 'NONE'
+            model['inmodel']  = self._datadir + '/disk.xml'
+            model['inobs']    = 'NONE'
+            model['expcube']  = 'NONE'
+            model['psfcube']  = 'NONE'
+            model['bkgcube']  = 'NONE'
+            model['caldb']    = self._caldb
+            model['irf']      = self._irf
+            model['rad']      = 5
+            model['ra']       = 83.63
+            model['dec']      = 22.01
+            model['tmin']     = 0
+            model['tmax']     = 1800
+            model['emin']     = 0.1
+            model['emax']     = 100.0
+            model['enumbins'] = 10
+            model['nxpix']    = 40
+            model['nypix']    = 40
+            model['binsz']    = 0.1
+            model['coordsys'] = 'CEL'
+            model['proj']     = 'CAR'
+            model['xref']     = 83.63
+            model['yref']     = 22.01
+            model['nthreads'] = nthreads
+            model['outcube']  = 'ctmodel_py%d_threads.fits' % nthreads
+            model['logfile']  = 'ctmodel_py%d_threads.log' % nthreads
+            model['chatter']  = 2
+            model.logFileOpen()
+            model.run()
+            cubes.append(model.cube().copy())
+
+        # Check that the model cubes are identical
+        counts_serial   = cubes[0].counts()
+        counts_parallel = cubes[1].counts()
+        num_diff        = 0
+        for i in range(counts_serial.npix()):
+            for k in range(counts_serial.nmaps()):
+                if counts_serial[i,k] != counts_parallel[i,k]:
+                    num_diff += 1
+        self.test_value(num_diff, 0,
+             'Check that model cubes computed with one and four threads '
+             'are identical')
+        self.test_value(cubes[1].number(), cubes[0].number(), 1.0e-6,
+             'Check number of events in model cube')
+
         # Return
         return
 
@@ -235,6 +235,92 @@ class Test(test):
         self._test_list(obs[2].events(), 6092)
         self._test_list(obs[3].events(), 6192)
 
+        # Simulate a 3 hour observation with the time and energy intervals
+        # distributed over one and over four threads, and a second time over
+        # four threads
+        events = []
+        for nthreads in [1, 4, 4]:
+            sim = ctools.ctobssim()
+            sim['inmodel']   = self._model
+            sim['caldb']     = self._caldb
+            sim['irf']       = self._irf
+            sim['ra']        = 83.63
+            sim['dec']       = 22.01
+            sim['rad']       = 5.0
+            sim['tmin']      = '2020-01-01T00:00:00'
+            sim['tmax']      = '2020-01-01T03:00:00'
+            sim['emin']      = 1.0
+            sim['emax']      = 100.0
+            sim['nthreads']  = nthreads
+            sim['splitobs']  = True
+            sim['outevents'] = 'ctobssim_py4.fits'
+            sim['logfile']   = 'ctobssim_py4.log'
+            sim['chatter']   = 2
+            sim.logFileOpen()
+            sim.run()
+            events.append(self._event_table(sim.obs()[0].events()))
+
+        # Check that the event identifiers are unique and consecutive after
+        # the merging of the intervals
+        ids = [row[0] for row in events[1]]
+        self.test_assert(ids == list(range(1, len(ids)+1)),
+                         'Check that event identifiers are consecutive')
+
+        # Check that the simulated events are reproducible for a given seed
+        # and number of threads, and that they do not depend on the number
+        # of threads
+        self.test_assert(events[1] == events[2],
+                         'Check that simulation is reproducible')
+        self.test_assert(events[0] == events[1],
+                         'Check that simulation is independent of threads')
+
+        # Execute ctobssim with streaming of events in chunks of 1000 events
+        sim = ctools.ctobssim()
+        sim['inmodel']   = self._model
+        sim['caldb']     = self._caldb
+        sim['irf']       = self._irf
+        sim['ra']        = 83.63
+        sim['dec']       = 22.01
+        sim['rad']       = 5.0
+        sim['tmin']      = '2020-01-01T00:00:00'
+        sim['tmax']      = '2020-01-01T01:00:00'
+        sim['emin']      = 0.1
+        sim['emax']      = 100.0
+        sim['chunksize'] = 1000
+        sim['outevents'] = 'ctobssim_py5.fits'
+        sim['logfile']   = 'ctobssim_py5.log'
+        sim['chatter']   = 2
+        sim.logFileOpen()
+        sim.execute()
+
+        # Check that the streamed event list contains all events
+        evt = gammalib.GCTAEventList('ctobssim_py5.fits')
+        self.test_assert(evt.size() > 1000,
+             'Check that streamed event list contains several chunks')
+        self.test_value(evt.size(), evt.number(),
+             'Check number of events in streamed event list')
+
+        # Set-up binned observation from counts cube
+        cta = gammalib.GCTAObservation(self._cntcube)
+        cta.response(self._irf, gammalib.GCaldb('cta', self._caldb))
+        obs = gammalib.GObservations()
+        obs.append(cta)
+
+        # Simulate counts cube directly from model
+        sim = ctools.ctobssim(obs)
+        sim['inmodel'] = self._model
+        sim['logfile'] = 'ctobssim_py6.log'
+        sim['chatter'] = 2
+        sim.logFileOpen()
+        sim.run()
+
+        # Check that the counts cube was simulated
+        cube = sim.obs()[0].events()
+        self.test_assert(cube.number() > 0,
+             'Check that counts cube contains simulated counts')
+        self.test_value(cube.size(), cta.events().size(),
+             'Check that counts cube geometry is preserved')
+
         # Return
         return
 
@@ -291,3 +377,31 @@ class Test(test):
 
         # Return
         return
+
+    # Return event table
+    def _event_table(self, list):
+        """
+        Return event identifiers, times, energies and directions of an event
+        list
+
+        Parameters
+        ----------
+        list : `~gammalib.GCTAEventList`
+            Event list
+
+        Returns
+        -------
+        table : list of tuples
+            Event identifier, time, energy and direction of each event
+        """
+        # Initialise table
+        table = []
+
+        # Append events to table
+        for event in list:
+            table.append((event.event_id(), event.time().secs(),
+                          event.energy().TeV(), event.dir().dir().ra_deg(),
+                          event.dir().dir().dec_deg(), event.mc_id()))
+
+        # Return table
+        return table
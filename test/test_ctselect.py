@@ -19,6 +19,7 @@
 #
 # ==========================================================================
 import os
+import shutil
 import gammalib
 import ctools
 from testing import test
@@ -478,6 +479,88 @@ class Test(test):
         except ValueError:
             self.test_try_success()
 
+        # Copy event file into working directory so that a time index file
+        # can be written next to it, and remove any time index file of a
+        # previous test run
+        shutil.copyfile(self._events, 'ctselect_events.fits')
+        if os.path.isfile('ctselect_events.fits.tindex'):
+            os.remove('ctselect_events.fits.tindex')
+
+        # Run time selection twice with persistent time index, where the
+        # second run uses the time index file if one was written
+        for name in ['ctselect_py20', 'ctselect_py21']:
+            select = ctools.ctselect()
+            select['inobs']   = 'ctselect_events.fits'
+            select['ra']      = 83.63
+            select['dec']     = 22.01
+            select['rad']     = 3
+            select['tmin']    = 500.0
+            select['tmax']    = 1000.0
+            select['emin']    = 0.2
+            select['emax']    = 80.0
+            select['tindex']  = True
+            select['outobs']  = name+'.fits'
+            select['logfile'] = name+'.log'
+            select['chatter'] = 3
+            select.logFileOpen()
+            select.execute()
+
+            # Check result file
+            self._check_result_file(name+'.fits')
+
+            # Check that the time index file was written by the first run
+            self.test_assert(os.path.isfile('ctselect_events.fits.tindex'),
+                             'Check that time index file exists')
+
+        # Check that the second run loaded the time index file. The tool is
+        # deleted first so that its log file is closed.
+        del select
+        log = open('ctselect_py21.log', 'r').read()
+        self.test_assert('Events sorted using index file' in log,
+                         'Check that time index file was used')
+
+        # Select events into two energy bins
+        ebounds = gammalib.GEbounds()
+        ebounds.append(gammalib.GEnergy(0.1, 'TeV'), gammalib.GEnergy(1.0, 'TeV'))
+        ebounds.append(gammalib.GEnergy(1.0, 'TeV'), gammalib.GEnergy(100.0, 'TeV'))
+        select = ctools.ctselect()
+        select['inobs']   = self._events
+        select['ra']      = 83.63
+        select['dec']     = 22.01
+        select['rad']     = 3
+        select['tmin']    = 'INDEF'
+        select['tmax']    = 'INDEF'
+        select['emin']    = 0.1
+        select['emax']    = 100.0
+        select['logfile'] = 'ctselect_py22.log'
+        select['chatter'] = 2
+        select.energy_bins(ebounds)
+        select.logFileOpen()
+        select.run()
+
+        # Check that all selected events were distributed into the bins
+        self.test_value(select.nbins(), 2, 'Check number of bins')
+        nevents = 0
+        for i in range(select.nbins()):
+            self.test_value(select.bin_obs(i).size(), 1,
+                            'Check number of observations in bin')
+            nevents += select.bin_obs(i)[0].events().size()
+        self.test_value(nevents, select.obs()[0].events().size(),
+                        'Check number of events in bins')
+
+        # Test overlapping energy bins
+        self.test_try('Test overlapping energy bins')
+        try:
+            ebounds = gammalib.GEbounds()
+            ebounds.append(gammalib.GEnergy(0.1, 'TeV'),
+                           gammalib.GEnergy(2.0, 'TeV'))
+            ebounds.append(gammalib.GEnergy(1.0, 'TeV'),
+                           gammalib.GEnergy(100.0, 'TeV'))
+            select.energy_bins(ebounds)
+            self.test_try_failure('Exception not thrown for overlapping bins')
+        except ValueError:
+            self.test_try_success()
+
         # Return
         return
 
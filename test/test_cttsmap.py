@@ -191,6 +191,107 @@ class Test(test):
         # Check result file
         self._check_result_file('cttsmap_py2.fits')
 
+        # Compute TS map with two threads and check that it is identical
+        # to the TS map computed before
+        thr_tsmap = tsmap.copy()
+        thr_tsmap['nthreads'] = 2
+        thr_tsmap['outmap']   = 'cttsmap_py3.fits'
+        thr_tsmap['logfile']  = 'cttsmap_py3.log'
+        thr_tsmap.logFileOpen()
+        thr_tsmap.execute()
+        self._check_result_file('cttsmap_py3.fits')
+        for i in range(tsmap.tsmap().npix()):
+            self.test_value(thr_tsmap.tsmap()[i], tsmap.tsmap()[i], 1.0e-3,
+                            'Check TS value of bin %d' % i)
+
+        # Compute TS map with the fast method and check that all TS values
+        # are non-negative
+        fast_tsmap = tsmap.copy()
+        fast_tsmap['method']  = 'FAST'
+        fast_tsmap['outmap']  = 'cttsmap_py4.fits'
+        fast_tsmap['logfile'] = 'cttsmap_py4.log'
+        fast_tsmap.logFileOpen()
+        fast_tsmap.execute()
+        self._check_result_file('cttsmap_py4.fits')
+        for i in range(fast_tsmap.tsmap().npix()):
+            self.test_assert(fast_tsmap.tsmap()[i] >= 0.0,
+                             'Check that TS value of bin %d is non-negative' % i)
+
+        # Check that the TS values of the fast method are close to the TS
+        # values of the full method. Since the fast method only fits the
+        # test source amplitude, a tolerance of 10% is allowed.
+        for i in range(tsmap.tsmap().npix()):
+            full = tsmap.tsmap()[i]
+            self.test_value(fast_tsmap.tsmap()[i], full, 0.1*full+1.0,
+                            'Check fast TS value of bin %d' % i)
+
+        # Compute TS map with the fast method for a given log-likelihood of
+        # the null hypothesis, as done by cstsmapsplit, and check that the
+        # TS map is identical to the fast TS map computed before
+        logl_tsmap = tsmap.copy()
+        logl_tsmap['method']  = 'FAST'
+        logl_tsmap['logL0']   = self._null_likelihood(tsmap.obs())
+        logl_tsmap['outmap']  = 'cttsmap_py7.fits'
+        logl_tsmap['logfile'] = 'cttsmap_py7.log'
+        logl_tsmap.logFileOpen()
+        logl_tsmap.execute()
+        self._check_result_file('cttsmap_py7.fits')
+        for i in range(fast_tsmap.tsmap().npix()):
+            self.test_value(logl_tsmap.tsmap()[i], fast_tsmap.tsmap()[i],
+                            1.0e-3, 'Check fast TS value of bin %d for '
+                            'given null hypothesis likelihood' % i)
+
+        # Compute TS map with the fast method and re-fit all bins, and check
+        # that the TS map is identical to the TS map computed before
+        refit_tsmap = tsmap.copy()
+        refit_tsmap['method']  = 'FAST'
+        refit_tsmap['refit']   = 0.0
+        refit_tsmap['outmap']  = 'cttsmap_py5.fits'
+        refit_tsmap['logfile'] = 'cttsmap_py5.log'
+        refit_tsmap.logFileOpen()
+        refit_tsmap.execute()
+        self._check_result_file('cttsmap_py5.fits')
+        for i in range(tsmap.tsmap().npix()):
+            self.test_value(refit_tsmap.tsmap()[i], tsmap.tsmap()[i], 1.0e-3,
+                            'Check TS value of bin %d' % i)
+
+        # Compute TS map with the adaptive method, refining all grid cells,
+        # and check that the TS map is identical to the TS map computed
+        # before
+        adapt_tsmap = tsmap.copy()
+        adapt_tsmap['method']   = 'ADAPTIVE'
+        adapt_tsmap['coarse']   = 2
+        adapt_tsmap['tsrefine'] = 0.0
+        adapt_tsmap['outmap']   = 'cttsmap_py6.fits'
+        adapt_tsmap['logfile']  = 'cttsmap_py6.log'
+        adapt_tsmap.logFileOpen()
+        adapt_tsmap.execute()
+        self._check_result_file('cttsmap_py6.fits')
+        for i in range(tsmap.tsmap().npix()):
+            self.test_value(adapt_tsmap.tsmap()[i], tsmap.tsmap()[i], 1.0e-3,
+                            'Check TS value of bin %d' % i)
+
+        # Compute TS map with the adaptive method without refining any grid
+        # cell, and check that only the corners of the grid cell were
+        # fitted while all other map bins have the interpolation status
+        coarse_tsmap = tsmap.copy()
+        coarse_tsmap['method']   = 'ADAPTIVE'
+        coarse_tsmap['coarse']   = 2
+        coarse_tsmap['tsrefine'] = 1.0e30
+        coarse_tsmap['outmap']   = 'cttsmap_py8.fits'
+        coarse_tsmap['logfile']  = 'cttsmap_py8.log'
+        coarse_tsmap.logFileOpen()
+        coarse_tsmap.execute()
+        self._check_result_file('cttsmap_py8.fits')
+        status = gammalib.GSkyMap('cttsmap_py8.fits[STATUS MAP]')
+        for i in range(status.npix()):
+            if i in [0, 2, 6, 8]:
+                self.test_assert(status[i] != 100.0,
+                                 'Check that bin %d was fitted' % i)
+            else:
+                self.test_value(status[i], 100.0,
+                                'Check that bin %d was interpolated' % i)
+
         # Now clear copy of cttsmap tool
         cpy_tsmap.clear()
 
@@ -202,6 +303,34 @@ class Test(test):
         # Return
         return
 
+    # Compute log-likelihood of null hypothesis
+    def _null_likelihood(self, obs):
+        """
+        Compute log-likelihood of null hypothesis
+
+        Parameters
+        ----------
+        obs : `~gammalib.GObservations`
+            Observation container
+
+        Returns
+        -------
+        logL0 : float
+            Log-likelihood of null hypothesis
+        """
+        # Remove test source from models of a copy of the observations
+        null_obs = obs.copy()
+        models   = null_obs.models()
+        models.remove('Crab')
+        null_obs.models(models)
+
+        # Fit null hypothesis
+        opt = gammalib.GOptimizerLM()
+        null_obs.optimize(opt)
+
+        # Return log-likelihood of null hypothesis
+        return -opt.value()
+
     # Check result file
     def _check_result_file(self, filename, nx=3, ny=3):
         """
@@ -98,6 +98,116 @@ class Test(test):
         # Return
         return
 
+    # Test likelihood profile cache for datasets with different GTIs
+    def _test_profile_cache_gti(self):
+        """
+        Test likelihood profile cache for datasets that differ only in their
+        Good Time Intervals
+        """
+        # Set observation container
+        cta = gammalib.GCTAObservation(self._events)
+        obs = gammalib.GObservations()
+        obs.append(cta)
+        obs.models(gammalib.GModels(self._model))
+
+        # Set copy of observation container with the same events and
+        # Good Time Intervals of the same length that are shifted in time
+        obs_shifted = obs.copy()
+        gti_orig    = obs[0].events().gti()
+        gti         = gammalib.GGti()
+        for i in range(gti_orig.size()):
+            gti.append(gti_orig.tstart(i) + 3600.0,
+                       gti_orig.tstop(i)  + 3600.0)
+        obs_shifted[0].events().gti(gti)
+
+        # Compute upper limit for first dataset
+        ulimit = ctools.ctulimit(obs)
+        ulimit['srcname']   = 'Crab'
+        ulimit['caldb']     = self._caldb
+        ulimit['irf']       = self._irf
+        ulimit['profcache'] = True
+        ulimit['logfile']   = 'ctulimit_py7.log'
+        ulimit['chatter']   = 2
+        ulimit.logFileOpen()
+        ulimit.run()
+        size = ctools.ctlikelihood.profile_cache_size()
+
+        # Compute upper limit for dataset with shifted Good Time Intervals
+        ulimit = ctools.ctulimit(obs_shifted)
+        ulimit['srcname']   = 'Crab'
+        ulimit['caldb']     = self._caldb
+        ulimit['irf']       = self._irf
+        ulimit['profcache'] = True
+        ulimit['logfile']   = 'ctulimit_py8.log'
+        ulimit['chatter']   = 2
+        ulimit.logFileOpen()
+        ulimit.run()
+
+        # Check that the second dataset did not use the cached values of
+        # the first dataset
+        self.test_assert(ctools.ctlikelihood.profile_cache_size() > size,
+                         'Check that datasets with different GTIs are '
+                         'cached separately')
+
+        # Clear likelihood profile cache
+        ctools.ctlikelihood.clear_profile_cache()
+
+        # Return
+        return
+
+    # Test likelihood profile cache for datasets with different events
+    def _test_profile_cache_events(self):
+        """
+        Test likelihood profile cache for datasets that differ only in the
+        content of their events
+        """
+        # Set observation container
+        cta = gammalib.GCTAObservation(self._events)
+        obs = gammalib.GObservations()
+        obs.append(cta)
+        obs.models(gammalib.GModels(self._model))
+
+        # Set copy of observation container with the same metadata and
+        # number of events, but with a modified energy of the first event
+        obs_modified = obs.copy()
+        event        = obs_modified[0].events()[0]
+        event.energy(event.energy() * 1.01)
+
+        # Compute upper limit for first dataset
+        ulimit = ctools.ctulimit(obs)
+        ulimit['srcname']   = 'Crab'
+        ulimit['caldb']     = self._caldb
+        ulimit['irf']       = self._irf
+        ulimit['profcache'] = True
+        ulimit['logfile']   = 'ctulimit_py9.log'
+        ulimit['chatter']   = 2
+        ulimit.logFileOpen()
+        ulimit.run()
+        size = ctools.ctlikelihood.profile_cache_size()
+
+        # Compute upper limit for dataset with modified events
+        ulimit = ctools.ctulimit(obs_modified)
+        ulimit['srcname']   = 'Crab'
+        ulimit['caldb']     = self._caldb
+        ulimit['irf']       = self._irf
+        ulimit['profcache'] = True
+        ulimit['logfile']   = 'ctulimit_py10.log'
+        ulimit['chatter']   = 2
+        ulimit.logFileOpen()
+        ulimit.run()
+
+        # Check that the second dataset did not use the cached values of
+        # the first dataset
+        self.test_assert(ctools.ctlikelihood.profile_cache_size() > size,
+                         'Check that datasets with different events are '
+                         'cached separately')
+
+        # Clear likelihood profile cache
+        ctools.ctlikelihood.clear_profile_cache()
+
+        # Return
+        return
+
     # Test ctulimit from Python
     def _test_python(self):
         """
@@ -128,6 +238,7 @@ class Test(test):
         ulimit['srcname'] = 'Crab'
         ulimit['caldb']   = self._caldb
         ulimit['irf']     = self._irf
+        ulimit['profcache'] = True
         ulimit['logfile'] = 'ctulimit_py1.log'
         ulimit['chatter'] = 2
 
@@ -151,6 +262,10 @@ class Test(test):
         # Check opt() method
         self.test_value(ulimit.opt().status(), 0, 'Check optimizer status')
 
+        # Check that the likelihood profile was cached
+        self.test_assert(ctools.ctlikelihood.profile_cache_size() > 0,
+                         'Check that likelihood profile was cached')
+
         # Copy ctulimit tool
         cpy_ulimit = ulimit.copy()
 
@@ -170,6 +285,29 @@ class Test(test):
         self.test_value(cpy_ulimit.eflux_ulimit(), 2.75669e-11, 1.0e-16,
                         'Check upper limit on energy flux')
 
+        # Execute copy of ctulimit tool again, using the likelihood profile
+        # cache, and check results
+        cpy_ulimit['logfile'] = 'ctulimit_py6.log'
+        cpy_ulimit.logFileOpen()
+        cpy_ulimit.execute()
+        self.test_value(cpy_ulimit.diff_ulimit(), 8.86803e-18, 1.0e-21,
+                        'Check differential upper limit')
+        self.test_value(cpy_ulimit.flux_ulimit(), 6.10509e-12, 1.0e-16,
+                        'Check upper limit on photon flux')
+
+        # Clear likelihood profile cache
+        ctools.ctlikelihood.clear_profile_cache()
+        self.test_value(ctools.ctlikelihood.profile_cache_size(), 0,
+                        'Check that likelihood profile cache is empty')
+
+        # Check that the likelihood profile cache distinguishes between
+        # datasets that differ only in their Good Time Intervals
+        self._test_profile_cache_gti()
+
+        # Check that the likelihood profile cache distinguishes between
+        # datasets that differ only in the content of their events
+        self._test_profile_cache_events()
+
         # Now clear copy of ctulimit tool
         cpy_ulimit.clear()
 